@@ -0,0 +1,78 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.services.batch_verify import batch_verifier
+import asyncio
+import os
+import re
+import shutil
+import uuid
+import zipfile
+
+router = APIRouter()
+
+def batch_accepted(batch_id, **body):
+    return JSONResponse(status_code=202, content={
+        "batch_id": batch_id,
+        "poll_url": f"{settings.API_V1_STR}/kyc/batches/{batch_id}",
+        **body,
+    })
+
+def save_manifest(batch_id, manifest):
+    path = f"uploads/batches/{batch_id}.zip"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(manifest.file, buffer)
+    if not zipfile.is_zipfile(path):
+        os.remove(path)
+        return None
+    return path
+
+@router.post("/kyc/batches")
+async def create_batch(
+    manifest: UploadFile = File(None),
+    request_ids: str = Form(None),
+    enroll: bool = Form(False),
+):
+    """
+    Re-verifies many triples in the background. Send either a zip of
+    <key>_front/_back/_selfie images as `manifest`, or `request_ids` of earlier
+    uploads (comma or newline separated, "*" for all of uploads/).
+    """
+    if (manifest is None) == (request_ids is None):
+        raise HTTPException(status_code=400, detail="Send either a zip manifest or request_ids")
+
+    batch_id = str(uuid.uuid4())
+    if manifest is not None:
+        path = await asyncio.to_thread(save_manifest, batch_id, manifest)
+        if path is None:
+            raise HTTPException(status_code=400, detail="Manifest is not a zip file")
+        kind, source, ids = "zip", path, None
+    else:
+        ids = [i for i in re.split(r"[\s,]+", request_ids) if i]
+        if ids == ["*"]:
+            ids = None
+        kind, source = "uploads", ""
+
+    _, total, skipped = await asyncio.to_thread(
+        batch_verifier.create, kind, source, ids, enroll, batch_id
+    )
+    batch_verifier.start(batch_id)
+    return batch_accepted(batch_id, status="running", total=total, skipped=skipped)
+
+@router.get("/kyc/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = await asyncio.to_thread(batch_verifier.get, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Unknown batch")
+    return batch
+
+@router.post("/kyc/batches/{batch_id}/resume")
+async def resume_batch(batch_id: str, retry_failed: bool = False):
+    """Continues an interrupted batch from its first pending item."""
+    batch = await asyncio.to_thread(batch_verifier.get, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Unknown batch")
+    if not batch_verifier.start(batch_id, retry_failed):
+        raise HTTPException(status_code=409, detail="Batch is already running in this process")
+    return batch_accepted(batch_id, status="running")
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, BackgroundTasks, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from app.services.face_service import face_engine
 from app.services.ocr_service import ocr_engine
+from app.services.face_gallery import face_gallery
+from app.services.kyc_pipeline import decode_uploads, run_verification
+from app.services.metrics_store import metrics_store
+from app.services.quality_gate import quality_gate, QualityRejected
+from app.services.risk_engine import risk_engine
+from app.services.regional_risk import regional_risk_index
+from app.core.config import settings
 from app.database import SessionLocal, KYCRecord
-import shutil
-import os
+from app.core.executor import run_inference
+from app.core.lifecycle import model_registry
+from app.core.telemetry import log, span, REQUEST_SECONDS
+from app.services.image_io import decode_image, persist_uploads
+from datetime import datetime
+from typing import Optional
+import asyncio
+import csv
+import io
+import json
 import uuid
-import re
 
 router = APIRouter()
 
-# Global Cache
-KNOWN_DISTRICTS = set()
+# Rows per chunk written to the history export stream
+EXPORT_CHUNK_ROWS = 1000
 
 def get_db():
     db = SessionLocal()
@@ -21,148 +35,215 @@ def get_db():
     finally:
         db.close()
 
-def ensure_districts_loaded(db: Session):
-    if not KNOWN_DISTRICTS:
-        results = db.execute(text("SELECT DISTINCT District FROM uidai_regional_risk")).fetchall()
-        for row in results:
-            if row[0]:
-                KNOWN_DISTRICTS.add(row[0].strip().upper())
-
 @router.post("/kyc/verify")
 async def verify_kyc(
+    background_tasks: BackgroundTasks,
     id_card_front: UploadFile = File(...),  # <--- Renamed
     id_card_back: UploadFile = File(...),   # <--- NEW INPUT
     selfie: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    ensure_districts_loaded(db)
+    with span("verify", REQUEST_SECONDS, mode="sync"):
+        return await _verify(background_tasks, id_card_front, id_card_back, selfie, db)
 
+async def _verify(background_tasks, id_card_front, id_card_back, selfie, db):
     request_id = str(uuid.uuid4())
-    print(f"🚀 Processing Request: {request_id}")
+    log.debug("Processing request", extra={"request_id": request_id})
 
-    os.makedirs("uploads/id_cards", exist_ok=True)
-    os.makedirs("uploads/selfies", exist_ok=True)
-    
-    # Save all 3 files
-    front_path = f"uploads/id_cards/{request_id}_front.jpg"
-    back_path = f"uploads/id_cards/{request_id}_back.jpg"
-    selfie_path = f"uploads/selfies/{request_id}_selfie.jpg"
-    
-    with open(front_path, "wb") as buffer:
-        shutil.copyfileobj(id_card_front.file, buffer)
-    with open(back_path, "wb") as buffer:
-        shutil.copyfileobj(id_card_back.file, buffer)
-    with open(selfie_path, "wb") as buffer:
-        shutil.copyfileobj(selfie.file, buffer)
-
-    # 1. AI TASKS
-    # Face Match: Uses Front + Selfie
-    face_result = face_engine.verify_faces(front_path, selfie_path)
-    
-    # OCR: Extract text from BOTH sides
-    ocr_front = ocr_engine.extract_text(front_path)
-    ocr_back = ocr_engine.extract_text(back_path)
-    
-    # Merge OCR Data
-    # We use Front for Name/ID and Back for Address
-    combined_ocr = {
-        "name": ocr_front.get("name"),
-        "id_number": ocr_front.get("id_number"),
-        "address_front": ocr_front.get("address", ""),
-        "address_back": ocr_back.get("address", ""), # This usually contains the PIN
-        "raw_text_back": ocr_back.get("raw_text", "") # Full text scan of back
-    }
+    # Read each upload once and decode it once; face + OCR share the pixel buffers
+    front_bytes, back_bytes, selfie_bytes = await asyncio.gather(
+        id_card_front.read(), id_card_back.read(), selfie.read()
+    )
+    try:
+        front_img, back_img, selfie_img = await decode_uploads(request_id, front_bytes, back_bytes, selfie_bytes)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode uploaded image: {e}")
 
-    final_decision = "APPROVED" if face_result["match"] else "REJECTED"
+    # Audit copies of the originals are written after the response, off the hot path
+    if settings.PERSIST_UPLOADS:
+        background_tasks.add_task(persist_uploads, [
+            (f"uploads/id_cards/{request_id}_front.jpg", front_bytes),
+            (f"uploads/id_cards/{request_id}_back.jpg", back_bytes),
+            (f"uploads/selfies/{request_id}_selfie.jpg", selfie_bytes),
+        ])
 
-    # 2. SMART LOCATION DETECTION (Using Back Side Text)
-    detected_location = "Unknown"
-    regional_risk = 0
-    
-    # Scan the BACK side text for PIN Codes or District Names
-    full_back_text = f"{combined_ocr['address_back']} {combined_ocr['raw_text_back']}"
-    
-    # STRATEGY A: Find 6-Digit PIN Code on Back
-    pin_matches = re.findall(r'\b[1-9][0-9]{5}\b', full_back_text)
-    
-    found = False
-    if pin_matches:
-        for pin in pin_matches:
-            query = text("SELECT District, Risk_Score FROM uidai_regional_risk WHERE Pincode = :pin LIMIT 1")
-            result = db.execute(query, {"pin": pin}).fetchone()
-            if result:
-                detected_location = result[0]
-                regional_risk = int(result[1])
-                found = True
-                print(f"📍 Found Location via PIN {pin}: {detected_location}")
-                break
-    
-    # STRATEGY B: Fallback to District Name Search
-    if not found:
-        print("⚠️ No PIN found, checking District names...")
-        text_upper = full_back_text.upper()
-        for district in KNOWN_DISTRICTS:
-            if f" {district} " in text_upper:
-                detected_location = district
-                res = db.execute(text("SELECT Risk_Score FROM uidai_regional_risk WHERE District = :dist LIMIT 1"), {"dist": district}).fetchone()
-                if res:
-                    regional_risk = int(res[0])
-                break
+    try:
+        return await run_verification(request_id, front_img, back_img, selfie_img, db)
+    except QualityRejected as e:
+        # Unusable uploads are turned away before any model runs
+        raise HTTPException(status_code=422, detail={
+            "error": "IMAGE_QUALITY",
+            "request_id": request_id,
+            "failures": e.failures,
+        })
 
-    # 3. Save Record
-    new_record = KYCRecord(
-        request_id=request_id,
-        name=combined_ocr["name"],
-        id_number=combined_ocr["id_number"],
-        match_score=face_result["score"],
-        decision=final_decision
-    )
-    db.add(new_record)
-    db.commit()
+# --- 1:N DUPLICATE IDENTITY SEARCH ---
+@router.post("/kyc/duplicate-search")
+async def duplicate_search(selfie: UploadFile = File(...), top_k: int = settings.DUPLICATE_TOP_K):
+    try:
+        probe = await run_inference(decode_image, await selfie.read(), "probe_selfie.jpg")
+        await run_inference(quality_gate.screen, {"selfie": probe}, saved_calls={"mtcnn": 1, "facenet": 1}, saved_stage=None)
+        embedding = await run_inference(face_engine.get_embedding, probe)
+    except QualityRejected as e:
+        raise HTTPException(status_code=422, detail={"error": "IMAGE_QUALITY", "failures": e.failures})
+    except Exception as e:
+        log.warning("Error processing face", extra={"error": str(e)})
+        embedding = None
 
-    return {
-        "request_id": request_id,
-        "final_decision": final_decision,
-        "risk_score": int(face_result["score"]),
-        "ocr_data": combined_ocr,
-        "face_match": face_result,
-        "regional_risk": {
-            "district": detected_location.title(),
-            "score": regional_risk,
-            "level": "High" if regional_risk > 50 else "Low"
-        }
-    }
+    if embedding is None:
+        return {"error": "Could not process image", "gallery_size": len(face_gallery), "matches": []}
+
+    matches = await run_inference(face_gallery.search, embedding, top_k)
+    return {"error": None, "gallery_size": len(face_gallery), "matches": matches}
 
 # Keep existing history/stats endpoints...
+def history_query(db, decision=None, since=None, until=None, min_score=None, max_score=None):
+    """KYCRecord query with the shared /kyc/history filters applied."""
+    query = db.query(KYCRecord)
+    if decision:
+        query = query.filter(KYCRecord.decision == decision.upper())
+    if since:
+        query = query.filter(KYCRecord.timestamp >= since)
+    if until:
+        query = query.filter(KYCRecord.timestamp < until)
+    if min_score is not None:
+        query = query.filter(KYCRecord.match_score >= min_score)
+    if max_score is not None:
+        query = query.filter(KYCRecord.match_score <= max_score)
+    return query
+
 @router.get("/kyc/history")
-async def get_history(db: Session = Depends(get_db)):
-    return db.query(KYCRecord).order_by(KYCRecord.id.desc()).limit(10).all()
+async def get_history(
+    response: Response,
+    limit: int = Query(10, ge=1, le=200),
+    cursor: Optional[int] = None,
+    decision: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    db: Session = Depends(get_db)
+):
+    # Newest first, keyset on id: pass X-Next-Cursor back as ?cursor= for the next page
+    query = history_query(db, decision, since, until, min_score, max_score)
+    if cursor is not None:
+        query = query.filter(KYCRecord.id < cursor)
+    records = query.order_by(KYCRecord.id.desc()).limit(limit).all()
+    if len(records) == limit:
+        response.headers["X-Next-Cursor"] = str(records[-1].id)
+    return records
+
+@router.get("/kyc/history/export")
+def export_history(
+    format: str = "ndjson",
+    decision: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+):
+    """Full audit trail as NDJSON or CSV, oldest first, streamed in keyset pages."""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    columns = [c.name for c in KYCRecord.__table__.columns]
+
+    def rows():
+        # Keyset pages, each read in its own short-lived session: a cursor left
+        # open across yields would hold SQLite's SHARED lock for the whole
+        # download and block every writer (verify, jobs, counters) meanwhile
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == "csv":
+            writer.writerow(columns)
+        last_id = 0
+        while True:
+            db = SessionLocal()
+            try:
+                page = (
+                    history_query(db, decision, since, until, min_score, max_score)
+                    .filter(KYCRecord.id > last_id)
+                    .order_by(KYCRecord.id)
+                    .limit(EXPORT_CHUNK_ROWS)
+                    .all()
+                )
+                page = [[getattr(record, c) for c in columns] for record in page]
+            finally:
+                db.close()
+            for values in page:
+                if format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values)), default=str) + "\n")
+            if page:
+                last_id = page[-1][columns.index("id")]
+            if len(page) < EXPORT_CHUNK_ROWS:
+                break
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"kyc_history.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(rows(), media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+# --- RISK POLICY ---
+@router.get("/kyc/risk/policy")
+def get_risk_policy():
+    """The policy currently in force (reloaded from RISK_POLICY_PATH when the file changes)."""
+    policy = risk_engine.policy()
+    return {"version": policy.version, "path": risk_engine.path, "policy": policy.raw}
+
+@router.post("/kyc/risk/rescore")
+def rescore_history(
+    apply: bool = False,
+    decision: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Rescores historical KYCRecords (same filters as /kyc/history) under the
+    current policy in vectorized chunks. A dry run by default; apply=true
+    stores the new risk_score / risk_level. Past decisions are left as they are.
+    """
+    query = history_query(db, decision, since, until, min_score, max_score)
+    return risk_engine.rescore_records(db, query, apply=apply)
 
 @router.get("/kyc/stats")
 async def get_stats(db: Session = Depends(get_db)):
-    total = db.query(KYCRecord).count()
-    approved = db.query(KYCRecord).filter(KYCRecord.decision == "APPROVED").count()
+    counts = metrics_store.totals(db)
+    total, approved = counts["total"], counts["approved"]
     rate = round((approved / total) * 100, 1) if total > 0 else 0
     return {"total_verified": total, "success_rate": rate, "status": "Online"}
 
+# --- INFERENCE ENGINE TUNING STATS ---
+@router.get("/kyc/engine-stats")
+async def get_engine_stats():
+    # Never trigger a model load just to report stats
+    stats = {"models": model_registry.status(), "quality_gate": quality_gate.stats()}
+    if model_registry.is_loaded("face"):
+        stats["face_detection_batcher"] = face_engine.detector.stats()
+        stats["face_embedding_batcher"] = face_engine.embedder.stats()
+        stats["face_embedding_cache"] = face_engine.cache.stats()
+    if model_registry.is_loaded("ocr"):
+        stats["ocr_recognizer_batcher"] = ocr_engine.recognizer.stats()
+    return stats
+
 # --- ANALYTICS DASHBOARD ENDPOINT ---
 @router.get("/kyc/analytics-dashboard")
 async def get_analytics_dashboard(db: Session = Depends(get_db)):
-    # 1. Verification Stats
-    total = db.query(KYCRecord).count()
-    approved = db.query(KYCRecord).filter(KYCRecord.decision == "APPROVED").count()
-    rejected = total - approved
+    # 1. Verification Stats (pre-aggregated counters, no COUNT(*) over history)
+    counts = metrics_store.totals(db)
+    total, approved, rejected = counts["total"], counts["approved"], counts["rejected"]
     
     # 2. Top 5 Riskiest Districts (From your Big Data Table)
-    # We query the Static Risk Table for the highest scores
-    top_risky = db.execute(text(
-        "SELECT DISTINCT District, Risk_Score, State FROM uidai_regional_risk ORDER BY Risk_Score DESC LIMIT 5"
-    )).fetchall()
-    
-    risky_districts = [
-        {"name": row[0], "score": int(row[1]), "state": row[2]} 
-        for row in top_risky
-    ]
+    # Served from the in-memory risk index, recomputed only after a new ingest
+    regional_risk_index.refresh_if_stale()
+    risky_districts = regional_risk_index.hotspots(5)
 
     # 3. Recent Fraud Attempts (Live Feed)
     recent_failures = db.query(KYCRecord).filter(KYCRecord.decision == "REJECTED").order_by(KYCRecord.timestamp.desc()).limit(5).all()
@@ -175,4 +256,11 @@ async def get_analytics_dashboard(db: Session = Depends(get_db)):
         },
         "hotspots": risky_districts,
         "recent_alerts": recent_failures
-    }
\ No newline at end of file
+    }
+
+@router.get("/kyc/metrics/rollup")
+async def get_metrics_rollup(granularity: str = "hour", periods: int = 24, db: Session = Depends(get_db)):
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    periods = max(1, min(periods, 24 * 31 if granularity == "hour" else 366))
+    return {"granularity": granularity, "series": metrics_store.rollup(db, granularity, periods)}
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.config import settings
+from app.core.lifecycle import model_registry
+from app.core.telemetry import registry
+
+router = APIRouter()
+
+@router.get("/health/live")
+async def liveness():
+    # The process is up and the event loop answers; models may still be loading
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness():
+    # Only route traffic here once every model is warm. In lazy mode the first
+    # request is what loads them, so waiting for that would keep the pod out of
+    # rotation forever: it is ready unless a model already failed to load.
+    if settings.MODEL_LOADING == "lazy":
+        ready = not model_registry.failed
+    else:
+        ready = model_registry.ready
+    body = {"ready": ready, "models": model_registry.status()}
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+@router.get("/metrics")
+async def metrics():
+    # Prometheus text format; counters and histograms are per worker process
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.core.telemetry import log
+from app.services.job_queue import job_queue, job_workers, QueueFull, FINAL_STATUSES
+import asyncio
+import json
+import uuid
+
+router = APIRouter()
+
+def queue_full(detail):
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": "5"})
+
+@router.post("/kyc/jobs")
+async def submit_job(
+    id_card_front: UploadFile = File(...),
+    id_card_back: UploadFile = File(...),
+    selfie: UploadFile = File(...),
+    priority: int = 0,
+):
+    # Same inputs as /kyc/verify, but we only store them and answer right away
+    if not await asyncio.to_thread(job_queue.has_capacity):
+        raise queue_full("KYC job queue is full, retry later")
+
+    request_id = str(uuid.uuid4())
+    front_bytes, back_bytes, selfie_bytes = await asyncio.gather(
+        id_card_front.read(), id_card_back.read(), selfie.read()
+    )
+    paths = await asyncio.to_thread(job_queue.save_inputs, request_id, front_bytes, back_bytes, selfie_bytes)
+    try:
+        await asyncio.to_thread(job_queue.enqueue, request_id, paths, priority)
+    except QueueFull as e:
+        # Never queued, so nothing will ever read (or clean up) these files
+        await asyncio.to_thread(job_queue.discard_inputs, paths)
+        raise queue_full(f"KYC job queue is full, retry later ({e})")
+    job_workers.notify()
+
+    log.debug("Queued job", extra={"request_id": request_id, "priority": priority})
+    return JSONResponse(status_code=202, content={
+        "request_id": request_id,
+        "status": "queued",
+        "poll_url": f"{settings.API_V1_STR}/kyc/jobs/{request_id}",
+        "stream_url": f"{settings.API_V1_STR}/kyc/jobs/{request_id}/events",
+    })
+
+@router.get("/kyc/jobs/{request_id}")
+async def get_job(request_id: str):
+    job = await asyncio.to_thread(job_queue.get, request_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@router.get("/kyc/jobs/{request_id}/events")
+async def stream_job(request_id: str):
+    """Server-Sent Events: a 'status' event per state change, then one 'result' event."""
+    if await asyncio.to_thread(job_queue.get, request_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.KYC_JOB_STREAM_TIMEOUT_SECONDS
+        last_status = None
+        while True:
+            job = await asyncio.to_thread(job_queue.get, request_id)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                event = "result" if last_status in FINAL_STATUSES else "status"
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+            if last_status in FINAL_STATUSES:
+                return
+            if loop.time() > deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            await asyncio.sleep(settings.KYC_JOB_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -4,6 +4,9 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Zero-Trust AI KYC Engine"
     API_V1_STR: str = "/api/v1"
+
+    # Database (relative paths resolve against the working directory)
+    DATABASE_URL: str = "sqlite:///./kyc.db"
     
     # Security
     SECRET_KEY: str = "YOUR_SUPER_SECRET_KEY_FOR_JWT_SIGNING"
@@ -13,6 +16,7 @@ class Settings(BaseSettings):
     # File Uploads (Uses absolute path to avoid errors)
     UPLOAD_FOLDER: str = os.path.join(os.getcwd(), "uploads")
     MAX_FILE_SIZE_MB: int = 5
+    PERSIST_UPLOADS: bool = True  # Audit copy of originals, written in the background
     
     # AI Thresholds
     FACE_MATCH_THRESHOLD: float = 0.60
@@ -20,6 +24,104 @@ class Settings(BaseSettings):
     RISK_HIGH_THRESHOLD: int = 80
     RISK_MEDIUM_THRESHOLD: int = 40
 
+    # Risk Policy (weights, levels and rules; edits are picked up without a restart)
+    RISK_POLICY_PATH: str = "risk_policy.json"  # Lives next to kyc.db; built-in defaults if missing
+    RISK_POLICY_CHECK_SECONDS: float = 2.0      # How often to stat the file for changes
+
+    # Image Quality Gate (NumPy checks on the decoded uploads before any model runs)
+    QUALITY_GATE: str = "enforce"               # "enforce" (reject with 422), "warn" (count + log only) or "off"
+    QUALITY_MIN_SHORT_EDGE_CARD: int = 300      # Pixels
+    QUALITY_MIN_SHORT_EDGE_SELFIE: int = 160    # FaceNet's input size
+    QUALITY_MIN_BRIGHTNESS: float = 35.0        # Mean grey level (0-255)
+    QUALITY_MIN_CONTRAST: float = 6.0           # Grey-level std; below this the frame is blank
+    QUALITY_MAX_CLIPPED_RATIO: float = 0.85     # Share of pixels at pure black / pure white
+    QUALITY_MIN_SHARPNESS_CARD: float = 50.0    # Laplacian variance, measured at a 512 px long edge
+    QUALITY_MIN_SHARPNESS_SELFIE: float = 10.0
+    QUALITY_MIN_SKIN_RATIO_SELFIE: float = 0.05 # Skin-tone share of the central region (0 = skip)
+    QUALITY_MIN_SKIN_RATIO_CARD: float = 0.15   # In the densest 1/24th of the front: the portrait, catches swapped sides (0 = skip)
+    QUALITY_MIN_CHROMA_STD: float = 2.0         # Cr/Cb std below this means grayscale: the skin checks are skipped
+
+    # Inference Concurrency
+    # Face match + OCR(front) + OCR(back) run side by side, so 3 threads cover one request
+    INFERENCE_WORKERS: int = 3
+
+    # Model Loading: "background" (serve /health/live at once, load in parallel),
+    # "eager" (load in parallel before serving) or "lazy" (load on first request)
+    MODEL_LOADING: str = "background"
+
+    # FaceNet Micro-Batching (aligned crops from concurrent requests share one forward pass)
+    FACE_BATCH_MAX_SIZE: int = 16
+    FACE_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # MTCNN Batch Detection (images are letterboxed onto a square canvas of this size)
+    FACE_DETECT_CANVAS: int = 800
+    FACE_DETECT_BATCH_MAX_SIZE: int = 8
+    FACE_DETECT_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # CPU Inference Backend for FaceNet + MTCNN: "eager", "quantized", "torchscript", "compile" or "onnx"
+    # (check accuracy with benchmarks/face_backend_parity.py before switching)
+    FACE_BACKEND: str = "eager"
+    TORCH_NUM_THREADS: int = 0      # 0 = PyTorch default (all cores)
+    TORCH_INTEROP_THREADS: int = 0
+    FACE_PARITY_TOLERANCE: float = 0.01  # Max allowed cosine drift vs eager
+
+    # Logging & Metrics
+    LOG_FORMAT: str = "text"       # "text" or "json" (one object per line)
+    LOG_LEVEL: str = "INFO"        # Per-request detail (stages, matches) is logged at DEBUG
+    METRICS_ENABLED: bool = True   # Stage histograms behind GET /metrics
+
+    # Async Job Queue (POST /kyc/jobs, stored in kyc.db)
+    KYC_JOB_WORKERS: int = 2            # Concurrent jobs per API process (0 = submit only)
+    KYC_JOB_QUEUE_MAX: int = 200        # Queued jobs before submissions get 429
+    KYC_JOB_MAX_ATTEMPTS: int = 3
+    KYC_JOB_LEASE_SECONDS: int = 300    # A running job whose worker died is retried after this
+    KYC_JOB_POLL_SECONDS: float = 0.5
+    KYC_JOB_STREAM_TIMEOUT_SECONDS: int = 300
+
+    # Batch Verification (backfill_kyc.py and POST /kyc/batches)
+    BATCH_CHUNK_SIZE: int = 64         # Triples per inference round and per commit
+    BATCH_WORKERS: int = 0             # Decode/OCR threads for a batch run (0 = all cores)
+    BATCH_LEASE_SECONDS: int = 600     # A batch whose runner died can be resumed after this
+
+    # OCR Preprocessing (see benchmarks/ocr_resolution.py for the latency/accuracy trade-off)
+    OCR_TARGET_LONG_EDGE: int = 1280  # 0 = keep full resolution
+    OCR_CARD_CROP: bool = True        # Detect the card outline and warp it flat
+    OCR_FIELD_ROIS: bool = False      # Only read the known Aadhaar field regions
+
+    # OCR Recognition Batching (text-line crops from many images share one CRNN pass)
+    OCR_RECOGNIZE_BATCH_MAX_SIZE: int = 96   # Crops collected per scheduler flush
+    OCR_RECOGNIZE_BATCH_MAX_WAIT_MS: float = 10.0
+    OCR_RECOGNIZE_FORWARD_BATCH: int = 32    # Crops per forward pass (grouped by width)
+
+    # OCR Backend: "torch" (EasyOCR as shipped) or "onnx"
+    OCR_BACKEND: str = "torch"
+
+    # ONNX Runtime (graphs exported by export_onnx.py)
+    ONNX_MODEL_DIR: str = os.path.join(os.getcwd(), "models", "onnx")
+    ONNX_SESSION_POOL_SIZE: int = 2
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = ONNX Runtime default
+
+    # Face Embedding Cache (keyed by SHA-256 of the image bytes)
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_PERSIST: bool = True
+
+    # Duplicate Identity Search (1:N over approved selfie embeddings)
+    FACE_GALLERY_PATH: str = "face_gallery.f32"  # Lives next to kyc.db
+    GALLERY_SCAN_BLOCK_ROWS: int = 65536
+    DUPLICATE_TOP_K: int = 5
+    DUPLICATE_MATCH_THRESHOLD: float = 0.80  # Cosine similarity
+    DUPLICATE_BLOCKS_APPROVAL: bool = True
+
+    # Approximate Search (IVF index, used once the gallery outgrows brute force)
+    FACE_INDEX_PATH: str = "face_gallery.ivf.npz"  # Built offline by build_face_index.py
+    FACE_ANN_MIN_ROWS: int = 200000
+    FACE_ANN_NLIST: int = 1024
+    FACE_ANN_NPROBE: int = 16
+    FACE_ANN_SAVE_EVERY: int = 1000  # Persist after this many incremental inserts
+
+    # Regional Risk Index (in-memory pincode/district lookups)
+    RISK_INDEX_REFRESH_SECONDS: int = 60  # How often to check for a new ingest
+
     # Pydantic V2 Config
     model_config = {"case_sensitive": True}
 
@@ -0,0 +1,20 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app.core.config import settings
+
+# Shared pool for the blocking model calls (MTCNN, FaceNet, EasyOCR).
+# PyTorch releases the GIL inside its kernels, so threads overlap properly
+# and the event loop stays free to answer /kyc/stats and / meanwhile.
+inference_pool = ThreadPoolExecutor(
+    max_workers=max(1, settings.INFERENCE_WORKERS),
+    thread_name_prefix="kyc-inference",
+)
+
+async def run_inference(func, *args, **kwargs):
+    """Runs a blocking model call on the inference pool and awaits the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_pool, partial(func, *args, **kwargs))
+
+def shutdown_inference_pool():
+    inference_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.telemetry import log
+
+class ModelSlot:
+    """One heavy model: how to build it, and where it is in its lifecycle."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.state = "pending"      # pending -> loading -> ready | failed
+        self.load_seconds = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.instance is not None:
+            return self.instance
+        with self.lock:
+            if self.instance is not None:
+                return self.instance
+            self.state = "loading"
+            self.error = None
+            started = time.perf_counter()
+            try:
+                instance = self.factory()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                raise
+            finally:
+                self.load_seconds = round(time.perf_counter() - started, 3)
+            self.instance = instance
+            self.state = "ready"
+            return instance
+
+    def status(self):
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
+
+class LazyModel:
+    """
+    Stand-in for a service singleton (e.g. `face_engine`). Attribute access
+    loads the real object on first use, so call sites stay unchanged.
+    """
+
+    def __init__(self, slot):
+        object.__setattr__(self, "_slot", slot)
+
+    def __getattr__(self, attr):
+        return getattr(self._slot.load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._slot.load(), attr, value)
+
+class ModelRegistry:
+    def __init__(self):
+        self._slots = {}
+        self._warm_up_thread = None
+
+    def register(self, name, factory) -> LazyModel:
+        slot = self._slots.setdefault(name, ModelSlot(name, factory))
+        return LazyModel(slot)
+
+    def get(self, name):
+        return self._slots[name].load()
+
+    def is_loaded(self, name):
+        slot = self._slots.get(name)
+        return slot is not None and slot.instance is not None
+
+    def warm_up(self):
+        """Loads every registered model in parallel and blocks until all are done."""
+        slots = list(self._slots.values())
+        if not slots:
+            return
+        log.info("Warming up models in parallel", extra={"models": [s.name for s in slots]})
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(slots), thread_name_prefix="model-warmup") as pool:
+            futures = {pool.submit(slot.load): slot for slot in slots}
+            for fut, slot in futures.items():
+                try:
+                    fut.result()
+                except Exception as e:
+                    log.error("Model failed to load", extra={"model": slot.name, "error": str(e)})
+        log.info("Warm-up finished", extra={"seconds": round(time.perf_counter() - started, 1)})
+
+    def start_warm_up(self):
+        """Non-blocking warm-up: the server answers /health/live while models load."""
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="model-warmup", daemon=True)
+            self._warm_up_thread.start()
+
+    @property
+    def ready(self):
+        return all(slot.state == "ready" for slot in self._slots.values())
+
+    @property
+    def failed(self):
+        return [name for name, slot in self._slots.items() if slot.state == "failed"]
+
+    def status(self):
+        return {name: slot.status() for name, slot in self._slots.items()}
+
+model_registry = ModelRegistry()
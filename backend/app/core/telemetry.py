@@ -0,0 +1,230 @@
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from app.core.config import settings
+
+# Per-request logging goes through this logger instead of print(). Records are
+# handed to a background thread (QueueHandler -> QueueListener), so the request
+# path never blocks on stdout; at the default level the chatter is skipped entirely.
+log = logging.getLogger("kyc")
+
+# Seconds; wide enough for a cold model call, fine enough for a cache hit
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def snapshot(self):
+        """{label values: value}, keyed like Histogram.summary."""
+        with self._lock:
+            return {",".join(key) or "all": value for key, value in sorted(self._values.items())}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram; one bucket array per label set."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += seconds
+
+    def mean(self, **labels):
+        """Mean observed seconds for one label set (0.0 before the first observation)."""
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            count = sum(series[:-1]) if series else 0
+            return series[-1] / count if count else 0.0
+
+    def summary(self):
+        """{label values: {"count", "mean_ms"}} for reports that do not need buckets."""
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        return {
+            ",".join(key) or "all": {
+                "count": sum(values[:-1]),
+                "mean_ms": round(values[-1] / max(1, sum(values[:-1])) * 1000, 3),
+            }
+            for key, values in series.items()
+        }
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            cumulative += values[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (per process)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "kyc_stage_duration_seconds", "Time spent in each verification stage", ("stage",))
+REQUEST_SECONDS = registry.histogram(
+    "kyc_request_duration_seconds", "End-to-end verification time", ("mode",))
+DECISIONS = registry.counter(
+    "kyc_decisions_total", "Verification decisions", ("decision",))
+FACE_FALLBACKS = registry.counter(
+    "kyc_face_detection_fallback_total", "Images embedded whole because MTCNN found no face")
+FACE_ERRORS = registry.counter(
+    "kyc_face_errors_total", "Images that could not be embedded")
+OCR_ERRORS = registry.counter(
+    "kyc_ocr_errors_total", "OCR calls that raised")
+DUPLICATE_SUSPECTS = registry.counter(
+    "kyc_duplicate_suspects_total", "Selfies matching a gallery face under another ID number")
+QUALITY_REJECTIONS = registry.counter(
+    "kyc_quality_gate_rejections_total", "Images failing the pre-inference quality gate", ("code", "image"))
+QUALITY_SAVED_CALLS = registry.counter(
+    "kyc_quality_gate_saved_inference_total", "Model calls skipped because the quality gate rejected the request", ("model",))
+QUALITY_SAVED_SECONDS = registry.counter(
+    "kyc_quality_gate_saved_seconds_total", "Estimated inference time skipped (running mean of the skipped stage)")
+BATCH_ITEMS = registry.counter(
+    "kyc_batch_items_total", "Batch verification items processed", ("status",))
+
+@contextmanager
+def span(stage, histogram=STAGE_SECONDS, **labels):
+    """Times the block into `histogram` (per stage by default) and logs it at DEBUG."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if settings.METRICS_ENABLED:
+            histogram.observe(elapsed, stage=stage, **labels)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("span", extra={"stage": stage, "duration_ms": round(elapsed * 1000, 3), **labels})
+
+# --- Logging setup ---
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys."""
+
+    def format(self, record):
+        body = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                body[key] = value
+        if record.exc_info:
+            body["exc"] = self.formatException(record.exc_info)
+        return json.dumps(body, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RESERVED}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+_listener = None
+_listener_pid = None
+
+def configure_logging():
+    """
+    Applies LOG_LEVEL / LOG_FORMAT. Called from the app lifespan, i.e. once
+    per worker process (the listener thread would not survive serve.py's fork).
+    """
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    log.handlers = [logging.handlers.QueueHandler(records)]
+    log.setLevel(settings.LOG_LEVEL.upper())
+    log.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def shutdown_logging():
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+    _listener = _listener_pid = None
@@ -1,10 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, Float, DateTime, Boolean, LargeBinary, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from app.core.config import settings
 
-# This creates a file 'kyc.db' in your project folder
-DATABASE_URL = "sqlite:///./kyc.db"
+# This creates a file 'kyc.db' in your project folder (override with DATABASE_URL)
+DATABASE_URL = settings.DATABASE_URL
 
 # The connection engine
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
@@ -20,8 +21,121 @@ class KYCRecord(Base):
     name = Column(String)
     id_number = Column(String)
     match_score = Column(Float)
-    decision = Column(String) 
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    decision = Column(String, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    # Risk engine inputs (NULL on records that predate them) and its latest verdict
+    ocr_confidence = Column(Float, nullable=True)      # 0-1, mean over both sides
+    regional_risk = Column(Integer, nullable=True)     # 0-100; NULL when no district was found
+    duplicate_suspect = Column(Boolean, nullable=True)
+    risk_score = Column(Float, nullable=True)          # 0 = high risk, 100 = trustworthy
+    risk_level = Column(String, nullable=True)
+    policy_version = Column(String, nullable=True)     # Policy that produced risk_score
+
+    # Serves "latest REJECTED" on the dashboard without a scan
+    __table_args__ = (Index("ix_kyc_records_decision_timestamp", "decision", "timestamp"),)
+
+# Running approve/reject counters, maintained in the same transaction as each
+# KYCRecord insert. One row per UTC hour ("2024-05-01T13") plus a "total" row.
+class KYCMetricBucket(Base):
+    __tablename__ = "kyc_metrics"
+
+    bucket = Column(String, primary_key=True)
+    approved = Column(Integer, default=0)
+    rejected = Column(Integer, default=0)
+
+# Disk tier of the face embedding cache (SHA-256 of the uploaded bytes -> 512 float32)
+class FaceEmbeddingCache(Base):
+    __tablename__ = "face_embedding_cache"
+
+    key = Column(String, primary_key=True)
+    embedding = Column(LargeBinary)
+    face_detected = Column(Boolean)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Row metadata for the face gallery (the vectors live in a memory-mapped float32 file)
+class FaceGalleryEntry(Base):
+    __tablename__ = "face_gallery"
+
+    row_index = Column(Integer, primary_key=True, autoincrement=False)
+    request_id = Column(String, index=True)
+    id_number = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Durable work queue behind POST /kyc/jobs (inputs live on disk under uploads/)
+class KYCJob(Base):
+    __tablename__ = "kyc_jobs"
+
+    request_id = Column(String, primary_key=True)
+    status = Column(String, default="queued")   # queued -> running -> done / failed
+    priority = Column(Integer, default=0)       # Higher runs first
+    attempts = Column(Integer, default=0)
+    lease_expires_at = Column(DateTime, nullable=True)
+    front_path = Column(String)
+    back_path = Column(String)
+    selfie_path = Column(String)
+    result = Column(Text, nullable=True)        # JSON of the /kyc/verify response
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_kyc_jobs_claim", "status", "priority", "created_at"),)
+
+# Bulk re-verification runs (backfill_kyc.py / POST /kyc/batches)
+class KYCBatch(Base):
+    __tablename__ = "kyc_batches"
+
+    batch_id = Column(String, primary_key=True)
+    source_kind = Column(String)                # "dir", "zip" or "uploads"
+    source = Column(String)                     # Directory / zip path (empty for uploads)
+    enroll = Column(Boolean, default=False)     # Add approved selfies to the face gallery
+    status = Column(String, default="pending")  # pending -> running -> done / paused (resumable)
+    runs = Column(Integer, default=0)           # Bumped per claim; fences out a runner that lost its lease
+    total = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)        # Incomplete triples left out of the manifest
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+# One row per triple; its status is the resume point
+class KYCBatchItem(Base):
+    __tablename__ = "kyc_batch_items"
+
+    batch_id = Column(String, primary_key=True)
+    item_key = Column(String, primary_key=True)   # File stem or the original request_id
+    front_path = Column(String)                   # Relative to the source directory / zip
+    back_path = Column(String)
+    selfie_path = Column(String)
+    status = Column(String, default="pending")    # pending -> done / failed
+    request_id = Column(String, nullable=True)    # The new KYCRecord
+    decision = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (Index("ix_kyc_batch_items_status", "batch_id", "status"),)
+
+def add_missing_columns(bind):
+    """
+    create_all never alters a table that already exists, so columns added to
+    a model later are added here (ALTER TABLE ... ADD COLUMN, as NULL) for
+    older kyc.db files.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
 
 # Actually create the file now
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
+
+# create_all skips tables that already exist, so indexes added to a model
+# later are created here for older kyc.db files
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
\ No newline at end of file
@@ -1,12 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import router as api_router
-from app.services.ocr_service import ocr_engine
-from app.services.face_service import face_engine
+from app.api.health import router as health_router
+from app.api.jobs import router as jobs_router
+from app.api.batches import router as batches_router
+from app.core.config import settings
+from app.core.executor import shutdown_inference_pool
+from app.core.lifecycle import model_registry
+from app.core.telemetry import log, configure_logging, shutdown_logging
+from app.services.regional_risk import regional_risk_index
+from app.services.job_queue import job_workers
+from app.services.batch_verify import batch_verifier
+from app.services.metrics_store import metrics_store
+import asyncio
 import uvicorn
 import os
 
-app = FastAPI(title="AI KYC System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Structured request logging (LOG_FORMAT / LOG_LEVEL), one listener thread per process
+    configure_logging()
+    log.info("API server starting")
+    # Ensure upload directories exist
+    os.makedirs("uploads/id_cards", exist_ok=True)
+    os.makedirs("uploads/selfies", exist_ok=True)
+    # Pincode/district lookups are served from memory, not SQLite
+    regional_risk_index.refresh_if_stale()
+    # Dashboard counters for databases created before they existed
+    metrics_store.ensure_seeded()
+
+    # Models (EasyOCR, FaceNet + MTCNN) load in parallel instead of at import time
+    if settings.MODEL_LOADING == "eager":
+        await asyncio.to_thread(model_registry.warm_up)
+    elif settings.MODEL_LOADING == "background":
+        model_registry.start_warm_up()
+
+    # Drain /kyc/jobs submissions (also picks up jobs a crashed process left behind)
+    job_workers.start(settings.KYC_JOB_WORKERS)
+
+    yield
+
+    await job_workers.stop()
+    # Interrupted batches keep their progress; resume via POST /kyc/batches/{id}/resume
+    await batch_verifier.stop()
+    # Stop accepting new model work; in-flight calls finish on their own
+    shutdown_inference_pool()
+    shutdown_logging()
+
+app = FastAPI(title="AI KYC System", lifespan=lifespan)
 
 # --- THIS IS THE FIX (CORS POLICY) ---
 # It tells the backend: "Accept requests from the Frontend"
@@ -16,20 +58,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # History pagination cursor
 )
 
-@app.on_event("startup")
-async def startup_event():
-    print("🚀 API Server Starting...")
-    # Ensure upload directories exist
-    os.makedirs("uploads/id_cards", exist_ok=True)
-    os.makedirs("uploads/selfies", exist_ok=True)
-
 @app.get("/")
 def read_root():
     return {"message": "✅ Zero-Trust KYC Engine is Running!"}
 
+app.include_router(health_router)
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(batches_router, prefix="/api/v1")
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
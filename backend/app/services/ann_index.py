@@ -0,0 +1,140 @@
+import os
+import numpy as np
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) index for L2-normalized embeddings, NumPy only.
+
+    Spherical k-means splits the gallery into `nlist` cells; a query only
+    scores the rows in the `nprobe` cells whose centroids it is closest to.
+    The index stores row ids, not vectors: candidates are gathered from the
+    gallery matrix (memmap) and re-scored exactly, so results are true
+    cosine similarities, just not guaranteed to be the global top-k.
+    """
+
+    def __init__(self, dim=512, nlist=1024):
+        self.dim = dim
+        self.nlist = nlist
+        self.centroids = None        # (nlist, dim) float32, unit rows
+        self.lists = []              # one int64 array of row ids per cell
+        self.indexed_rows = 0        # gallery rows [0, indexed_rows) are covered
+        self.pending = 0             # inserts since the last save
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    # --- Build ---
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _assign(self, vectors, block_rows=65536):
+        """Nearest centroid (max inner product) per row, in blocks."""
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            out[start:start + block.shape[0]] = np.argmax(block @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, vectors, iterations=20, sample_size=100_000, seed=0):
+        """Spherical k-means on (a sample of) the gallery."""
+        rng = np.random.default_rng(seed)
+        n = vectors.shape[0]
+        if n == 0:
+            raise ValueError("Cannot train an index on an empty gallery")
+        take = np.sort(rng.choice(n, size=min(n, sample_size), replace=False))
+        sample = self._normalize(vectors[take])
+
+        self.nlist = max(1, min(self.nlist, sample.shape[0]))
+        centroids = sample[rng.choice(sample.shape[0], size=self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self.centroids = centroids
+            labels = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.nlist)
+            # Empty cells get re-seeded from random samples
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            centroids = self._normalize(sums)
+        self.centroids = centroids
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.indexed_rows = 0
+        return self
+
+    def add(self, vectors, start_row):
+        """Inserts gallery rows [start_row, start_row + len(vectors)) into their cells."""
+        if not self.is_trained:
+            raise RuntimeError("Index must be trained before adding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] == 0:
+            return
+        labels = self._assign(vectors)
+        row_ids = np.arange(start_row, start_row + vectors.shape[0], dtype=np.int64)
+        order = np.argsort(labels, kind="stable")
+        labels, row_ids = labels[order], row_ids[order]
+        cells, starts = np.unique(labels, return_index=True)
+        ends = np.append(starts[1:], labels.shape[0])
+        for cell, s, e in zip(cells, starts, ends):
+            self.lists[cell] = np.concatenate([self.lists[cell], row_ids[s:e]])
+        self.indexed_rows = max(self.indexed_rows, start_row + vectors.shape[0])
+        self.pending += vectors.shape[0]
+
+    def build(self, matrix, block_rows=65536, **train_kwargs):
+        """Offline build: train on the gallery, then index every row."""
+        self.train(matrix, **train_kwargs)
+        for start in range(0, matrix.shape[0], block_rows):
+            self.add(matrix[start:start + block_rows], start)
+        return self
+
+    # --- Search ---
+    def search(self, query, matrix, top_k=5, nprobe=16):
+        """Returns (row_indices, similarities), best first. `query` must be unit length."""
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = max(1, min(nprobe, self.nlist))
+        cell_scores = self.centroids @ query
+        probe = np.argpartition(-cell_scores, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self.lists[c] for c in probe])
+        candidates = candidates[candidates < matrix.shape[0]]
+        if candidates.shape[0] == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Sorted ids turn the memmap gather into mostly-sequential reads
+        candidates.sort()
+        sims = np.asarray(matrix[candidates], dtype=np.float32) @ query
+        k = min(top_k, sims.shape[0])
+        best = np.argpartition(-sims, k - 1)[:k]
+        best = best[np.argsort(-sims[best])]
+        return candidates[best], sims[best]
+
+    # --- Persistence ---
+    def save(self, path):
+        sizes = np.array([l.shape[0] for l in self.lists], dtype=np.int64)
+        ids = np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64)
+        # Per-process temp name: forked workers may save at the same time
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            list_sizes=sizes,
+            ids=ids,
+            indexed_rows=np.int64(self.indexed_rows),
+        )
+        os.replace(tmp_path, path)
+        self.pending = 0
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(dim=data["centroids"].shape[1], nlist=data["centroids"].shape[0])
+        index.centroids = data["centroids"].astype(np.float32)
+        offsets = np.concatenate([[0], np.cumsum(data["list_sizes"])])
+        ids = data["ids"]
+        index.lists = [ids[offsets[i]:offsets[i + 1]].copy() for i in range(index.nlist)]
+        index.indexed_rows = int(data["indexed_rows"])
+        return index
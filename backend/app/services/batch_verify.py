@@ -0,0 +1,421 @@
+import asyncio
+import os
+import re
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from sqlalchemy import func, insert, or_, update
+from app.core.config import settings
+from app.core.telemetry import log, span, BATCH_ITEMS
+from app.database import SessionLocal, KYCBatch, KYCBatchItem
+from app.services.face_gallery import face_gallery
+from app.services.face_service import face_engine
+from app.services.image_io import decode_image
+from app.services.kyc_pipeline import assess, record_outcomes, enroll
+from app.services.metrics_store import metrics_store
+from app.services.ocr_service import ocr_engine
+from app.services.quality_gate import quality_gate, QualityRejected
+from app.services.regional_risk import regional_risk_index
+
+SOURCE_KINDS = ("dir", "zip", "uploads")
+CARD_DIR = "uploads/id_cards"
+SELFIE_DIR = "uploads/selfies"
+
+# "<key>_front.jpg", "<key>-selfie.png", ...; "<key>_id.jpg" is the older
+# single-image card layout (used as both front and back)
+TRIPLE_FILE = re.compile(r"^(?P<key>.+?)[_-](?P<side>front|back|id|selfie)\.(?:jpe?g|png|webp|bmp)$", re.IGNORECASE)
+
+def group_triples(paths, nested=True):
+    """
+    Groups image paths into {key: (front, back, selfie)}. With nested=True
+    the key keeps the sub-directory, so "a/1_front.jpg" and "b/1_front.jpg"
+    stay apart. Returns (triples, incomplete_count).
+    """
+    sides = defaultdict(dict)
+    for path in paths:
+        folder, _, name = path.replace("\\", "/").rpartition("/")
+        match = TRIPLE_FILE.match(name)
+        if match:
+            key = f"{folder}/{match['key']}" if nested and folder else match["key"]
+            sides[key][match["side"].lower()] = path
+
+    triples, incomplete = {}, 0
+    for key, found in sides.items():
+        front = found.get("front") or found.get("id")
+        back = found.get("back") or found.get("id")
+        if front and back and "selfie" in found:
+            triples[key] = (front, back, found["selfie"])
+        else:
+            incomplete += 1
+    return triples, incomplete
+
+def scan_directory(root):
+    paths = [
+        os.path.relpath(os.path.join(folder, name), root)
+        for folder, _, names in os.walk(root)
+        for name in names
+    ]
+    return group_triples(paths)
+
+def scan_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        return group_triples([name for name in archive.namelist() if not name.endswith("/")])
+
+def scan_uploads(request_ids=None):
+    """Triples saved by /kyc/verify and /kyc/jobs; every complete one when request_ids is None."""
+    paths = [
+        f"{folder}/{name}"
+        for folder in (CARD_DIR, SELFIE_DIR) if os.path.isdir(folder)
+        for name in os.listdir(folder)
+    ]
+    triples, incomplete = group_triples(paths, nested=False)
+    if request_ids is None:
+        return triples, incomplete
+    wanted = list(dict.fromkeys(request_ids))
+    found = {key: triples[key] for key in wanted if key in triples}
+    return found, len(wanted) - len(found)
+
+class BatchVerifier:
+    """
+    Re-verifies a manifest of front/back/selfie triples in bulk (backfills
+    after a threshold change or a model upgrade).
+
+    The manifest is resolved once into kyc_batch_items, then processed a
+    chunk at a time: every image of the chunk is decoded and OCR'd on a
+    dedicated pool (one thread per core by default) while all face pairs go
+    through a single verify_pairs call, so the MicroBatchers see full
+    batches instead of one request's worth. A chunk's KYCRecords, counters
+    and item statuses commit in one transaction, and a rerun only picks up
+    items still pending, so an interrupted batch resumes where it stopped.
+    Each item gets a new request_id; an upload's original KYCRecord stays.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    # --- Manifest ---
+    def create(self, kind, source="", request_ids=None, enroll=False, batch_id=None):
+        """Resolves the manifest into a new batch; returns (batch_id, total, skipped)."""
+        if kind == "dir":
+            triples, skipped = scan_directory(source)
+        elif kind == "zip":
+            triples, skipped = scan_zip(source)
+        elif kind == "uploads":
+            triples, skipped = scan_uploads(request_ids)
+        else:
+            raise ValueError(f"Unknown batch source '{kind}', expected one of {SOURCE_KINDS}")
+
+        batch_id = batch_id or str(uuid.uuid4())
+        db = SessionLocal()
+        try:
+            db.add(KYCBatch(
+                batch_id=batch_id,
+                source_kind=kind,
+                source=os.path.abspath(source) if source else "",
+                enroll=enroll,
+                total=len(triples),
+                skipped=skipped,
+            ))
+            rows = [
+                {"batch_id": batch_id, "item_key": key, "front_path": front, "back_path": back, "selfie_path": selfie}
+                for key, (front, back, selfie) in sorted(triples.items())
+            ]
+            if rows:
+                db.execute(insert(KYCBatchItem), rows)
+            db.commit()
+        finally:
+            db.close()
+        return batch_id, len(triples), skipped
+
+    # --- Ownership ---
+    def claim(self, batch_id, retry_failed=False):
+        """Takes the batch unless a live runner holds it; None if it is taken or unknown."""
+        db = SessionLocal()
+        try:
+            batch = db.get(KYCBatch, batch_id)
+            if batch is None:
+                return None
+            # Snapshot before the commit below expires the ORM object
+            run = {
+                "batch_id": batch.batch_id,
+                "runs": batch.runs + 1,
+                "source_kind": batch.source_kind,
+                "source": batch.source,
+                "enroll": batch.enroll,
+            }
+            now = datetime.utcnow()
+            claimed = db.query(KYCBatch).filter(
+                KYCBatch.batch_id == batch_id,
+                KYCBatch.runs == batch.runs,
+                or_(KYCBatch.status != "running", KYCBatch.lease_expires_at < now),
+            ).update({
+                "status": "running",
+                "runs": run["runs"],
+                "lease_expires_at": now + timedelta(seconds=settings.BATCH_LEASE_SECONDS),
+                "finished_at": None,
+            }, synchronize_session=False)
+            if claimed and retry_failed:
+                db.query(KYCBatchItem).filter(
+                    KYCBatchItem.batch_id == batch_id, KYCBatchItem.status == "failed",
+                ).update({"status": "pending", "error": None}, synchronize_session=False)
+            db.commit()
+            return run if claimed else None
+        finally:
+            db.close()
+
+    def _owned(self, db, run):
+        return db.query(KYCBatch).filter(KYCBatch.batch_id == run["batch_id"], KYCBatch.runs == run["runs"])
+
+    def _release(self, run, status):
+        db = SessionLocal()
+        try:
+            self._owned(db, run).update({
+                "status": status,
+                "lease_expires_at": None,
+                "finished_at": datetime.utcnow() if status == "done" else None,
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    # --- Processing ---
+    def _next_chunk(self, batch_id):
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(KYCBatchItem.item_key, KYCBatchItem.front_path, KYCBatchItem.back_path, KYCBatchItem.selfie_path)
+                .filter(KYCBatchItem.batch_id == batch_id, KYCBatchItem.status == "pending")
+                .order_by(KYCBatchItem.item_key)
+                .limit(max(1, settings.BATCH_CHUNK_SIZE))
+                .all()
+            )
+            return [{"key": key, "paths": (front, back, selfie)} for key, front, back, selfie in rows]
+        finally:
+            db.close()
+
+    def _reader(self, run):
+        """Returns (read(path) -> bytes, close())."""
+        if run["source_kind"] == "zip":
+            archive = zipfile.ZipFile(run["source"])
+            return archive.read, archive.close
+        root = run["source"] if run["source_kind"] == "dir" else ""
+
+        def read(path):
+            with open(os.path.join(root, path), "rb") as f:
+                return f.read()
+        return read, lambda: None
+
+    async def _evaluate_chunk(self, items, pool, read, enroll=False):
+        """Returns one (response, selfie_embedding) or Exception per item."""
+        loop = asyncio.get_running_loop()
+
+        def on_pool(func, *args):
+            return loop.run_in_executor(pool, partial(func, *args))
+
+        def load(item):
+            # Bad inputs fail just their item, not the chunk
+            try:
+                images = [
+                    decode_image(read(path), os.path.basename(path))
+                    for path in item["paths"]
+                ]
+            except Exception as e:
+                return ValueError(f"Could not decode uploaded image: {e}")
+            try:
+                quality_gate.screen(dict(zip(("front", "back", "selfie"), images)))
+            except QualityRejected as e:
+                return e
+            return images
+
+        with span("batch.decode"):
+            loaded = await asyncio.gather(*(on_pool(load, item) for item in items))
+        ready = [i for i, images in enumerate(loaded) if not isinstance(images, Exception)]
+
+        # One verify_pairs call for every face in the chunk, OCR fanned out
+        # over the pool; the recognizer batcher pools the text-line crops
+        with span("batch.inference"):
+            face_results, *ocr_results = await asyncio.gather(
+                on_pool(face_engine.verify_pairs, [(loaded[i][0], loaded[i][2]) for i in ready], True),
+                *(on_pool(ocr_engine.extract_text, loaded[i][side], name)
+                  for i in ready for side, name in ((0, "front"), (1, "back"))),
+            )
+
+        request_ids = [str(uuid.uuid4()) for _ in ready]
+
+        async def finish(n, pending=None):
+            try:
+                # assess() pops the embeddings, so it gets a copy in case of a second pass
+                return await assess(request_ids[n], dict(face_results[n]), ocr_results[2 * n], ocr_results[2 * n + 1], pending)
+            except Exception as e:
+                return e
+
+        assessed = await asyncio.gather(*(finish(n) for n in range(len(ready))))
+        if enroll:
+            assessed = await self._check_within_chunk(assessed, finish)
+        outcomes = list(loaded)
+        for i, outcome in zip(ready, assessed):
+            outcomes[i] = outcome
+        return outcomes
+
+    @staticmethod
+    async def _check_within_chunk(assessed, finish):
+        """
+        Approved selfies only reach the gallery after their chunk commits, so
+        two items of one chunk showing the same face never saw each other.
+        Walks the chunk in order, as if each approval were enrolled at once,
+        and reassesses the (rare) approvals that come close to an earlier one.
+        """
+        threshold = settings.DUPLICATE_MATCH_THRESHOLD * 100
+        assessed = list(assessed)
+        pending = []
+        for n, outcome in enumerate(assessed):
+            if isinstance(outcome, Exception) or outcome[1] is None or outcome[0]["final_decision"] != "APPROVED":
+                continue
+            if pending and max(m["similarity"] for m in face_gallery.match_pending(outcome[1], pending)) >= threshold:
+                outcome = assessed[n] = await finish(n, list(pending))
+                if isinstance(outcome, Exception):
+                    continue
+            response, embedding = outcome
+            if response["final_decision"] == "APPROVED":
+                pending.append((embedding, response["request_id"], response["ocr_data"]["id_number"]))
+        return assessed
+
+    def _commit(self, run, items, outcomes):
+        """Writes a chunk in one transaction. False if another runner took the batch over."""
+        db = SessionLocal()
+        try:
+            with span("db_commit"):
+                renewed = self._owned(db, run).update({
+                    "lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.BATCH_LEASE_SECONDS),
+                }, synchronize_session=False)
+                if not renewed:
+                    db.rollback()
+                    return False
+                record_outcomes(db, [outcome[0] for outcome in outcomes if not isinstance(outcome, Exception)])
+                db.execute(update(KYCBatchItem), [
+                    {"batch_id": run["batch_id"], "item_key": item["key"], "status": "failed", "error": str(outcome)}
+                    if isinstance(outcome, Exception) else
+                    {"batch_id": run["batch_id"], "item_key": item["key"], "status": "done", "error": None,
+                     "request_id": outcome[0]["request_id"], "decision": outcome[0]["final_decision"]}
+                    for item, outcome in zip(items, outcomes)
+                ])
+                db.commit()
+                return True
+        finally:
+            db.close()
+
+    async def run(self, batch_id, retry_failed=False, on_chunk=None):
+        """
+        Processes every pending item of the batch. Returns False if another
+        runner holds it. `on_chunk(progress)` is called after each commit.
+        """
+        run = await asyncio.to_thread(self.claim, batch_id, retry_failed)
+        if run is None:
+            return False
+        # Counters must be seeded before the first bulk write, or they would start from zero
+        await asyncio.to_thread(metrics_store.ensure_seeded)
+
+        read, close = self._reader(run)
+        pool = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS or os.cpu_count() or 1, thread_name_prefix="kyc-batch")
+        status = "paused"
+        try:
+            while True:
+                items = await asyncio.to_thread(self._next_chunk, batch_id)
+                if not items:
+                    status = "done"
+                    break
+                regional_risk_index.refresh_if_stale()
+                outcomes = await self._evaluate_chunk(items, pool, read, run["enroll"])
+                if not await asyncio.to_thread(self._commit, run, items, outcomes):
+                    log.warning("Lost the batch lease; another runner owns it now", extra={"batch_id": batch_id})
+                    return False
+
+                failed = sum(isinstance(outcome, Exception) for outcome in outcomes)
+                BATCH_ITEMS.inc(len(items) - failed, status="done")
+                BATCH_ITEMS.inc(failed, status="failed")
+                if run["enroll"]:
+                    with span("gallery_enroll"):
+                        for outcome in outcomes:
+                            if not isinstance(outcome, Exception):
+                                await enroll(*outcome)
+                if on_chunk is not None:
+                    on_chunk(await asyncio.to_thread(self.get, batch_id))
+        finally:
+            # Also on cancellation (shutdown, Ctrl+C): frees the batch for an immediate resume
+            pool.shutdown(wait=False, cancel_futures=True)
+            close()
+            await asyncio.to_thread(self._release, run, status)
+        log.info("Batch finished", extra={"batch_id": batch_id})
+        return True
+
+    # --- Background runs (API) ---
+    def start(self, batch_id, retry_failed=False):
+        """Runs the batch as a task of this process; False if it is already running here."""
+        task = self._tasks.get(batch_id)
+        if task is not None and not task.done():
+            return False
+        self._tasks[batch_id] = asyncio.create_task(self._run_logged(batch_id, retry_failed))
+        return True
+
+    async def _run_logged(self, batch_id, retry_failed):
+        try:
+            if not await self.run(batch_id, retry_failed):
+                log.warning("Batch is held by another runner", extra={"batch_id": batch_id})
+        except Exception as e:
+            log.error("Batch run failed", extra={"batch_id": batch_id, "error": str(e)})
+        finally:
+            self._tasks.pop(batch_id, None)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get(self, batch_id, error_limit=20):
+        db = SessionLocal()
+        try:
+            batch = db.get(KYCBatch, batch_id)
+            if batch is None:
+                return None
+            counts = dict(
+                db.query(KYCBatchItem.status, func.count())
+                .filter(KYCBatchItem.batch_id == batch_id)
+                .group_by(KYCBatchItem.status)
+                .all()
+            )
+            decisions = dict(
+                db.query(KYCBatchItem.decision, func.count())
+                .filter(KYCBatchItem.batch_id == batch_id, KYCBatchItem.status == "done")
+                .group_by(KYCBatchItem.decision)
+                .all()
+            )
+            errors = (
+                db.query(KYCBatchItem.item_key, KYCBatchItem.error)
+                .filter(KYCBatchItem.batch_id == batch_id, KYCBatchItem.status == "failed")
+                .order_by(KYCBatchItem.item_key)
+                .limit(error_limit)
+                .all()
+            )
+            return {
+                "batch_id": batch.batch_id,
+                "status": batch.status,
+                "source_kind": batch.source_kind,
+                "enroll": batch.enroll,
+                "total": batch.total,
+                "skipped": batch.skipped,
+                "pending": counts.get("pending", 0),
+                "done": counts.get("done", 0),
+                "failed": counts.get("failed", 0),
+                "decisions": decisions,
+                "created_at": batch.created_at.isoformat() if batch.created_at else None,
+                "finished_at": batch.finished_at.isoformat() if batch.finished_at else None,
+                "errors": [{"item": key, "error": error} for key, error in errors],
+            }
+        finally:
+            db.close()
+
+batch_verifier = BatchVerifier()
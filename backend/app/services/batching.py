@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Collects work items from many threads and hands them to `process_batch`
+    in groups, so one model forward pass serves several concurrent requests.
+
+    A batch is flushed as soon as it holds `max_batch_size` items or the
+    oldest item has waited `max_wait_ms`, whichever comes first.
+    `process_batch` receives a list of items and must return a list of
+    results in the same order.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size=16, max_wait_ms=5.0):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        # Tuning stats
+        self._batch_sizes = Counter()
+        self._items_processed = 0
+        self._max_queue_depth = 0
+        self._busy_seconds = 0.0
+
+    # --- Public API ---
+    def submit(self, item) -> Future:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items) -> list:
+        """Enqueues items back to back so they tend to land in the same batch."""
+        self._ensure_worker()
+        futures = []
+        for item in items:
+            fut = Future()
+            self._queue.put((item, fut))
+            futures.append(fut)
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return futures
+
+    def run(self, item):
+        """Blocking helper: submit one item and wait for its result."""
+        return self.submit(item).result()
+
+    def run_many(self, items) -> list:
+        return [f.result() for f in self.submit_many(items)]
+
+    def stats(self) -> dict:
+        batches = sum(self._batch_sizes.values())
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_queue_depth,
+            "batches": batches,
+            "items": self._items_processed,
+            "avg_batch_size": round(self._items_processed / batches, 2) if batches else 0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            "busy_seconds": round(self._busy_seconds, 3),
+        }
+
+    # --- Worker ---
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a forked worker process starts its own
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already waiting without sleeping
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: got {len(results)} results for {len(items)} items")
+                for (_, fut), result in zip(batch, results):
+                    fut.set_result(result)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            finally:
+                self._busy_seconds += time.perf_counter() - started
+                self._batch_sizes[len(batch)] += 1
+                self._items_processed += len(batch)
@@ -0,0 +1,131 @@
+import re
+import threading
+from collections import deque
+from app.services.regional_risk import regional_risk_index
+
+# Common OCR confusions, folded the same way in patterns and scanned text
+OCR_FOLD = str.maketrans({"0": "O", "1": "I", "|": "I", "!": "I"})
+NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+def canonical(text: str) -> str:
+    """Upper-case, fold OCR look-alikes, collapse punctuation to single spaces."""
+    folded = text.upper().translate(OCR_FOLD)
+    return NON_ALNUM.sub(" ", folded).strip()
+
+class AhoCorasick:
+    """Multi-pattern automaton: every pattern occurrence in one pass over the text."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pattern_id)
+
+        # Breadth-first failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Yields (start, end, pattern_id) for every occurrence."""
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for pattern_id in self._out[state]:
+                yield i + 1 - len(self.patterns[pattern_id]), i + 1, pattern_id
+
+class DistrictMatcher:
+    """
+    Finds district (and state) names in back-side OCR text. Matches must sit
+    on word boundaries; among the district hits the winner is the one whose
+    state also appears in the text, then the longest, then the earliest.
+    """
+
+    def __init__(self, districts, states_for):
+        self.names = []   # canonical pattern -> original upper-case name
+        self.kinds = []   # "district" or "state"
+        patterns = []
+        seen = set()
+        all_states = set()
+        for district in sorted(districts):
+            pattern = canonical(district)
+            if pattern and (pattern, "district") not in seen:
+                seen.add((pattern, "district"))
+                patterns.append(pattern)
+                self.names.append(district)
+                self.kinds.append("district")
+            all_states.update(states_for(district))
+        for state in sorted(all_states):
+            pattern = canonical(state)
+            if pattern and (pattern, "state") not in seen:
+                seen.add((pattern, "state"))
+                patterns.append(pattern)
+                self.names.append(state)
+                self.kinds.append("state")
+        self.states_for = states_for
+        self.automaton = AhoCorasick(patterns)
+
+    def find(self, text):
+        """Returns the best district name (upper case) mentioned in `text`, or None."""
+        scan = f" {canonical(text)} "
+        districts, states = [], set()
+        for start, end, pattern_id in self.automaton.find_all(scan):
+            # Word boundaries (the scan text is space padded)
+            if scan[start - 1] != " " or scan[end] != " ":
+                continue
+            if self.kinds[pattern_id] == "state":
+                states.add(self.names[pattern_id])
+            else:
+                districts.append((start, end, self.names[pattern_id]))
+        if not districts:
+            return None
+
+        def rank(hit):
+            start, end, name = hit
+            with_state = bool(self.states_for(name) & states)
+            return (not with_state, -(end - start), start, name)
+
+        return min(districts, key=rank)[2]
+
+class LiveDistrictMatcher:
+    """Rebuilds the automaton whenever the regional risk index reloads."""
+
+    def __init__(self, index):
+        self.index = index
+        self._matcher = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def find(self, text):
+        if not self.index.loaded:
+            return None
+        if self._matcher is None or self._version != self.index.version:
+            with self._lock:
+                if self._matcher is None or self._version != self.index.version:
+                    version = self.index.version
+                    self._matcher = DistrictMatcher(list(self.index.district_names()), self.index.district_states)
+                    self._version = version
+        return self._matcher.find(text)
+
+district_matcher = LiveDistrictMatcher(regional_risk_index)
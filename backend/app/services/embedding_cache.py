@@ -0,0 +1,117 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.core.telemetry import log
+from app.database import SessionLocal, FaceEmbeddingCache
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for face embeddings.
+
+    Tier 1 is a bounded in-memory LRU, tier 2 (optional) is the
+    `face_embedding_cache` table in kyc.db so hits survive restarts.
+    Keys are the SHA-256 of the raw image bytes, prefixed with a namespace
+    so embeddings from different models never mix.
+    """
+
+    def __init__(self, max_items=2048, persist=True, namespace="facenet-vggface2"):
+        self.max_items = max(0, int(max_items))
+        self.persist = persist
+        self.namespace = namespace
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    # --- Keys ---
+    def key_for_digest(self, sha256_hex: str) -> str:
+        return f"{self.namespace}:{sha256_hex}"
+
+    def key_for_bytes(self, data: bytes) -> str:
+        return self.key_for_digest(hashlib.sha256(data).hexdigest())
+
+    def key_for_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return self.key_for_digest(digest.hexdigest())
+
+    # --- Lookups ---
+    def get(self, key):
+        """Returns (embedding, metadata) or None."""
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return hit
+
+        if self.persist:
+            try:
+                db = SessionLocal()
+                try:
+                    row = db.get(FaceEmbeddingCache, key)
+                finally:
+                    db.close()
+                if row is not None:
+                    entry = (np.frombuffer(row.embedding, dtype=np.float32).copy(), {"face_detected": bool(row.face_detected)})
+                    self._remember(key, entry)
+                    with self._lock:
+                        self.counters["disk_hits"] += 1
+                    return entry
+            except Exception as e:
+                log.warning("Embedding cache read failed", extra={"error": str(e)})
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key, embedding, metadata):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self._remember(key, (embedding, dict(metadata)))
+        with self._lock:
+            self.counters["stores"] += 1
+
+        if self.persist:
+            try:
+                db = SessionLocal()
+                try:
+                    db.merge(FaceEmbeddingCache(
+                        key=key,
+                        embedding=embedding.tobytes(),
+                        face_detected=bool(metadata.get("face_detected")),
+                    ))
+                    db.commit()
+                finally:
+                    db.close()
+            except Exception as e:
+                log.warning("Embedding cache write failed", extra={"error": str(e)})
+
+    def _remember(self, key, entry):
+        if self.max_items == 0:
+            return
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """Empties the in-memory tier (the persisted table is left alone)."""
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._items)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "memory_items": size,
+            "max_items": self.max_items,
+            "persist": self.persist,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+        }
@@ -0,0 +1,275 @@
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from sqlalchemy import func
+from app.core.config import settings
+from app.core.telemetry import log
+from app.database import SessionLocal, FaceGalleryEntry
+from app.services.ann_index import IVFIndex
+
+EMBEDDING_DIM = 512
+
+class FaceGallery:
+    """
+    Every approved selfie embedding, stored as one contiguous, L2-normalized
+    float32 matrix on disk. Rows are appended incrementally and the file is
+    memory-mapped for search, so a few million faces never become Python
+    objects. Row metadata (request_id, id_number) lives in `face_gallery`.
+
+    Writers from any number of processes serialize on an flock of the file;
+    a row only becomes visible to search once its metadata has committed.
+    """
+
+    def __init__(self, path, dim=EMBEDDING_DIM, block_rows=65536, index_path=None,
+                 ann_min_rows=200000, nprobe=16, save_every=1000):
+        self.path = path
+        self.dim = dim
+        self.block_rows = max(1, int(block_rows))
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._matrix_rows = -1
+        self._repaired = False
+
+        # Optional IVF index (see ann_index.py)
+        self.index_path = index_path
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self.save_every = save_every
+        self._index = None
+        self._index_checked = False
+
+    # --- Storage ---
+    @property
+    def row_bytes(self):
+        return self.dim * 4
+
+    def _file_rows(self):
+        try:
+            return os.path.getsize(self.path) // self.row_bytes
+        except OSError:
+            return 0
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive flock on the vector file, held across processes (released on close)."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _committed_rows():
+        """Rows with committed metadata (row indices are allocated densely from 0)."""
+        db = SessionLocal()
+        try:
+            last = db.query(func.max(FaceGalleryEntry.row_index)).scalar()
+        finally:
+            db.close()
+        return 0 if last is None else last + 1
+
+    def _reconcile(self, fd):
+        """
+        Aligns the file with the metadata; the caller holds the write lock.
+        Vectors past the last committed row (a crash or failed insert
+        mid-append) are never visible and get overwritten by the next add.
+        Metadata whose vector is missing gets a zero row, which matches
+        nothing, so the row indices after it stay valid. Nothing with
+        committed metadata is ever truncated.
+        """
+        known = self._committed_rows()
+        file_rows = os.fstat(fd).st_size // self.row_bytes
+        if file_rows < known:
+            log.warning("Face gallery file is missing rows that have metadata, padding with zero vectors",
+                        extra={"file_rows": file_rows, "metadata_rows": known})
+            os.ftruncate(fd, known * self.row_bytes)
+        elif file_rows > known:
+            log.info("Face gallery has uncommitted rows past the metadata, they will be overwritten",
+                     extra={"file_rows": file_rows, "metadata_rows": known})
+        return known
+
+    def _repair(self):
+        with self._write_lock() as fd:
+            self._reconcile(fd)
+        self._repaired = True
+
+    def matrix(self):
+        """Read-only (N, dim) memmap view over committed rows, remapped only when that grew."""
+        if not self._repaired:
+            with self._lock:
+                if not self._repaired:
+                    self._repair()
+        rows = min(self._file_rows(), self._committed_rows())
+        if rows != self._matrix_rows:
+            self._matrix = (
+                np.memmap(self.path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+                if rows else np.empty((0, self.dim), dtype=np.float32)
+            )
+            self._matrix_rows = rows
+        return self._matrix
+
+    def __len__(self):
+        return self.matrix().shape[0]
+
+    @staticmethod
+    def normalize(embedding):
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def add(self, embedding, request_id, id_number=None) -> int:
+        """Appends one embedding and returns its row index."""
+        vec = self.normalize(embedding)
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-d embedding, got {vec.shape[0]}")
+
+        with self._lock, self._write_lock() as fd:
+            # Allocate under the cross-process lock, so concurrent workers
+            # never pick the same row
+            row_index = self._reconcile(fd)
+            self._repaired = True
+            os.pwrite(fd, vec.tobytes(), row_index * self.row_bytes)
+            db = SessionLocal()
+            try:
+                db.add(FaceGalleryEntry(row_index=row_index, request_id=request_id, id_number=id_number))
+                db.commit()
+            finally:
+                db.close()
+        return row_index
+
+    # --- Approximate index ---
+    def _ann_index(self, matrix):
+        """Loads the IVF index once and inserts any rows approved since it was saved."""
+        if not self.index_path:
+            return None
+        with self._lock:
+            if not self._index_checked:
+                self._index_checked = True
+                if os.path.exists(self.index_path):
+                    try:
+                        self._index = IVFIndex.load(self.index_path)
+                        log.info("Face ANN index loaded", extra={"rows": self._index.indexed_rows})
+                    except Exception as e:
+                        log.warning("Could not load the face ANN index", extra={"error": str(e)})
+            index = self._index
+            if index is None:
+                return None
+            n = matrix.shape[0]
+            if index.indexed_rows < n:
+                index.add(matrix[index.indexed_rows:n], index.indexed_rows)
+            if index.pending >= self.save_every:
+                index.save(self.index_path)
+        return index
+
+    def build_index(self, nlist=1024, **train_kwargs):
+        """Offline build over the whole gallery; replaces any existing index file."""
+        matrix = self.matrix()
+        index = IVFIndex(dim=self.dim, nlist=nlist).build(matrix, block_rows=self.block_rows, **train_kwargs)
+        index.save(self.index_path)
+        with self._lock:
+            self._index = index
+            self._index_checked = True
+        return index
+
+    # --- Search ---
+    def top_k_rows(self, embedding, top_k=5, exact=False):
+        """
+        Cosine top-k over the gallery. Returns (row_indices, similarities), best first.
+        Small galleries (or exact=True) get the blocked exact scan; large ones
+        go through the IVF index when one has been built.
+        """
+        matrix = self.matrix()
+        if not exact and matrix.shape[0] >= self.ann_min_rows:
+            index = self._ann_index(matrix)
+            if index is not None:
+                return index.search(self.normalize(embedding), matrix, top_k, self.nprobe)
+        return self.exact_top_k_rows(embedding, top_k)
+
+    def exact_top_k_rows(self, embedding, top_k=5):
+        """Exact cosine top-k: one matrix-vector product per block of rows."""
+        matrix = self.matrix()
+        n = matrix.shape[0]
+        if n == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = self.normalize(embedding)
+        best_rows = np.empty(0, dtype=np.int64)
+        best_sims = np.empty(0, dtype=np.float32)
+        for start in range(0, n, self.block_rows):
+            sims = matrix[start:start + self.block_rows] @ query
+            k = min(top_k, sims.shape[0])
+            idx = np.argpartition(-sims, k - 1)[:k]
+            best_rows = np.concatenate([best_rows, idx + start])
+            best_sims = np.concatenate([best_sims, sims[idx]])
+            if best_rows.shape[0] > top_k:
+                keep = np.argpartition(-best_sims, top_k - 1)[:top_k]
+                best_rows, best_sims = best_rows[keep], best_sims[keep]
+
+        order = np.argsort(-best_sims)
+        return best_rows[order], best_sims[order]
+
+    def search(self, embedding, top_k=5, id_number=None):
+        """Top-k most similar prior identities, with their metadata."""
+        rows, sims = self.top_k_rows(embedding, top_k)
+        if rows.shape[0] == 0:
+            return []
+
+        db = SessionLocal()
+        try:
+            entries = db.query(FaceGalleryEntry).filter(FaceGalleryEntry.row_index.in_([int(r) for r in rows])).all()
+        finally:
+            db.close()
+        meta = {e.row_index: e for e in entries}
+
+        matches = []
+        for row, sim in zip(rows, sims):
+            entry = meta.get(int(row))
+            if entry is None:
+                continue
+            matches.append({
+                "request_id": entry.request_id,
+                "id_number": entry.id_number,
+                "similarity": round(float(sim) * 100, 2),
+                "same_id_number": bool(id_number and entry.id_number == id_number),
+            })
+        return matches
+
+    def match_pending(self, embedding, pending, id_number=None):
+        """Matches against [(embedding, request_id, id_number), ...] approved but not enrolled yet."""
+        query = self.normalize(embedding)
+        sims = np.stack([self.normalize(e) for e, _, _ in pending]) @ query
+        return [{
+            "request_id": request_id,
+            "id_number": other_id,
+            "similarity": round(float(sim) * 100, 2),
+            "same_id_number": bool(id_number and other_id == id_number),
+        } for (_, request_id, other_id), sim in zip(pending, sims)]
+
+    def check_duplicate(self, embedding, id_number=None, top_k=5, threshold=0.80, pending=None):
+        """
+        A face is a duplicate suspect if it matches a prior identity under a
+        different ID number. `pending` adds identities that will be enrolled
+        but are not in the gallery yet (earlier items of a batch chunk).
+        """
+        matches = self.search(embedding, top_k, id_number)
+        if pending:
+            matches = sorted(matches + self.match_pending(embedding, pending, id_number),
+                             key=lambda m: -m["similarity"])[:top_k]
+        suspects = [m for m in matches if m["similarity"] >= threshold * 100 and not m["same_id_number"]]
+        return {
+            "duplicate_suspect": bool(suspects),
+            "gallery_size": len(self),
+            "matches": matches,
+        }
+
+face_gallery = FaceGallery(
+    settings.FACE_GALLERY_PATH,
+    block_rows=settings.GALLERY_SCAN_BLOCK_ROWS,
+    index_path=settings.FACE_INDEX_PATH,
+    ann_min_rows=settings.FACE_ANN_MIN_ROWS,
+    nprobe=settings.FACE_ANN_NPROBE,
+    save_every=settings.FACE_ANN_SAVE_EVERY,
+)
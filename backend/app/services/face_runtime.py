@@ -0,0 +1,72 @@
+import torch
+import torch.nn as nn
+from app.core.config import settings
+
+FACE_BACKENDS = ("eager", "quantized", "torchscript", "compile", "onnx")
+
+def configure_torch_threads():
+    """Applies TORCH_NUM_THREADS / TORCH_INTEROP_THREADS (0 keeps PyTorch's default)."""
+    if settings.TORCH_NUM_THREADS > 0:
+        torch.set_num_threads(settings.TORCH_NUM_THREADS)
+    if settings.TORCH_INTEROP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.TORCH_INTEROP_THREADS)
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel call in the process
+            pass
+
+def _trace(module, example):
+    with torch.no_grad():
+        return torch.jit.trace(module.eval(), example, check_trace=False)
+
+def _freeze(module, example):
+    return torch.jit.freeze(_trace(module, example))
+
+def build_recognizer(backend):
+    """Creates the recognizer for a backend (the ONNX graph skips loading torch weights)."""
+    if backend == "onnx":
+        from app.services.onnx_backend import OnnxModule
+        return OnnxModule("facenet")
+    from facenet_pytorch import InceptionResnetV1
+    return optimize_recognizer(InceptionResnetV1(pretrained='vggface2').eval(), backend)
+
+def optimize_recognizer(resnet, backend):
+    """
+    Returns the InceptionResnetV1 to run for the given backend.
+
+    - eager:       unchanged float32 module
+    - quantized:   dynamic int8 for the Linear layers (weights int8, activations
+                   quantized on the fly); conv layers stay float32
+    - torchscript: traced and frozen graph (constants folded, no Python dispatch)
+    - compile:     torch.compile with dynamic batch sizes
+    """
+    resnet = resnet.eval()
+    if backend == "quantized":
+        return torch.ao.quantization.quantize_dynamic(resnet, {nn.Linear}, dtype=torch.qint8)
+    if backend == "torchscript":
+        return _freeze(resnet, torch.zeros(2, 3, 160, 160))
+    if backend == "compile":
+        return torch.compile(resnet, dynamic=True)
+    return resnet
+
+def optimize_mtcnn(mtcnn, backend):
+    """Swaps the P/R/O-Net stages of a facenet_pytorch MTCNN in place."""
+    if backend == "quantized":
+        for name in ("rnet", "onet"):
+            setattr(mtcnn, name, torch.ao.quantization.quantize_dynamic(getattr(mtcnn, name).eval(), {nn.Linear}, dtype=torch.qint8))
+    elif backend == "torchscript":
+        # P-Net is fully convolutional, so one trace serves every pyramid scale.
+        # Traced but not frozen: facenet_pytorch reads next(pnet.parameters()).dtype
+        mtcnn.pnet = _trace(mtcnn.pnet, torch.zeros(1, 3, 64, 64))
+        mtcnn.rnet = _trace(mtcnn.rnet, torch.zeros(2, 3, 24, 24))
+        mtcnn.onet = _trace(mtcnn.onet, torch.zeros(2, 3, 48, 48))
+    elif backend == "compile":
+        for name in ("pnet", "rnet", "onet"):
+            setattr(mtcnn, name, torch.compile(getattr(mtcnn, name), dynamic=True))
+    elif backend == "onnx":
+        from app.services.onnx_backend import OnnxModule
+        for name in ("pnet", "rnet", "onet"):
+            # MTCNN is an nn.Module, so bypass its submodule type check
+            mtcnn._modules.pop(name, None)
+            object.__setattr__(mtcnn, name, OnnxModule(name))
+    return mtcnn
@@ -1,15 +1,26 @@
 import torch
-from facenet_pytorch import MTCNN, InceptionResnetV1, fixed_image_standardization
+from facenet_pytorch import MTCNN
 from PIL import Image
 from sklearn.metrics.pairwise import cosine_similarity
-import os
 import torchvision.transforms as transforms
 import numpy as np
+from app.core.config import settings
+from app.core.lifecycle import model_registry
+from app.core.telemetry import log, span, FACE_FALLBACKS, FACE_ERRORS
+from app.services.batching import MicroBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.image_io import as_decoded
+from app.services.face_runtime import FACE_BACKENDS, configure_torch_threads, build_recognizer, optimize_mtcnn
 
 class FaceService:
-    def __init__(self):
-        print("⚡ Loading Advanced Face Model (FaceNet)...")
+    def __init__(self, backend=None):
+        self.backend = backend or settings.FACE_BACKEND
+        log.info("Loading face model (FaceNet)", extra={"backend": self.backend})
         try:
+            if self.backend not in FACE_BACKENDS:
+                raise ValueError(f"Unknown FACE_BACKEND '{self.backend}', expected one of {FACE_BACKENDS}")
+            configure_torch_threads()
+
             # 1. MTCNN: Face Detector (Tune thresholds to be more sensitive)
             self.mtcnn = MTCNN(
                 keep_all=False, 
@@ -19,78 +30,227 @@ class FaceService:
             )
             
             # 2. InceptionResnet: The Recognizer
-            self.resnet = InceptionResnetV1(pretrained='vggface2').eval()
+            # (eager by default, or an optimized path: int8 / TorchScript / torch.compile / ONNX)
+            self.resnet = build_recognizer(self.backend)
+            optimize_mtcnn(self.mtcnn, self.backend)
+
+            # 3. Batching schedulers: one MTCNN call and one ResNet pass serve many requests
+            self.detector = MicroBatcher(
+                "mtcnn",
+                self._detect_batch,
+                max_batch_size=settings.FACE_DETECT_BATCH_MAX_SIZE,
+                max_wait_ms=settings.FACE_DETECT_BATCH_MAX_WAIT_MS,
+            )
+            self.embedder = MicroBatcher(
+                "facenet",
+                self._embed_batch,
+                max_batch_size=settings.FACE_BATCH_MAX_SIZE,
+                max_wait_ms=settings.FACE_BATCH_MAX_WAIT_MS,
+            )
+
+            # 4. Content-addressed embedding cache (retries skip inference entirely)
+            # (namespaced per backend: optimized embeddings differ slightly from eager)
+            self.cache = EmbeddingCache(
+                max_items=settings.EMBEDDING_CACHE_SIZE,
+                persist=settings.EMBEDDING_CACHE_PERSIST,
+                namespace=f"facenet-vggface2-{self.backend}",
+            )
             
-            print("   ✅ FaceNet Model Loaded!")
+            log.info("Face model loaded", extra={"backend": self.backend})
             
         except Exception as e:
-            print(f"❌ Critical Error Loading Face Model: {e}")
+            log.error("Could not load the face model", extra={"backend": self.backend, "error": str(e)})
             raise e
 
-    def get_embedding(self, image_path: str):
-        try:
-            filename = os.path.basename(image_path)
-            print(f"🔍 Processing: {filename}...")
-            
-            # Load Image
-            img = Image.open(image_path).convert('RGB')
-            
-            # 1. Try to detect face
-            # We use save_path=None to get the tensor directly
-            face_tensor = self.mtcnn(img)
-            
+    def _letterbox(self, img):
+        """Scales an image onto the shared square detection canvas. Returns (canvas, scale)."""
+        size = settings.FACE_DETECT_CANVAS
+        scale = size / max(img.size)
+        resized = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))))
+        canvas = Image.new('RGB', (size, size))
+        canvas.paste(resized, (0, 0))
+        return canvas, scale
+
+    def _detect_batch(self, images):
+        """
+        Runs the P/R/O-Net cascade once for a list of PIL images and returns
+        the aligned face tensor for each (None where no face was found).
+        Detection happens on the canvas, cropping on the original pixels.
+        """
+        with span("face.detect"):
+            canvases, scales = zip(*(self._letterbox(img) for img in images))
+            try:
+                batch_boxes, _ = self.mtcnn.detect(list(canvases))
+            except Exception as e:
+                # Older facenet_pytorch builds choke on mixed hit/miss batches
+                log.warning("Batched detection failed, detecting one by one", extra={"error": str(e)})
+                batch_boxes = [self.mtcnn.detect(canvas)[0] for canvas in canvases]
+
+        faces = []
+        for img, scale, boxes in zip(images, scales, batch_boxes):
+            if boxes is None or len(boxes) == 0:
+                faces.append(None)
+                continue
+            boxes = np.asarray(boxes, dtype=np.float32)
+            # Same rule as MTCNN(select_largest=True): keep the biggest face
+            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            box = boxes[[int(np.argmax(areas))]] / scale
+            faces.append(self.mtcnn.extract(img, box, None))
+        return faces
+
+    def _fallback_face(self, img):
+        # Resize to 160x160 (Required by FaceNet)
+        img_resized = img.resize((160, 160))
+        
+        # Convert to Tensor (0-1 range)
+        to_tensor = transforms.ToTensor()
+        face_tensor = to_tensor(img_resized)
+        
+        # Scale to 0-255 roughly for standardization, then normalize
+        # Formula: (x - 127.5) / 128.0
+        return (face_tensor * 255 - 127.5) / 128.0
+
+    def _prepare_faces(self, images):
+        """
+        Takes decoded images and returns one (face_tensor, face_detected) pair
+        per image, where face_tensor is the aligned (3, 160, 160) crop.
+        """
+        names = [image.name for image in images]
+        images = [image.pil() for image in images]
+        for name in names:
+            log.debug("Processing face image", extra={"image": name})
+
+        # 1. Try to detect faces (all images in one detection batch)
+        detected = iter(self.detector.run_many(images)) if images else iter(())
+
+        faces = []
+        for filename, img in zip(names, images):
+            face_tensor = next(detected)
+            face_detected = face_tensor is not None
+
             # 2. FALLBACK: If no face detected, force-process the whole image
             if face_tensor is None:
-                print(f"   ⚠️ No face detected in {filename}. Using FALLBACK (Full Image).")
-                
-                # Resize to 160x160 (Required by FaceNet)
-                img_resized = img.resize((160, 160))
-                
-                # Convert to Tensor (0-1 range)
-                to_tensor = transforms.ToTensor()
-                face_tensor = to_tensor(img_resized)
-                
-                # Scale to 0-255 roughly for standardization, then normalize
-                # Formula: (x - 127.5) / 128.0
-                face_tensor = (face_tensor * 255 - 127.5) / 128.0
+                FACE_FALLBACKS.inc()
+                log.debug("No face detected, using full-image fallback", extra={"image": filename})
+                face_tensor = self._fallback_face(img)
             else:
-                print(f"   ✅ Face Detected in {filename}!")
-
-            # 3. Get Embedding
-            # Add batch dimension (1, 3, 160, 160)
-            if face_tensor.dim() == 3:
-                face_tensor = face_tensor.unsqueeze(0)
-                
-            with torch.no_grad():
-                embedding = self.resnet(face_tensor)
-            
-            return embedding.squeeze().numpy()
+                log.debug("Face detected", extra={"image": filename})
+
+            if face_tensor.dim() == 4:
+                face_tensor = face_tensor.squeeze(0)
+            faces.append((face_tensor, face_detected))
+        return faces
 
+    def _embed_batch(self, face_tensors):
+        """One (N, 3, 160, 160) forward pass; called by the batcher thread."""
+        with span("face.embed"), torch.no_grad():
+            embeddings = self.resnet(torch.stack(face_tensors))
+        return list(embeddings.numpy())
+
+    def _compute_embeddings(self, images):
+        """Full inference path. Returns (embedding, metadata) per image, None on error."""
+        try:
+            faces = self._prepare_faces(images)
         except Exception as e:
-            print(f"Error processing face: {e}")
-            return None
+            FACE_ERRORS.inc(len(images))
+            log.warning("Error processing face", extra={"error": str(e)})
+            return [None] * len(images)
+
+        # 3. Get Embeddings (submitted together so they share a batch)
+        futures = self.embedder.submit_many([f[0] for f in faces])
+        results = []
+        for future, face in zip(futures, faces):
+            try:
+                results.append((future.result(), {"face_detected": face[1]}))
+            except Exception as e:
+                FACE_ERRORS.inc()
+                log.warning("Error processing face", extra={"error": str(e)})
+                results.append(None)
+        return results
+
+    def get_embeddings(self, images, with_meta=False):
+        """
+        Embeds several images at once; failed images come back as None.
+        Accepts DecodedImage objects (decoded once, shared with OCR) or file paths.
+        With with_meta=True each entry is an (embedding, metadata) pair.
+        """
+        decoded = []
+        for image in images:
+            try:
+                decoded.append(as_decoded(image))
+            except Exception as e:
+                FACE_ERRORS.inc()
+                log.warning("Error processing face", extra={"error": str(e)})
+                decoded.append(None)
+
+        # 0. Cache lookup by content hash, before any inference
+        with span("face.cache_lookup"):
+            keys = [self.cache.key_for_digest(image.sha256) if image is not None else None for image in decoded]
+            entries = [self.cache.get(key) if key else None for key in keys]
+
+        misses = []
+        for i, entry in enumerate(entries):
+            if entry is None and keys[i]:
+                try:
+                    decoded[i].pixels  # decode only on a miss
+                    misses.append(i)
+                except Exception as e:
+                    FACE_ERRORS.inc()
+                    log.warning("Error processing face", extra={"error": str(e)})
+        if misses:
+            computed = self._compute_embeddings([decoded[i] for i in misses])
+            for i, entry in zip(misses, computed):
+                if entry is not None:
+                    self.cache.put(keys[i], *entry)
+                    entries[i] = entry
+
+        if with_meta:
+            return entries
+        return [entry[0] if entry else None for entry in entries]
+
+    def get_embedding(self, image):
+        return self.get_embeddings([image])[0]
+
+    def verify_faces(self, id_card, selfie, return_embeddings=False):
+        return self.verify_pairs([(id_card, selfie)], return_embeddings)[0]
 
-    def verify_faces(self, id_card_path, selfie_path):
-        vec1 = self.get_embedding(id_card_path)
-        vec2 = self.get_embedding(selfie_path)
+    def verify_pairs(self, pairs, return_embeddings=False):
+        """
+        verify_faces for many (id_card, selfie) pairs: every image goes into
+        one get_embeddings call, so detection and embedding run in full batches.
+        """
+        vectors = self.get_embeddings([image for pair in pairs for image in pair])
+        return [
+            self._match(vectors[2 * i], vectors[2 * i + 1], return_embeddings)
+            for i in range(len(pairs))
+        ]
 
+    def _match(self, vec1, vec2, return_embeddings):
         if vec1 is None or vec2 is None:
-            return {"match": False, "score": 0.0, "error": "Could not process image"}
+            result = {"match": False, "score": 0.0, "error": "Could not process image"}
+            if return_embeddings:
+                result["embeddings"] = (vec1, vec2)
+            return result
 
         # Calculate Similarity
         raw_score = cosine_similarity(vec1.reshape(1, -1), vec2.reshape(1, -1))[0][0]
         score = float(raw_score) 
         match_percentage = round(score * 100, 2)
         
-        print(f"📊 Match Score: {match_percentage}%")
+        log.debug("Face match score", extra={"score": match_percentage})
         
         # Threshold
         is_match = match_percentage > 50.0 
         
-        return {
+        result = {
             "match": is_match,
             "score": float(match_percentage),
             "error": None
         }
+        # Internal callers (duplicate search) reuse the vectors; not JSON-serializable
+        if return_embeddings:
+            result["embeddings"] = (vec1, vec2)
+        return result
 
-face_engine = FaceService()
\ No newline at end of file
+# Loaded on first use or by the warm-up in main.py's lifespan
+face_engine = model_registry.register("face", FaceService)
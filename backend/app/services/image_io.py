@@ -0,0 +1,64 @@
+import hashlib
+import io
+import os
+import threading
+import numpy as np
+from app.core.telemetry import log
+from PIL import Image
+
+class DecodedImage:
+    """
+    One upload, decoded at most once. `data` keeps the original bytes (for
+    hashing and the optional audit copy); `pixels` is the HxWx3 uint8 RGB
+    buffer that the face and OCR stages both read from. Decoding happens on
+    first access, so an embedding-cache hit never pays for it.
+    """
+
+    def __init__(self, data: bytes, name="upload", pixels=None):
+        self.data = data
+        self.name = name
+        self._pixels = pixels
+        self._sha256 = None
+        self._lock = threading.Lock()
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def pixels(self) -> np.ndarray:
+        if self._pixels is None:
+            with self._lock:
+                if self._pixels is None:
+                    self._pixels = np.asarray(Image.open(io.BytesIO(self.data)).convert('RGB'))
+        return self._pixels
+
+    def pil(self) -> Image.Image:
+        # Wraps the shared buffer; no second JPEG decode
+        return Image.fromarray(self.pixels)
+
+def decode_image(data: bytes, name="upload") -> DecodedImage:
+    """Decodes eagerly (e.g. on the inference pool, before fanning out)."""
+    image = DecodedImage(data, name)
+    image.pixels
+    return image
+
+def load_image(path: str) -> DecodedImage:
+    """Reads a file once; decoding is deferred until pixels are needed."""
+    with open(path, "rb") as f:
+        return DecodedImage(f.read(), os.path.basename(path))
+
+def as_decoded(image) -> DecodedImage:
+    return image if isinstance(image, DecodedImage) else load_image(image)
+
+def persist_uploads(files):
+    """Audit copy of the original uploads: [(path, bytes), ...]. Runs as a background task."""
+    for path, data in files:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as buffer:
+                buffer.write(data)
+        except Exception as e:
+            log.warning("Could not persist upload", extra={"path": path, "error": str(e)})
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from app.core.config import settings
+from app.core.telemetry import log, span, REQUEST_SECONDS
+from app.database import SessionLocal, KYCJob
+from app.services.kyc_pipeline import decode_uploads, evaluate, record_outcome, enroll
+from app.services.quality_gate import QualityRejected
+
+FINAL_STATUSES = ("done", "failed")
+
+class QueueFull(Exception):
+    pass
+
+class JobQueue:
+    """
+    Durable KYC work queue in the kyc_jobs table.
+
+    Claims are optimistic (UPDATE ... WHERE status/attempts still match), so
+    several API processes can pull from the same kyc.db. A claim holds a
+    lease; if the worker dies, the job becomes claimable again once the
+    lease expires, until KYC_JOB_MAX_ATTEMPTS is used up. The attempt
+    number doubles as a fencing token: a worker that lost its lease can no
+    longer complete or fail the job.
+    """
+
+    def save_inputs(self, request_id, front_bytes, back_bytes, selfie_bytes):
+        """Writes the uploads where the audit copies go; returns the three paths."""
+        paths = (
+            f"uploads/id_cards/{request_id}_front.jpg",
+            f"uploads/id_cards/{request_id}_back.jpg",
+            f"uploads/selfies/{request_id}_selfie.jpg",
+        )
+        for path, data in zip(paths, (front_bytes, back_bytes, selfie_bytes)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        return paths
+
+    @staticmethod
+    def discard_inputs(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def queued_count(self, db):
+        return db.query(KYCJob).filter(KYCJob.status == "queued").count()
+
+    def has_capacity(self):
+        db = SessionLocal()
+        try:
+            return self.queued_count(db) < settings.KYC_JOB_QUEUE_MAX
+        finally:
+            db.close()
+
+    def enqueue(self, request_id, paths, priority=0):
+        db = SessionLocal()
+        try:
+            queued = self.queued_count(db)
+            if queued >= settings.KYC_JOB_QUEUE_MAX:
+                raise QueueFull(f"{queued} jobs already queued")
+            front_path, back_path, selfie_path = paths
+            db.add(KYCJob(
+                request_id=request_id,
+                priority=priority,
+                front_path=front_path,
+                back_path=back_path,
+                selfie_path=selfie_path,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def claim(self):
+        """Takes the next job (highest priority, oldest first); None when idle."""
+        db = SessionLocal()
+        try:
+            # A few tries: another worker may win the same row
+            for _ in range(5):
+                now = datetime.utcnow()
+                job = (
+                    db.query(KYCJob)
+                    .filter(or_(
+                        KYCJob.status == "queued",
+                        and_(KYCJob.status == "running", KYCJob.lease_expires_at < now),
+                    ))
+                    .order_by(KYCJob.priority.desc(), KYCJob.created_at)
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                # Snapshot before the commit below expires the ORM object
+                snapshot = {
+                    "request_id": job.request_id,
+                    "attempts": job.attempts + 1,
+                    "paths": (job.front_path, job.back_path, job.selfie_path),
+                }
+                owned = (KYCJob.request_id == job.request_id, KYCJob.status == job.status, KYCJob.attempts == job.attempts)
+                if job.attempts >= settings.KYC_JOB_MAX_ATTEMPTS:
+                    # Its worker kept dying mid-job; stop retrying
+                    db.query(KYCJob).filter(*owned).update({
+                        "status": "failed",
+                        "error": f"Gave up after {job.attempts} attempts (lease expired)",
+                        "finished_at": now,
+                        "lease_expires_at": None,
+                    }, synchronize_session=False)
+                    db.commit()
+                    continue
+
+                claimed = db.query(KYCJob).filter(*owned).update({
+                    "status": "running",
+                    "attempts": snapshot["attempts"],
+                    "lease_expires_at": now + timedelta(seconds=settings.KYC_JOB_LEASE_SECONDS),
+                    "started_at": now,
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    return snapshot
+            return None
+        finally:
+            db.close()
+
+    def _owned(self, db, job):
+        return db.query(KYCJob).filter(
+            KYCJob.request_id == job["request_id"],
+            KYCJob.status == "running",
+            KYCJob.attempts == job["attempts"],
+        )
+
+    def complete(self, db, job, response):
+        """Marks the job done inside the caller's transaction. False if the lease was lost."""
+        return self._owned(db, job).update({
+            "status": "done",
+            "result": json.dumps(response, default=str),
+            "error": None,
+            "finished_at": datetime.utcnow(),
+            "lease_expires_at": None,
+        }, synchronize_session=False) == 1
+
+    def fail(self, job, error, retry=True):
+        """Requeues the job (if attempts remain and retry is set) or marks it failed."""
+        db = SessionLocal()
+        try:
+            final = not retry or job["attempts"] >= settings.KYC_JOB_MAX_ATTEMPTS
+            self._owned(db, job).update({
+                "status": "failed" if final else "queued",
+                "error": error,
+                "finished_at": datetime.utcnow() if final else None,
+                "lease_expires_at": None,
+            }, synchronize_session=False)
+            db.commit()
+            return final
+        finally:
+            db.close()
+
+    def get(self, request_id):
+        db = SessionLocal()
+        try:
+            job = db.query(KYCJob).filter(KYCJob.request_id == request_id).first()
+            if job is None:
+                return None
+            body = {
+                "request_id": job.request_id,
+                "status": job.status,
+                "priority": job.priority,
+                "attempts": job.attempts,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "started_at": job.started_at.isoformat() if job.started_at else None,
+                "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+                "error": job.error,
+                "result": json.loads(job.result) if job.result else None,
+            }
+            if job.status == "queued":
+                # Jobs that will be claimed before this one
+                body["queue_position"] = db.query(KYCJob).filter(
+                    KYCJob.status == "queued",
+                    or_(
+                        KYCJob.priority > job.priority,
+                        and_(KYCJob.priority == job.priority, KYCJob.created_at < job.created_at),
+                    ),
+                ).count()
+            return body
+        finally:
+            db.close()
+
+class JobWorkers:
+    """Asyncio workers that drain the queue through the shared inference pool."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self._tasks = []
+        self._wake = None
+
+    def start(self, count):
+        if count <= 0 or self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(slot)) for slot in range(count)]
+        log.info("Started KYC job workers", extra={"workers": count})
+
+    def notify(self):
+        """New work was enqueued by this process; skip the poll delay."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, slot):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim)
+            except Exception as e:
+                log.warning("Job worker could not claim", extra={"slot": slot, "error": str(e)})
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.KYC_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                with span("verify", REQUEST_SECONDS, mode="job"):
+                    await self._process(job)
+            except Exception as e:
+                # Never let one job take the worker down; the lease brings the job back
+                log.error("Job worker error", extra={"slot": slot, "request_id": job["request_id"], "error": str(e)})
+
+    def _read(self, paths):
+        data = []
+        for path in paths:
+            with open(path, "rb") as f:
+                data.append(f.read())
+        return data
+
+    def _commit(self, job, response):
+        # KYCRecord and job completion land together, so a retry never double-writes
+        db = SessionLocal()
+        try:
+            with span("db_commit"):
+                record_outcome(db, response)
+                if not self.queue.complete(db, job, response):
+                    db.rollback()
+                    return False
+                db.commit()
+                return True
+        finally:
+            db.close()
+
+    async def _process(self, job):
+        request_id = job["request_id"]
+        log.debug("Processing job", extra={"request_id": request_id, "attempt": job["attempts"]})
+
+        # Bad inputs will not get better on retry
+        try:
+            front_bytes, back_bytes, selfie_bytes = await asyncio.to_thread(self._read, job["paths"])
+            front_img, back_img, selfie_img = await decode_uploads(request_id, front_bytes, back_bytes, selfie_bytes)
+        except Exception as e:
+            await asyncio.to_thread(self.queue.fail, job, f"Could not decode uploaded image: {e}", False)
+            return
+
+        try:
+            response, selfie_embedding = await evaluate(request_id, front_img, back_img, selfie_img)
+            if not await asyncio.to_thread(self._commit, job, response):
+                log.warning("Lost the job lease; another worker owns it now", extra={"request_id": request_id})
+                return
+        except QualityRejected as e:
+            # Same inputs would fail the gate again
+            await asyncio.to_thread(self.queue.fail, job, str(e), False)
+            return
+        except Exception as e:
+            final = await asyncio.to_thread(self.queue.fail, job, str(e), True)
+            log.warning("Job failed", extra={"request_id": request_id, "final": final, "error": str(e)})
+            return
+
+        with span("gallery_enroll"):
+            await enroll(response, selfie_embedding)
+        if not settings.PERSIST_UPLOADS:
+            self.queue.discard_inputs(job["paths"])
+
+job_queue = JobQueue()
+job_workers = JobWorkers(job_queue)
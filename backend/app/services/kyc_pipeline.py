@@ -0,0 +1,204 @@
+import asyncio
+import re
+from datetime import datetime
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.executor import run_inference
+from app.core.telemetry import log, span, DECISIONS, DUPLICATE_SUSPECTS
+from app.database import KYCRecord
+from app.services.district_matcher import district_matcher
+from app.services.face_gallery import face_gallery
+from app.services.face_service import face_engine
+from app.services.image_io import decode_image
+from app.services.metrics_store import metrics_store
+from app.services.ocr_service import ocr_engine
+from app.services.quality_gate import quality_gate
+from app.services.regional_risk import regional_risk_index
+from app.services.risk_engine import risk_engine
+
+# The verification flow shared by the synchronous /kyc/verify endpoint, the
+# async job workers and the batch verifier: evaluate -> record (same
+# transaction as any caller bookkeeping) -> enroll.
+
+async def decode_uploads(request_id, front_bytes, back_bytes, selfie_bytes):
+    """Decodes the three uploads side by side on the inference pool."""
+    with span("decode"):
+        return await asyncio.gather(
+            run_inference(decode_image, front_bytes, f"{request_id}_front.jpg"),
+            run_inference(decode_image, back_bytes, f"{request_id}_back.jpg"),
+            run_inference(decode_image, selfie_bytes, f"{request_id}_selfie.jpg"),
+        )
+
+async def evaluate(request_id, front_img, back_img, selfie_img):
+    """
+    Runs the quality gate, face match, OCR, the duplicate check and the
+    regional lookup. Returns (response, selfie_embedding); nothing is written
+    yet. Raises QualityRejected before any model runs on unusable uploads.
+    """
+    with span("quality_gate"):
+        await run_inference(quality_gate.screen, {"front": front_img, "back": back_img, "selfie": selfie_img}, request_id)
+    regional_risk_index.refresh_if_stale()
+
+    # 1. AI TASKS (independent, so they run side by side on the inference pool)
+    # Face Match: Uses Front + Selfie
+    # OCR: Extract text from BOTH sides
+    with span("inference"):
+        face_result, ocr_front, ocr_back = await asyncio.gather(
+            run_inference(face_engine.verify_faces, front_img, selfie_img, return_embeddings=True),
+            run_inference(ocr_engine.extract_text, front_img, "front"),
+            run_inference(ocr_engine.extract_text, back_img, "back"),
+        )
+    return await assess(request_id, face_result, ocr_front, ocr_back)
+
+async def assess(request_id, face_result, ocr_front, ocr_back, pending=None):
+    """
+    Everything after inference: merges OCR, duplicate check, regional lookup,
+    risk scoring and the decision. Shared with the batch verifier, which runs
+    inference in bulk and passes the approved selfies of its chunk that are
+    not enrolled yet as `pending` (see FaceGallery.check_duplicate).
+    """
+    # Merge OCR Data
+    # We use Front for Name/ID and Back for Address
+    combined_ocr = {
+        "name": ocr_front.get("name"),
+        "id_number": ocr_front.get("id_number"),
+        "address_front": ocr_front.get("address", ""),
+        "address_back": ocr_back.get("address", ""), # This usually contains the PIN
+        "raw_text_back": ocr_back.get("raw_text", ""), # Full text scan of back
+        "avg_confidence": round((ocr_front.get("avg_confidence", 0.0) + ocr_back.get("avg_confidence", 0.0)) / 2, 4),
+    }
+
+    _, selfie_embedding = face_result.pop("embeddings")
+
+    # 1b. DUPLICATE IDENTITY CHECK (same face enrolled under another ID number)
+    duplicate_check = {"duplicate_suspect": False, "gallery_size": 0, "matches": []}
+    if selfie_embedding is not None:
+        with span("duplicate_check"):
+            duplicate_check = await run_inference(
+                face_gallery.check_duplicate,
+                selfie_embedding,
+                id_number=combined_ocr["id_number"],
+                top_k=settings.DUPLICATE_TOP_K,
+                threshold=settings.DUPLICATE_MATCH_THRESHOLD,
+                pending=pending,
+            )
+        if duplicate_check["duplicate_suspect"]:
+            log.warning("Duplicate identity suspected", extra={"request_id": request_id})
+
+    # 2. SMART LOCATION DETECTION (Using Back Side Text)
+    with span("regional_lookup"):
+        detected_location, regional_risk = locate(request_id, combined_ocr)
+
+    # 3. RISK SCORING (weights and rules from the hot-reloaded policy file)
+    with span("risk_scoring"):
+        risk = risk_engine.calculate_risk(
+            combined_ocr,
+            face_result,
+            regional_risk=regional_risk if detected_location != "Unknown" else None,
+            duplicate_check=duplicate_check if selfie_embedding is not None else None,
+        )
+    final_decision = "APPROVED" if risk["approve"] else "REJECTED"
+    if duplicate_check["duplicate_suspect"] and settings.DUPLICATE_BLOCKS_APPROVAL:
+        final_decision = "REJECTED"
+
+    response = {
+        "request_id": request_id,
+        "final_decision": final_decision,
+        "risk_score": risk["total_score"],
+        "ocr_data": combined_ocr,
+        "face_match": face_result,
+        "duplicate_check": duplicate_check,
+        "risk_assessment": risk,
+        "regional_risk": {
+            "district": detected_location.title(),
+            "score": regional_risk,
+            "level": "High" if regional_risk > 50 else "Low"
+        }
+    }
+    return response, selfie_embedding
+
+def locate(request_id, combined_ocr):
+    """Returns (district, risk) from a PIN on the back side, else a district name."""
+    detected_location = "Unknown"
+    regional_risk = 0
+
+    # Scan the BACK side text for PIN Codes or District Names
+    full_back_text = f"{combined_ocr['address_back']} {combined_ocr['raw_text_back']}"
+
+    # STRATEGY A: Find 6-Digit PIN Code on Back
+    pin_matches = re.findall(r'\b[1-9][0-9]{5}\b', full_back_text)
+
+    for pin in pin_matches:
+        result = regional_risk_index.lookup_pincode(pin)
+        if result:
+            log.debug("Location found via PIN", extra={"request_id": request_id, "pin": pin, "district": result[0]})
+            return result[0], result[2]
+
+    # STRATEGY B: Fallback to District Name Search
+    log.debug("No PIN found, checking district names", extra={"request_id": request_id})
+    # One pass of the district automaton over the text (OCR-tolerant, deterministic pick)
+    district = district_matcher.find(full_back_text)
+    if district:
+        detected_location = district
+        regional_risk = regional_risk_index.lookup_district(district) or 0
+    return detected_location, regional_risk
+
+def record_row(response, timestamp):
+    return {
+        "request_id": response["request_id"],
+        "name": response["ocr_data"]["name"],
+        "id_number": response["ocr_data"]["id_number"],
+        "match_score": response["face_match"]["score"],
+        "decision": response["final_decision"],
+        "timestamp": timestamp,
+        "ocr_confidence": response["ocr_data"].get("avg_confidence"),
+        "regional_risk": response["risk_assessment"]["breakdown"]["regional_risk"],
+        "duplicate_suspect": response["risk_assessment"]["breakdown"]["duplicate_suspect"],
+        "risk_score": response["risk_score"],
+        "risk_level": response["risk_assessment"]["risk_level"],
+        "policy_version": response["risk_assessment"]["policy_version"],
+    }
+
+def record_outcome(db, response):
+    """Adds the KYCRecord (and bumps the counters) for an evaluated request; the caller commits."""
+    record = KYCRecord(**record_row(response, datetime.utcnow()))
+    db.add(record)
+    metrics_store.record(db, record.decision, record.timestamp)
+    count_outcome(response)
+    return record
+
+def record_outcomes(db, responses):
+    """Bulk record_outcome: one multi-row INSERT and one counter upsert per bucket."""
+    now = datetime.utcnow()
+    rows = [record_row(response, now) for response in responses]
+    if rows:
+        db.execute(insert(KYCRecord), rows)
+        metrics_store.record_many(db, [(row["decision"], now) for row in rows])
+    for response in responses:
+        count_outcome(response)
+    return rows
+
+def count_outcome(response):
+    # Counted when recorded, not in assess(), which the batch verifier may run twice per item
+    DECISIONS.inc(decision=response["final_decision"])
+    if response["duplicate_check"]["duplicate_suspect"]:
+        DUPLICATE_SUSPECTS.inc()
+
+async def enroll(response, selfie_embedding):
+    # Only approved identities join the gallery
+    if response["final_decision"] == "APPROVED" and selfie_embedding is not None:
+        try:
+            await run_inference(face_gallery.add, selfie_embedding, response["request_id"], response["ocr_data"]["id_number"])
+        except Exception:
+            # The record is already committed; a gallery miss must not turn it into a 500
+            log.exception("Gallery enroll failed", extra={"request_id": response["request_id"]})
+
+async def run_verification(request_id, front_img, back_img, selfie_img, db):
+    """Full synchronous flow: evaluate, save the record, enroll."""
+    response, selfie_embedding = await evaluate(request_id, front_img, back_img, selfie_img)
+    with span("db_commit"):
+        record_outcome(db, response)
+        db.commit()
+    with span("gallery_enroll"):
+        await enroll(response, selfie_embedding)
+    return response
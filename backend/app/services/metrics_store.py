@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert
+from app.core.telemetry import log
+from app.database import SessionLocal, KYCMetricBucket
+
+TOTAL_BUCKET = "total"
+HOUR_FORMAT = "%Y-%m-%dT%H"
+
+class MetricsStore:
+    """
+    Pre-aggregated verification counters for /kyc/stats and the dashboard.
+
+    `record` is called inside the transaction that inserts the KYCRecord, so
+    the counters can never drift from the table: both commit or neither
+    does. Reads are primary-key lookups instead of COUNT(*) over history.
+    """
+
+    def record(self, db, decision, timestamp):
+        self.record_many(db, [(decision, timestamp)])
+
+    def record_many(self, db, outcomes):
+        """Bulk form of `record` for [(decision, timestamp), ...]: one upsert per touched bucket."""
+        counts = {}
+        for decision, timestamp in outcomes:
+            approved = 1 if decision == "APPROVED" else 0
+            for bucket in (TOTAL_BUCKET, timestamp.strftime(HOUR_FORMAT)):
+                pair = counts.setdefault(bucket, [0, 0])
+                pair[0] += approved
+                pair[1] += 1 - approved
+        for bucket, (approved, rejected) in counts.items():
+            stmt = insert(KYCMetricBucket).values(bucket=bucket, approved=approved, rejected=rejected)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["bucket"],
+                set_={
+                    "approved": KYCMetricBucket.approved + stmt.excluded.approved,
+                    "rejected": KYCMetricBucket.rejected + stmt.excluded.rejected,
+                },
+            ))
+
+    def ensure_seeded(self):
+        """
+        One-off backfill from kyc_records for databases that predate the
+        counters. Workers starting together may both get here; the inserts
+        skip buckets that already exist, so the loser is a no-op.
+        """
+        db = SessionLocal()
+        try:
+            if db.get(KYCMetricBucket, TOTAL_BUCKET) is not None:
+                return
+            rows = db.execute(text(
+                "SELECT strftime('%Y-%m-%dT%H', timestamp) AS bucket, "
+                "SUM(decision = 'APPROVED'), SUM(decision != 'APPROVED') "
+                "FROM kyc_records GROUP BY bucket"
+            )).fetchall()
+            values = [
+                {"bucket": bucket, "approved": approved or 0, "rejected": rejected or 0}
+                for bucket, approved, rejected in rows if bucket
+            ]
+            total_approved = sum(v["approved"] for v in values)
+            total_rejected = sum(v["rejected"] for v in values)
+            values.append({"bucket": TOTAL_BUCKET, "approved": total_approved, "rejected": total_rejected})
+            db.execute(insert(KYCMetricBucket).on_conflict_do_nothing(index_elements=["bucket"]), values)
+            db.commit()
+            log.info("Seeded verification counters", extra={"records": total_approved + total_rejected})
+        finally:
+            db.close()
+
+    def totals(self, db):
+        row = db.get(KYCMetricBucket, TOTAL_BUCKET)
+        approved, rejected = (row.approved, row.rejected) if row else (0, 0)
+        return {"total": approved + rejected, "approved": approved, "rejected": rejected}
+
+    def rollup(self, db, granularity="hour", periods=24):
+        """Approve/reject counts per hour or per day, oldest first, empty periods included."""
+        now = datetime.utcnow()
+        if granularity == "day":
+            start = (now - timedelta(days=periods - 1)).replace(hour=0)
+            key_len, step, fmt = 10, timedelta(days=1), "%Y-%m-%d"
+        else:
+            start = now - timedelta(hours=periods - 1)
+            key_len, step, fmt = 13, timedelta(hours=1), HOUR_FORMAT
+
+        bucket_key = func.substr(KYCMetricBucket.bucket, 1, key_len)
+        rows = (
+            db.query(bucket_key, func.sum(KYCMetricBucket.approved), func.sum(KYCMetricBucket.rejected))
+            .filter(KYCMetricBucket.bucket >= start.strftime(fmt))
+            .filter(KYCMetricBucket.bucket != TOTAL_BUCKET)
+            .group_by(bucket_key)
+            .all()
+        )
+        counts = {key: (approved or 0, rejected or 0) for key, approved, rejected in rows}
+
+        series = []
+        for i in range(periods):
+            key = (start + i * step).strftime(fmt)
+            approved, rejected = counts.get(key, (0, 0))
+            series.append({"period": key, "approved": approved, "rejected": rejected})
+        return series
+
+metrics_store = MetricsStore()
@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+# ID-1 card (85.6 x 54 mm)
+CARD_ASPECT = 85.6 / 54.0
+
+# Where the parsed fields sit on a rectified Aadhaar card, as
+# (x0, y0, x1, y1) fractions of the card. Front: name/DOB/gender block to
+# the right of the photo, then the 12-digit number line. Back: the address
+# block (which carries the PIN).
+FIELD_REGIONS = {
+    "front": [(0.25, 0.15, 1.00, 0.72), (0.10, 0.70, 0.95, 0.95)],
+    "back": [(0.00, 0.12, 0.80, 0.90)],
+}
+
+class OCRPreprocessor:
+    """
+    Shrinks what CRAFT has to look at: scale the photo to a target long
+    edge, find the card's quadrilateral and warp it flat, and optionally cut
+    out just the known field regions. Returns a list of RGB regions in
+    reading order (top to bottom), so the line-based parser keeps working.
+    """
+
+    def __init__(self, target_long_edge=1280, crop_card=True, field_rois=False):
+        self.target_long_edge = target_long_edge
+        self.crop_card = crop_card
+        self.field_rois = field_rois
+
+    def downscale(self, pixels):
+        h, w = pixels.shape[:2]
+        if not self.target_long_edge or max(h, w) <= self.target_long_edge:
+            return pixels
+        scale = self.target_long_edge / max(h, w)
+        return cv2.resize(pixels, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _order_corners(pts):
+        """top-left, top-right, bottom-right, bottom-left"""
+        pts = pts.reshape(4, 2).astype(np.float32)
+        s = pts.sum(axis=1)
+        d = np.diff(pts, axis=1).ravel()
+        return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+    def find_card(self, pixels, min_area_fraction=0.25):
+        """Returns the card corners (4x2 float32) or None when no clear card outline is found."""
+        grey = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        grey = cv2.GaussianBlur(grey, (5, 5), 0)
+        edges = cv2.Canny(grey, 50, 150)
+        edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_area = min_area_fraction * pixels.shape[0] * pixels.shape[1]
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+            if cv2.contourArea(contour) < min_area:
+                break
+            approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+            if len(approx) == 4 and cv2.isContourConvex(approx):
+                return self._order_corners(approx)
+        return None
+
+    def rectify(self, pixels, corners):
+        tl, tr, br, bl = corners
+        width = int(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl)))
+        height = int(round(width / CARD_ASPECT))
+        if width < 50 or height < 30:
+            return pixels
+        target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(corners, target)
+        return cv2.warpPerspective(pixels, matrix, (width, height))
+
+    def regions(self, pixels, side="front"):
+        """Full preprocessing: downscale -> card crop -> (optional) field ROIs."""
+        image = self.downscale(pixels)
+        card_found = False
+        if self.crop_card:
+            corners = self.find_card(image)
+            if corners is not None:
+                image = self.rectify(image, corners)
+                card_found = True
+
+        # Field boxes are only meaningful on a rectified card
+        if self.field_rois and card_found and side in FIELD_REGIONS:
+            h, w = image.shape[:2]
+            return [
+                image[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+                for x0, y0, x1, y1 in FIELD_REGIONS[side]
+            ]
+        return [image]
@@ -1,20 +1,115 @@
+import cv2
 import easyocr
+import math
 import re
+from easyocr.recognition import get_text
+from easyocr.utils import get_image_list
+from app.core.config import settings
+from app.core.lifecycle import model_registry
+from app.core.telemetry import log, span, OCR_ERRORS
+from app.services.batching import MicroBatcher
+from app.services.image_io import as_decoded
+from app.services.ocr_preprocess import OCRPreprocessor
+
+# Line crops are resized to this height before the CRNN (easyocr.config.imgH)
+RECOGNIZER_HEIGHT = 64
 
 class OCRService:
-    def __init__(self):
-        print("⚡ Loading Intelligent OCR Model (EasyOCR)...")
+    def __init__(self, backend=None):
+        self.backend = backend or settings.OCR_BACKEND
+        log.info("Loading OCR model (EasyOCR)", extra={"backend": self.backend})
         # 'en' for English. gpu=False for safety (set True if you have NVIDIA GPU)
         self.reader = easyocr.Reader(['en'], gpu=False) 
-        print("   ✅ OCR Model Loaded!")
 
-    def extract_text(self, image_path):
+        # ONNX Runtime swaps in for CRAFT (detector) and the CRNN recognizer;
+        # EasyOCR's pre/post-processing stays exactly the same
+        if self.backend == "onnx":
+            from app.services.onnx_backend import OnnxModule
+            self.reader.detector = OnnxModule("craft")
+            self.reader.recognizer = OnnxModule("recognizer")
+        elif self.backend != "torch":
+            raise ValueError(f"Unknown OCR_BACKEND '{self.backend}', expected 'torch' or 'onnx'")
+
+        # Downscale + card crop (+ field ROIs) before CRAFT sees the photo
+        self.preprocessor = OCRPreprocessor(
+            target_long_edge=settings.OCR_TARGET_LONG_EDGE,
+            crop_card=settings.OCR_CARD_CROP,
+            field_rois=settings.OCR_FIELD_ROIS,
+        )
+
+        # Characters outside the loaded language set are masked out of decoding
+        self.ignore_char = ''.join(set(self.reader.character) - set(self.reader.lang_char))
+
+        # Recognition scheduler: line crops from the front, the back and other
+        # in-flight requests are pooled into shared recognizer batches
+        self.recognizer = MicroBatcher(
+            "easyocr-recognizer",
+            self._recognize_batch,
+            max_batch_size=settings.OCR_RECOGNIZE_BATCH_MAX_SIZE,
+            max_wait_ms=settings.OCR_RECOGNIZE_BATCH_MAX_WAIT_MS,
+        )
+        log.info("OCR model loaded", extra={"backend": self.backend})
+
+    def detect_lines(self, pixels):
+        """
+        Phase 1: CRAFT detection on one RGB region. Returns the line crops
+        (grey, RECOGNIZER_HEIGHT high) in the order reader.recognize would
+        read them: horizontal boxes first, then rotated ones.
+        """
+        with span("ocr.detect"):
+            grey = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+            horizontal_list, free_list = self.reader.detect(pixels)
+            horizontal, _ = get_image_list(horizontal_list[0], [], grey, model_height=RECOGNIZER_HEIGHT, sort_output=False)
+            free, _ = get_image_list([], free_list[0], grey, model_height=RECOGNIZER_HEIGHT, sort_output=False)
+        return [crop for _, crop in horizontal + free]
+
+    def _recognize_batch(self, crops):
+        """
+        Phase 2, called by the batcher thread. Crops are sorted by width so
+        each forward pass pads to a similar width, then results are put
+        back in submission order as (text, confidence).
+        """
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[1])
+        results = [None] * len(crops)
+        step = max(1, settings.OCR_RECOGNIZE_FORWARD_BATCH)
+        with span("ocr.recognize"):
+            for start in range(0, len(order), step):
+                chunk = order[start:start + step]
+                # Same padded width rule as easyocr.utils.get_image_list
+                max_ratio = max(1.0, max(crops[i].shape[1] / crops[i].shape[0] for i in chunk))
+                max_width = math.ceil(max_ratio) * RECOGNIZER_HEIGHT
+                image_list = [(i, crops[i]) for i in chunk]
+                predictions = get_text(
+                    self.reader.character, RECOGNIZER_HEIGHT, int(max_width),
+                    self.reader.recognizer, self.reader.converter, image_list,
+                    ignore_char=self.ignore_char, decoder='greedy', beamWidth=5,
+                    batch_size=len(chunk), workers=0, device=self.reader.device,
+                )
+                for i, text, confidence in predictions:
+                    results[i] = (text, float(confidence))
+        return results
+
+    def read_lines(self, regions):
+        """
+        Detect lines on every region first, then recognise all of the crops
+        in one submission so they share recognizer batches.
+        """
+        crops = [crop for region in regions for crop in self.detect_lines(region)]
+        if not crops:
+            return []
+        # (text, confidence) per line, in reading order
+        return self.recognizer.run_many(crops)
+
+    def extract_text(self, image, side="front"):
         try:
-            print(f"📖 Reading text from: {image_path}")
+            image = as_decoded(image)
+            log.debug("Reading text", extra={"image": image.name})
             
-            # detail=0 gives us simple list of strings
-            results = self.reader.readtext(image_path, detail=0)
-            print(f"   🔍 Raw Text Found: {results}")
+            with span("ocr.preprocess"):
+                regions = self.preprocessor.regions(image.pixels, side)
+            lines = self.read_lines(regions)
+            results = [text for text, _ in lines]
+            log.debug("Raw text found", extra={"image": image.name, "lines": results})
 
             # Initialize Default Data
             extracted_data = {
@@ -22,7 +117,9 @@ class OCRService:
                 "id_number": "",
                 "dob": None,
                 "address": "",       # <--- NEW FIELD
-                "raw_text": " ".join(results) # <--- CRITICAL: Send Full Text to Backend
+                "raw_text": " ".join(results), # <--- CRITICAL: Send Full Text to Backend
+                # Mean recognizer confidence (0-1) over the lines read; feeds the risk engine
+                "avg_confidence": round(sum(c for _, c in lines) / len(lines), 4) if lines else 0.0,
             }
 
             # 1. Join all text for Regex searching
@@ -74,7 +171,9 @@ class OCRService:
             return extracted_data
 
         except Exception as e:
-            print(f"❌ OCR Error: {e}")
-            return {"name": "Error", "id_number": "Error", "raw_text": ""}
+            OCR_ERRORS.inc()
+            log.error("OCR error", extra={"error": str(e)})
+            return {"name": "Error", "id_number": "Error", "raw_text": "", "avg_confidence": 0.0}
 
-ocr_engine = OCRService()
\ No newline at end of file
+# Loaded on first use or by the warm-up in main.py's lifespan
+ocr_engine = model_registry.register("ocr", OCRService)
\ No newline at end of file
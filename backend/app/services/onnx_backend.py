@@ -0,0 +1,80 @@
+import os
+import queue
+import numpy as np
+import torch
+from app.core.config import settings
+
+# File names written by export_onnx.py, inside settings.ONNX_MODEL_DIR
+ONNX_MODELS = {
+    "facenet": "facenet_vggface2.onnx",
+    "pnet": "mtcnn_pnet.onnx",
+    "rnet": "mtcnn_rnet.onnx",
+    "onet": "mtcnn_onet.onnx",
+    "craft": "easyocr_craft.onnx",
+    "recognizer": "easyocr_recognizer_en.onnx",
+}
+
+def model_path(name):
+    return os.path.join(settings.ONNX_MODEL_DIR, ONNX_MODELS[name])
+
+def _session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.ONNX_INTRA_OP_THREADS > 0:
+        options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS
+    options.inter_op_num_threads = 1
+    return options
+
+class OnnxModule:
+    """
+    Drop-in replacement for an eval-mode torch module backed by ONNX Runtime.
+
+    Takes and returns torch tensors so library code that calls `net(x)`
+    (facenet_pytorch's MTCNN stages, EasyOCR's CRAFT and recognizer) keeps
+    working. Extra positional inputs beyond what the graph declares are
+    ignored (EasyOCR passes a dummy `text` tensor to the recognizer).
+    Sessions are pooled so concurrent callers never share one session.
+    """
+
+    def __init__(self, name, pool_size=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("The onnx backend needs the 'onnxruntime' package (pip install -r requirements-onnx.txt)") from e
+
+        path = model_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found, run `python export_onnx.py` first")
+
+        self.name = name
+        self._sessions = queue.Queue()
+        for _ in range(max(1, pool_size or settings.ONNX_SESSION_POOL_SIZE)):
+            self._sessions.put(ort.InferenceSession(path, _session_options(), providers=["CPUExecutionProvider"]))
+        probe = self._sessions.queue[0]
+        self._input_names = [i.name for i in probe.get_inputs()]
+        self._single_output = len(probe.get_outputs()) == 1
+
+    def __call__(self, *inputs):
+        feeds = {
+            name: (x.detach().cpu().numpy() if isinstance(x, torch.Tensor) else np.asarray(x)).astype(np.float32, copy=False)
+            for name, x in zip(self._input_names, inputs)
+        }
+        session = self._sessions.get()
+        try:
+            outputs = session.run(None, feeds)
+        finally:
+            self._sessions.put(session)
+        tensors = [torch.from_numpy(o) for o in outputs]
+        return tensors[0] if self._single_output else tuple(tensors)
+
+    # torch.nn.Module calls that library code makes on its networks
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def parameters(self):
+        # facenet_pytorch reads next(net.parameters()).dtype to cast its input
+        return iter([torch.zeros(1)])
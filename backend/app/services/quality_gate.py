@@ -0,0 +1,168 @@
+import numpy as np
+from app.core.config import settings
+from app.core.telemetry import log, STAGE_SECONDS, QUALITY_REJECTIONS, QUALITY_SAVED_CALLS, QUALITY_SAVED_SECONDS
+
+# Checks run on a strided view of at most this long edge, so the cost is
+# flat (a few ms) whatever the upload size, and the blur score is comparable
+# across resolutions
+ANALYSIS_LONG_EDGE = 512
+
+# Model calls one verification makes, all skipped when the gate rejects it
+VERIFY_MODEL_CALLS = {"mtcnn": 2, "facenet": 2, "easyocr": 2}
+
+# Failure codes, with the hint returned to the client
+MESSAGES = {
+    "IMAGE_TOO_SMALL": "Resolution too low; retake the photo closer or with a better camera",
+    "IMAGE_TOO_DARK": "Image is too dark; retake it in better light and check the camera is not covered",
+    "IMAGE_OVEREXPOSED": "Image is overexposed; avoid direct light or flash glare",
+    "IMAGE_BLANK": "Image is blank or uniform; point the camera at the card or your face",
+    "IMAGE_BLURRY": "Image is blurry; hold the camera steady and let it focus",
+    "NO_FACE_DETECTED": "No face found in the selfie; face the camera, centred and unobstructed",
+    "CARD_FRONT_NO_PHOTO": "No portrait found on the card front; check the front and back are not swapped",
+}
+
+class QualityRejected(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("; ".join(f"{f['code']} ({f['image']}): {f['message']}" for f in failures))
+
+class QualityGate:
+    """
+    Cheap pre-inference screening of the decoded uploads: resolution,
+    blank frame, exposure, Laplacian-variance sharpness and a skin-tone
+    face-presence check (skipped on grayscale images). Each image reports its first failure, so a client
+    can fix all three uploads in one retry. Everything is plain NumPy on the
+    shared pixel buffer; none of it touches MTCNN, FaceNet or EasyOCR.
+    """
+
+    @staticmethod
+    def _analysis_view(pixels):
+        step = -(-max(pixels.shape[:2]) // ANALYSIS_LONG_EDGE)  # ceil
+        return pixels[::step, ::step].astype(np.float32)
+
+    @staticmethod
+    def sharpness(grey):
+        # 4-neighbour Laplacian without a convolution call
+        lap = (grey[:-2, 1:-1] + grey[2:, 1:-1] + grey[1:-1, :-2] + grey[1:-1, 2:]) - 4.0 * grey[1:-1, 1:-1]
+        return float(lap.var())
+
+    @staticmethod
+    def chroma(rgb):
+        """(Cr, Cb) planes of the YCbCr transform."""
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        cr = 128.0 + 0.5 * r - 0.4187 * g - 0.0813 * b
+        cb = 128.0 - 0.1687 * r - 0.3313 * g + 0.5 * b
+        return cr, cb
+
+    @classmethod
+    def skin_mask(cls, rgb):
+        # Chai & Ngan's YCbCr skin box; cheap and independent of brightness
+        cr, cb = cls.chroma(rgb)
+        return (cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127)
+
+    @classmethod
+    def portrait_ratio(cls, rgb, rows=4, cols=6):
+        """
+        Skin share of the densest cell of a coarse grid. A card portrait fills
+        most of one cell; anti-aliased text on the orange/red bands only
+        sprinkles a few skin-coloured pixels over all of them.
+        """
+        skin = cls.skin_mask(rgb)
+        h, w = skin.shape
+        if h < rows or w < cols:
+            return 0.0
+        skin = skin[:h - h % rows, :w - w % cols]
+        cells = skin.reshape(rows, skin.shape[0] // rows, cols, skin.shape[1] // cols)
+        return float(cells.mean(axis=(1, 3)).max())
+
+    def measure(self, pixels, role):
+        """Metrics for one image; role is "front", "back" or "selfie"."""
+        rgb = self._analysis_view(pixels)
+        grey = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        metrics = {
+            "short_edge": int(min(pixels.shape[:2])),
+            "brightness": float(grey.mean()),
+            "contrast": float(grey.std()),
+            "dark_ratio": float((grey <= 10).mean()),
+            "bright_ratio": float((grey >= 250).mean()),
+            "sharpness": self.sharpness(grey),
+        }
+        if role in ("selfie", "front"):
+            # Near zero for grayscale / monochrome scans, where no pixel can look like skin
+            cr, cb = self.chroma(rgb)
+            metrics["chroma"] = float(max(cr.std(), cb.std()))
+        if role == "selfie":
+            h, w = grey.shape
+            centre = self.skin_mask(rgb[h // 5:h - h // 5, w // 5:w - w // 5])
+            metrics["skin_ratio"] = float(centre.mean()) if centre.size else 0.0
+        elif role == "front":
+            metrics["skin_ratio"] = self.portrait_ratio(rgb)
+        return metrics
+
+    def evaluate(self, pixels, role):
+        """Returns the first failure for the image as a dict, or None."""
+        m = self.measure(pixels, role)
+        selfie = role == "selfie"
+        min_edge = settings.QUALITY_MIN_SHORT_EDGE_SELFIE if selfie else settings.QUALITY_MIN_SHORT_EDGE_CARD
+        min_sharpness = settings.QUALITY_MIN_SHARPNESS_SELFIE if selfie else settings.QUALITY_MIN_SHARPNESS_CARD
+        min_skin = settings.QUALITY_MIN_SKIN_RATIO_SELFIE if selfie else settings.QUALITY_MIN_SKIN_RATIO_CARD
+
+        if m["short_edge"] < min_edge:
+            code = "IMAGE_TOO_SMALL"
+        elif m["brightness"] < settings.QUALITY_MIN_BRIGHTNESS or m["dark_ratio"] > settings.QUALITY_MAX_CLIPPED_RATIO:
+            code = "IMAGE_TOO_DARK"
+        elif m["bright_ratio"] > settings.QUALITY_MAX_CLIPPED_RATIO:
+            code = "IMAGE_OVEREXPOSED"
+        elif m["contrast"] < settings.QUALITY_MIN_CONTRAST:
+            code = "IMAGE_BLANK"
+        elif m["sharpness"] < min_sharpness:
+            code = "IMAGE_BLURRY"
+        elif ("skin_ratio" in m and min_skin and m["skin_ratio"] < min_skin
+              and m["chroma"] >= settings.QUALITY_MIN_CHROMA_STD):
+            code = "NO_FACE_DETECTED" if selfie else "CARD_FRONT_NO_PHOTO"
+        else:
+            return None
+        return {
+            "image": role,
+            "code": code,
+            "message": MESSAGES[code],
+            "metrics": {k: round(v, 4) for k, v in m.items()},
+        }
+
+    def screen(self, images, request_id=None, saved_calls=VERIFY_MODEL_CALLS, saved_stage="inference"):
+        """
+        images: {"front"|"back"|"selfie": DecodedImage}. Raises QualityRejected
+        in enforce mode; in warn mode the failures are only counted and logged.
+        Returns the failure list.
+        """
+        if settings.QUALITY_GATE == "off":
+            return []
+        failures = [f for f in (self.evaluate(img.pixels, role) for role, img in images.items()) if f]
+        if not failures:
+            return []
+
+        for failure in failures:
+            QUALITY_REJECTIONS.inc(code=failure["code"], image=failure["image"])
+        log.info("Quality gate failed", extra={
+            "request_id": request_id,
+            "codes": [f["code"] for f in failures],
+            "enforced": settings.QUALITY_GATE == "enforce",
+        })
+        if settings.QUALITY_GATE != "enforce":
+            return failures
+
+        for model, calls in saved_calls.items():
+            QUALITY_SAVED_CALLS.inc(calls, model=model)
+        if saved_stage:
+            QUALITY_SAVED_SECONDS.inc(STAGE_SECONDS.mean(stage=saved_stage))
+        raise QualityRejected(failures)
+
+    def stats(self):
+        return {
+            "mode": settings.QUALITY_GATE,
+            "rejections": QUALITY_REJECTIONS.snapshot(),
+            "saved_inference_calls": QUALITY_SAVED_CALLS.snapshot(),
+            "saved_seconds_estimate": round(QUALITY_SAVED_SECONDS.snapshot().get("all", 0.0), 3),
+        }
+
+quality_gate = QualityGate()
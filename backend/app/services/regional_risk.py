@@ -0,0 +1,155 @@
+import threading
+import time
+import numpy as np
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.telemetry import log
+from app.database import engine
+
+RISK_TABLE = "uidai_regional_risk"
+META_TABLE = "uidai_ingest_meta"
+
+class RegionalRiskIndex:
+    """
+    In-memory view of `uidai_regional_risk` for per-request lookups.
+
+    Districts are interned once into small parallel lists (name, state, risk)
+    and a 1,000,000-slot int32 array maps every 6-digit PIN straight to its
+    district id, so a lookup is one array read instead of a table scan.
+    The index reloads itself when ingest_data.py bumps the table version.
+    """
+
+    def __init__(self, refresh_seconds=60):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._pin_to_district = np.full(1_000_000, -1, dtype=np.int32)
+        self._district_names = []      # display name as stored in the table
+        self._district_states = []
+        self._district_risk = np.empty(0, dtype=np.int16)
+        self._district_by_name = {}    # UPPER(name) -> first district id
+        self._states_by_name = {}      # UPPER(name) -> {UPPER(state), ...}
+        self._hotspots = None          # (version, top districts), rebuilt after an ingest
+        self.version = None
+        self.loaded = False
+        self._last_check = 0.0
+
+    # --- Loading ---
+    def _read_version(self, conn):
+        try:
+            row = conn.execute(text(f"SELECT value FROM {META_TABLE} WHERE key = 'risk_table_version'")).fetchone()
+            return row[0] if row else "unversioned"
+        except Exception:
+            return "unversioned"
+
+    def load(self):
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            version = self._read_version(conn)
+            rows = conn.execute(text(f"SELECT District, State, Pincode, Risk_Score FROM {RISK_TABLE}"))
+
+            pin_to_district = np.full(1_000_000, -1, dtype=np.int32)
+            names, states, risks = [], [], []
+            ids = {}
+            by_name, states_by_name = {}, {}
+            for district, state, pincode, risk in rows:
+                if not district:
+                    continue
+                district = district.strip()
+                state = (state or "").strip()
+                key = (district, state)
+                district_id = ids.get(key)
+                if district_id is None:
+                    district_id = ids[key] = len(names)
+                    names.append(district)
+                    states.append(state)
+                    risks.append(int(risk or 0))
+                    upper = district.upper()
+                    by_name.setdefault(upper, district_id)
+                    states_by_name.setdefault(upper, set()).add(state.upper())
+                try:
+                    pin = int(str(pincode).split(".")[0])
+                except (TypeError, ValueError):
+                    continue
+                # Keep the first row per PIN, like the old "LIMIT 1" query
+                if 0 <= pin < 1_000_000 and pin_to_district[pin] < 0:
+                    pin_to_district[pin] = district_id
+
+        with self._lock:
+            self._pin_to_district = pin_to_district
+            self._district_names = names
+            self._district_states = states
+            self._district_risk = np.array(risks, dtype=np.int16)
+            self._district_by_name = by_name
+            self._states_by_name = states_by_name
+            self.version = version
+            self.loaded = True
+            self._last_check = time.monotonic()
+        log.info("Regional risk index loaded", extra={
+            "districts": len(names),
+            "seconds": round(time.perf_counter() - started, 2),
+            "version": version,
+        })
+
+    def refresh_if_stale(self):
+        """Cheap version check at most every `refresh_seconds`; reloads after a new ingest."""
+        now = time.monotonic()
+        if self.loaded and now - self._last_check < self.refresh_seconds:
+            return
+        self._last_check = now
+        try:
+            if not self.loaded:
+                self.load()
+                return
+            with engine.connect() as conn:
+                version = self._read_version(conn)
+            if version != self.version:
+                log.info("Risk table changed, reloading index", extra={"old_version": self.version, "version": version})
+                self.load()
+        except Exception as e:
+            log.warning("Regional risk index unavailable", extra={"error": str(e)})
+
+    # --- Lookups ---
+    def lookup_pincode(self, pincode):
+        """Returns (district, state, risk) for a PIN, or None."""
+        try:
+            pin = int(pincode)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= pin < 1_000_000:
+            return None
+        district_id = int(self._pin_to_district[pin])
+        if district_id < 0:
+            return None
+        return (self._district_names[district_id], self._district_states[district_id],
+                int(self._district_risk[district_id]))
+
+    def lookup_district(self, name):
+        """Risk score for a district name (case-insensitive), or None."""
+        district_id = self._district_by_name.get(name.strip().upper())
+        if district_id is None:
+            return None
+        return int(self._district_risk[district_id])
+
+    def district_names(self):
+        """Upper-cased district names, e.g. for text matching."""
+        return self._district_by_name.keys()
+
+    def district_states(self, name):
+        return self._states_by_name.get(name.strip().upper(), set())
+
+    def hotspots(self, limit=5):
+        """Highest-risk districts, computed once per table version."""
+        cached = self._hotspots
+        if cached is None or cached[0] != self.version or len(cached[1]) < limit:
+            with self._lock:
+                risk = self._district_risk
+                # Stable sort keeps table order among equal scores
+                order = np.argsort(-risk.astype(np.int32), kind="stable")[:max(limit, 5)]
+                top = [
+                    {"name": self._district_names[i], "score": int(risk[i]), "state": self._district_states[i]}
+                    for i in order
+                ]
+                cached = self._hotspots = (self.version, top)
+        return cached[1][:limit]
+
+regional_risk_index = RegionalRiskIndex(refresh_seconds=settings.RISK_INDEX_REFRESH_SECONDS)
@@ -1,53 +1,288 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+import numpy as np
+from sqlalchemy import update
 from app.core.config import settings
+from app.core.telemetry import log
+from app.database import KYCRecord
+
+AADHAAR_NUMBER = re.compile(r"\d{4}\s\d{4}\s\d{4}")
+FACE_MATCH_PERCENT = 50.0   # Same cut-off as FaceService, for records that only kept the score
+RESCORE_CHUNK_ROWS = 50_000
+
+# Inputs a rule can test, one column each in the scoring matrix (NaN = unknown)
+SIGNALS = ("face_score", "face_match", "ocr_confidence", "id_detected", "regional_risk", "duplicate_suspect")
+# Weighted score components, each 0-100 with 100 = trustworthy
+COMPONENTS = ("face", "ocr", "id_detected", "regional", "duplicate")
+LEVELS = np.array(["HIGH", "MEDIUM", "LOW"])
+OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal}
+
+# Used when RISK_POLICY_PATH does not exist: the original 0.5 / 0.3 / 0.2
+# weighting, with the decision left to the face match alone
+DEFAULT_POLICY = {
+    "version": "builtin",
+    "weights": {"face": 0.5, "ocr": 0.3, "id_detected": 0.2},
+    "levels": {"low": settings.RISK_HIGH_THRESHOLD, "medium": settings.RISK_MEDIUM_THRESHOLD},
+    "approve": {"min_score": 0, "require_face_match": True},
+    "rules": [],
+}
+
+Rule = namedtuple("Rule", "name conditions cap penalty reject")
+
+class CompiledPolicy:
+    """
+    A policy document turned into arrays once per (re)load: normalized
+    weights, and rules as (column, ufunc, value) triples. Scoring is then
+    the same NumPy code for one request or a million records.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.version = str(raw.get("version", "unversioned"))
+
+        weights = raw.get("weights", {})
+        unknown = set(weights) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Unknown weights {sorted(unknown)}, expected some of {COMPONENTS}")
+        w = np.array([float(weights.get(c, 0.0)) for c in COMPONENTS])
+        if (w < 0).any() or w.sum() <= 0:
+            raise ValueError("Weights must be >= 0 and not all zero")
+        self.weights = w / w.sum()
+
+        levels = raw.get("levels", {})
+        self.low = float(levels.get("low", settings.RISK_HIGH_THRESHOLD))
+        self.medium = float(levels.get("medium", settings.RISK_MEDIUM_THRESHOLD))
+        approve = raw.get("approve", {})
+        self.min_score = float(approve.get("min_score", 0))
+        self.require_face_match = bool(approve.get("require_face_match", True))
+
+        self.rules = [self._compile_rule(rule) for rule in raw.get("rules", [])]
+        self.rule_names = [rule.name for rule in self.rules]
+
+    @staticmethod
+    def _compile_rule(rule):
+        name = rule["name"]
+        conditions = []
+        for signal, op, value in rule["if"]:
+            if signal not in SIGNALS:
+                raise ValueError(f"Rule '{name}': unknown signal '{signal}', expected one of {SIGNALS}")
+            if op not in OPS:
+                raise ValueError(f"Rule '{name}': unknown operator '{op}', expected one of {tuple(OPS)}")
+            conditions.append((SIGNALS.index(signal), OPS[op], float(value)))
+        if not any(k in rule for k in ("cap", "penalty", "reject")):
+            raise ValueError(f"Rule '{name}' has no effect (cap, penalty or reject)")
+        return Rule(name, conditions, float(rule.get("cap", np.inf)), float(rule.get("penalty", 0.0)),
+                    bool(rule.get("reject", False)))
+
+    def score(self, signals):
+        """signals: (N, len(SIGNALS)) float array. Returns a dict of length-N arrays."""
+        face, face_match, ocr, id_detected, regional, duplicate = signals.T
+        components = np.column_stack([face, ocr, id_detected * 100, 100 - regional, (1 - duplicate) * 100])
+
+        # Unknown inputs drop out and the remaining weights are rescaled per row
+        weights = self.weights * ~np.isnan(components)
+        norm = weights.sum(axis=1)
+        weighted = np.nansum(components * weights, axis=1)
+        total = np.divide(weighted, norm, out=np.zeros_like(weighted), where=norm > 0)
+
+        # Rules on NaN signals never fire (every comparison with NaN is False)
+        fired = np.zeros((len(signals), len(self.rules)), dtype=bool)
+        reject = np.zeros(len(signals), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            hit = np.ones(len(signals), dtype=bool)
+            for column, op, value in rule.conditions:
+                hit &= op(signals[:, column], value)
+            fired[:, j] = hit
+            total = np.where(hit, np.minimum(total, rule.cap) - rule.penalty, total)
+            if rule.reject:
+                reject |= hit
+        total = np.clip(total, 0, 100)
+
+        approve = (total >= self.min_score) & ~reject
+        if self.require_face_match:
+            approve &= face_match == 1
+        level = np.where(total >= self.low, 2, np.where(total >= self.medium, 1, 0))
+        return {"total_score": total, "risk_level": LEVELS[level], "approve": approve, "rules_fired": fired}
 
 class RiskEngine:
-    def calculate_risk(self, ocr_data, face_result):
+    """
+    Scores verifications against a JSON policy (RISK_POLICY_PATH): weights
+    for face score, OCR confidence, a readable ID number, regional risk and
+    the duplicate-identity check, risk-level cut-offs, the approval rule and
+    extra rules (cap / penalty / reject when all conditions hold).
+
+    The file's mtime is checked at most every RISK_POLICY_CHECK_SECONDS; an
+    edited policy is compiled and swapped in without a restart. A policy
+    that fails to parse or validate is logged and the previous one stays.
+    """
+
+    def __init__(self, path=settings.RISK_POLICY_PATH, check_seconds=settings.RISK_POLICY_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._compiled = CompiledPolicy(DEFAULT_POLICY)
+        self._mtime = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    # --- Policy ---
+    def policy(self) -> CompiledPolicy:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_seconds:
+            with self._lock:
+                if now - self._checked_at >= self.check_seconds:
+                    self._checked_at = now
+                    self._reload_if_changed()
+        return self._compiled
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        try:
+            if mtime is None:
+                compiled = CompiledPolicy(DEFAULT_POLICY)
+            else:
+                with open(self.path) as f:
+                    compiled = CompiledPolicy(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Not retried until the file changes again
+            self._mtime = mtime
+            log.error("Invalid risk policy, keeping the previous one", extra={"path": self.path, "error": str(e)})
+            return
+        self._compiled = compiled
+        self._mtime = mtime
+        log.info("Risk policy loaded", extra={"path": self.path, "version": compiled.version})
+
+    # --- Scoring ---
+    @staticmethod
+    def signals(ocr_data, face_result, regional_risk=None, duplicate_check=None):
+        """One row of SIGNALS for a live request; None/missing inputs become NaN."""
+        confidence = ocr_data.get("avg_confidence")
+        return [
+            face_result.get("score", 0),
+            1.0 if face_result.get("match") else 0.0,
+            np.nan if confidence is None else confidence * 100,
+            1.0 if AADHAAR_NUMBER.fullmatch(ocr_data.get("id_number") or "") else 0.0,
+            np.nan if regional_risk is None else regional_risk,
+            np.nan if duplicate_check is None else float(duplicate_check["duplicate_suspect"]),
+        ]
+
+    def calculate_risk(self, ocr_data, face_result, regional_risk=None, duplicate_check=None):
         """
         Combines multiple signals to generate a Final Fraud Score.
         0 = High Risk (Fraud), 100 = Low Risk (Trustworthy)
         """
-        
-        # 1. Normalize Scores
-        # Face score is already 0-100
-        face_score = face_result.get("score", 0)
-        
-        # OCR Confidence is usually 0.0 to 1.0 -> Convert to 0-100
-        ocr_confidence_score = ocr_data.get("avg_confidence", 0) * 100
-        
-        # 2. Define Weights (Banking Standard)
-        # Face Match is critical: 50% weight
-        # Document Clarity (OCR) is important: 30% weight
-        # Metadata/Format Check: 20% weight (Bonus)
-        
-        w_face = 0.5
-        w_ocr = 0.3
-        w_meta = 0.2
-        
-        # Calculate Weighted Sum
-        # Note: If face didn't match (low score), this will drag the total down heavily.
-        total_score = (face_score * w_face) + (ocr_confidence_score * w_ocr)
-        
-        # Bonus: Did we detect a valid ID number?
-        if ocr_data.get("id_number"):
-            total_score += (100 * w_meta)
-        else:
-            total_score += (0 * w_meta)
-
-        # 3. Determine Risk Level
-        risk_level = "HIGH"
-        if total_score >= settings.RISK_HIGH_THRESHOLD: # e.g. > 80
-            risk_level = "LOW"
-        elif total_score >= settings.RISK_MEDIUM_THRESHOLD: # e.g. > 40
-            risk_level = "MEDIUM"
-
+        policy = self.policy()
+        row = self.signals(ocr_data, face_result, regional_risk, duplicate_check)
+        result = policy.score(np.array([row], dtype=np.float64))
+        face_score, _, ocr_score, id_detected, regional, duplicate = row
         return {
-            "total_score": round(total_score, 2),
-            "risk_level": risk_level,
+            "total_score": round(float(result["total_score"][0]), 2),
+            "risk_level": str(result["risk_level"][0]),
+            "approve": bool(result["approve"][0]),
+            "rules_fired": [name for name, hit in zip(policy.rule_names, result["rules_fired"][0]) if hit],
+            "policy_version": policy.version,
             "breakdown": {
                 "face_score": face_score,
-                "ocr_score": round(ocr_confidence_score, 2),
-                "id_detected": bool(ocr_data.get("id_number"))
-            }
+                "ocr_score": None if np.isnan(ocr_score) else round(ocr_score, 2),
+                "id_detected": bool(id_detected),
+                "regional_risk": None if np.isnan(regional) else regional,
+                "duplicate_suspect": None if np.isnan(duplicate) else bool(duplicate),
+            },
+        }
+
+    def score_batch(self, signals):
+        """
+        Vectorized scoring: `signals` maps SIGNALS names to equal-length
+        arrays (missing names and NaNs count as unknown). Returns arrays of
+        total_score / risk_level / approve, plus rules_fired (N x rules).
+        """
+        length = len(next(iter(signals.values())))
+        matrix = np.column_stack([
+            np.asarray(signals[name], dtype=np.float64) if name in signals else np.full(length, np.nan)
+            for name in SIGNALS
+        ])
+        policy = self.policy()
+        result = policy.score(matrix)
+        result["rule_names"] = policy.rule_names
+        result["policy_version"] = policy.version
+        return result
+
+    def rescore_records(self, db, query, apply=False, chunk_rows=RESCORE_CHUNK_ROWS):
+        """
+        Rescores the KYCRecords matched by `query` under the current policy,
+        chunk by chunk. Reports how levels and decisions would change; with
+        apply=True it also stores risk_score / risk_level / policy_version
+        (decisions already given are never rewritten).
+        """
+        started = time.perf_counter()
+        policy = self.policy()
+        levels, changes, rules = Counter(), Counter(), Counter()
+        scores_sum, records, approvals = 0.0, 0, 0
+
+        last_id = 0
+        while True:
+            rows = (
+                query.with_entities(
+                    KYCRecord.id, KYCRecord.match_score, KYCRecord.id_number, KYCRecord.ocr_confidence,
+                    KYCRecord.regional_risk, KYCRecord.duplicate_suspect, KYCRecord.decision,
+                )
+                .filter(KYCRecord.id > last_id)
+                .order_by(KYCRecord.id)
+                .limit(chunk_rows)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids, face, numbers, ocr, regional, duplicate, decisions = zip(*rows)
+
+            face = np.array(face, dtype=np.float64)
+            result = self.score_batch({
+                "face_score": face,
+                "face_match": face > FACE_MATCH_PERCENT,
+                "ocr_confidence": np.array(ocr, dtype=np.float64) * 100,
+                "id_detected": [bool(AADHAAR_NUMBER.fullmatch(n or "")) for n in numbers],
+                "regional_risk": np.array(regional, dtype=np.float64),
+                "duplicate_suspect": np.array(duplicate, dtype=np.float64),
+            })
+            total, level, approve = result["total_score"], result["risk_level"], result["approve"]
+
+            records += len(rows)
+            approvals += int(approve.sum())
+            scores_sum += float(total.sum())
+            levels.update(dict(zip(*np.unique(level, return_counts=True))))
+            rules.update(dict(zip(policy.rule_names, result["rules_fired"].sum(axis=0).tolist())))
+            new_decisions = np.where(approve, "APPROVED", "REJECTED")
+            old_decisions = np.array(decisions, dtype=object)
+            changed = new_decisions != old_decisions
+            changes.update(f"{old}->{new}" for old, new in zip(old_decisions[changed], new_decisions[changed]))
+
+            if apply:
+                db.execute(update(KYCRecord), [
+                    {"id": record_id, "risk_score": round(float(s), 2), "risk_level": str(l), "policy_version": policy.version}
+                    for record_id, s, l in zip(ids, total, level)
+                ])
+                db.commit()
+
+        return {
+            "policy_version": policy.version,
+            "records": records,
+            "applied": apply,
+            "mean_score": round(scores_sum / records, 2) if records else None,
+            "risk_levels": {str(k): int(v) for k, v in levels.items()},
+            "would_approve": approvals,
+            "would_reject": records - approvals,
+            "decision_changes": dict(changes),
+            "rules_fired": {name: int(count) for name, count in rules.items()},
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
         }
 
-risk_engine = RiskEngine()
\ No newline at end of file
+risk_engine = RiskEngine()
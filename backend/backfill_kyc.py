@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import time
+from app.core.lifecycle import model_registry
+from app.core.telemetry import configure_logging
+from app.services.batch_verify import batch_verifier
+
+def print_progress(batch):
+    finished = batch["done"] + batch["failed"]
+    print(f"   -> {finished}/{batch['total']} items ({batch['failed']} failed)")
+
+def backfill_kyc(batch_id, retry_failed=False):
+    print(f"🚀 Running batch {batch_id}...")
+    # Load EasyOCR + FaceNet in parallel up front instead of inside the first chunk
+    model_registry.warm_up()
+
+    started = time.perf_counter()
+    if not asyncio.run(batch_verifier.run(batch_id, retry_failed, on_chunk=print_progress)):
+        print("❌ Error: Batch is unknown or held by another runner (see BATCH_LEASE_SECONDS).")
+        return
+    elapsed = time.perf_counter() - started
+
+    batch = batch_verifier.get(batch_id)
+    print(f"✅ Batch {batch['status']} in {elapsed:.1f}s: {batch['done']} verified, {batch['failed']} failed")
+    print(f"   -> decisions: {batch['decisions']}")
+    for error in batch["errors"]:
+        print(f"   ⚠️  {error['item']}: {error['error']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-verify front/back/selfie triples in bulk (resumable). "
+                    "Files are matched as <key>_front / <key>_back / <key>_selfie images.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="Directory of triples (searched recursively)")
+    source.add_argument("--zip", help="Zip archive of triples")
+    source.add_argument("--uploads", nargs="*", metavar="REQUEST_ID",
+                        help="Earlier uploads under uploads/ (all of them if no IDs are given)")
+    source.add_argument("--ids-file", help="File with one uploads/ request ID per line")
+    source.add_argument("--resume", metavar="BATCH_ID", help="Continue an interrupted batch")
+    source.add_argument("--status", metavar="BATCH_ID", help="Print a batch's progress and exit")
+    parser.add_argument("--enroll", action="store_true", help="Add approved selfies to the face gallery")
+    parser.add_argument("--retry-failed", action="store_true", help="With --resume: retry failed items too")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.status:
+        print(batch_verifier.get(args.status) or "❌ Error: Unknown batch.")
+    elif args.resume:
+        backfill_kyc(args.resume, args.retry_failed)
+    else:
+        if args.dir:
+            kind, path, ids = "dir", args.dir, None
+        elif args.zip:
+            kind, path, ids = "zip", args.zip, None
+        elif args.ids_file:
+            with open(args.ids_file) as f:
+                kind, path, ids = "uploads", "", [line.strip() for line in f if line.strip()]
+        else:
+            kind, path, ids = "uploads", "", args.uploads or None
+
+        batch_id, total, skipped = batch_verifier.create(kind, path, ids, args.enroll)
+        print(f"📂 Batch {batch_id}: {total} triples ({skipped} incomplete or missing, skipped)")
+        print(f"   -> resume with: python backfill_kyc.py --resume {batch_id}")
+        backfill_kyc(batch_id)
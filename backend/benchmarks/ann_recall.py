@@ -0,0 +1,83 @@
+"""
+Recall-vs-latency benchmark for the IVF face index against the exact scan.
+
+    python -m benchmarks.ann_recall --rows 200000 --nlist 1024
+
+Uses synthetic clustered 512-d unit vectors (identities = cluster centres,
+samples = noisy views) so it runs without a real gallery.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from app.services.ann_index import IVFIndex
+
+def synthetic_gallery(rows, dim=512, identities=None, noise=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    identities = identities or max(1, rows // 20)
+    centres = rng.standard_normal((identities, dim)).astype(np.float32)
+    labels = rng.integers(0, identities, size=rows)
+    matrix = centres[labels] + noise * rng.standard_normal((rows, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    queries = centres[rng.integers(0, identities, size=200)]
+    queries += noise * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return matrix, queries
+
+def exact_top_k(matrix, query, top_k):
+    sims = matrix @ query
+    best = np.argpartition(-sims, top_k - 1)[:top_k]
+    return best[np.argsort(-sims[best])]
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+def run(rows, nlist, top_k, nprobes, queries_n):
+    matrix, queries = synthetic_gallery(rows)
+    queries = queries[:queries_n]
+
+    started = time.perf_counter()
+    index = IVFIndex(dim=matrix.shape[1], nlist=nlist).build(matrix)
+    build_s = time.perf_counter() - started
+
+    truth, exact_lat = [], []
+    for q in queries:
+        t = time.perf_counter()
+        truth.append(set(exact_top_k(matrix, q, top_k).tolist()))
+        exact_lat.append(time.perf_counter() - t)
+
+    report = {
+        "rows": rows, "nlist": index.nlist, "top_k": top_k, "build_seconds": round(build_s, 2),
+        "exact": {"p50_ms": percentile_ms(exact_lat, 50), "p95_ms": percentile_ms(exact_lat, 95)},
+        "ivf": [],
+    }
+    for nprobe in nprobes:
+        hits, lat = 0, []
+        for q, expected in zip(queries, truth):
+            t = time.perf_counter()
+            rows_found, _ = index.search(q, matrix, top_k, nprobe)
+            lat.append(time.perf_counter() - t)
+            hits += len(expected & set(rows_found.tolist()))
+        report["ivf"].append({
+            "nprobe": nprobe,
+            "recall_at_k": round(hits / (len(truth) * top_k), 4),
+            "p50_ms": percentile_ms(lat, 50),
+            "p95_ms": percentile_ms(lat, 95),
+        })
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    result = run(args.rows, args.nlist, args.top_k, args.nprobe, args.queries)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,74 @@
+"""
+Side-by-side latency and throughput of the inference backends.
+
+    python -m benchmarks.backend_latency --face eager torchscript onnx --ocr torch onnx
+
+Face: the recognizer forward pass on aligned crops at several batch sizes.
+OCR: full EasyOCR readtext on the ID-card fixtures in uploads/id_cards.
+Export the ONNX graphs first with `python export_onnx.py` (after
+`pip install -r requirements-onnx.txt`).
+"""
+import argparse
+import glob
+import json
+import time
+import numpy as np
+import torch
+from app.services.face_service import FaceService
+from app.services.ocr_service import OCRService
+
+def timed(fn, repeats):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return np.array(samples)
+
+def summarize(samples, items_per_call):
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 2),
+        "items_per_second": round(items_per_call / float(np.mean(samples)), 2),
+    }
+
+def bench_face(backends, batch_sizes, repeats):
+    crops = torch.randn(max(batch_sizes), 3, 160, 160)
+    rows = []
+    for backend in backends:
+        service = FaceService(backend)
+        for bs in batch_sizes:
+            faces = list(crops[:bs])
+            rows.append({"backend": backend, "batch": bs,
+                         **summarize(timed(lambda: service._embed_batch(faces), repeats), bs)})
+    return rows
+
+def bench_ocr(backends, images, repeats):
+    rows = []
+    for backend in backends:
+        service = OCRService(backend)
+        samples = timed(lambda: [service.reader.readtext(p, detail=0) for p in images], repeats)
+        rows.append({"backend": backend, "images": len(images), **summarize(samples, len(images))})
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--face", nargs="*", default=["eager", "onnx"])
+    parser.add_argument("--ocr", nargs="*", default=["torch", "onnx"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 8, 16])
+    parser.add_argument("--ocr-images", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    report = {"torch_threads": torch.get_num_threads()}
+    if args.face:
+        report["face"] = bench_face(args.face, args.batch_sizes, args.repeats)
+    if args.ocr:
+        images = sorted(glob.glob("uploads/id_cards/*.jpg"))[:args.ocr_images]
+        report["ocr"] = bench_ocr(args.ocr, images, max(1, args.repeats // 5))
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
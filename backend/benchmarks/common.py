@@ -0,0 +1,52 @@
+import json
+import time
+import numpy as np
+
+def timed(fn, repeats, warmup=1):
+    """Wall-clock seconds for `repeats` calls of fn(i), after `warmup` untimed calls."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeats):
+        t = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t)
+    return np.array(samples)
+
+def summarize(samples, items_per_call=1):
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size == 0:
+        return {"calls": 0}
+    return {
+        "calls": int(samples.size),
+        "mean_ms": round(float(samples.mean()) * 1000, 3),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+        "items_per_second": round(items_per_call * samples.size / float(samples.sum()), 2) if samples.sum() else None,
+    }
+
+def compare(baseline, current, path=""):
+    """Yields (path, before, after, change %) for every *_ms / *_per_second / *_rps field present in both."""
+    if isinstance(baseline, dict) and isinstance(current, dict):
+        for key in baseline.keys() & current.keys():
+            yield from compare(baseline[key], current[key], f"{path}.{key}" if path else key)
+    elif isinstance(baseline, list) and isinstance(current, list):
+        for i, (b, c) in enumerate(zip(baseline, current)):
+            yield from compare(b, c, f"{path}[{i}]")
+    elif path.endswith(("_ms", "_per_second", "_rps", "_seconds")) and isinstance(baseline, (int, float)) \
+            and isinstance(current, (int, float)) and baseline:
+        yield path, baseline, current, round((current - baseline) / baseline * 100, 1)
+
+def write_report(report, out=None, baseline=None):
+    """Prints the JSON report, optionally writes it to `out` and diffs it against a baseline file."""
+    print(json.dumps(report, indent=2))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            before = json.load(f)
+        print("\n📈 Change vs baseline (latency: lower is better, throughput: higher is better)")
+        for path, b, c, change in sorted(compare(before, report)):
+            print(f"   {path}: {b} -> {c} ({change:+}%)")
@@ -0,0 +1,118 @@
+"""
+Accuracy-parity and latency check for the optimized FaceNet/MTCNN backends.
+
+    python -m benchmarks.face_backend_parity --backends quantized torchscript
+
+Every fixture image (uploads/id_cards, uploads/selfies by default) is
+embedded by the eager float32 reference and by each candidate backend.
+The check fails (exit code 1) if any embedding's cosine drift
+(1 - cos(ref, candidate)) exceeds FACE_PARITY_TOLERANCE, or if any
+ID/selfie pair lands on the other side of the 50% match threshold.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+import torch
+from app.core.config import settings
+from app.services.face_service import FaceService
+from app.services.image_io import load_image
+
+MATCH_THRESHOLD = 50.0
+
+def fixture_images(fixture_dir):
+    if fixture_dir:
+        return sorted(glob.glob(os.path.join(fixture_dir, "*.jpg")) + glob.glob(os.path.join(fixture_dir, "*.png")))
+    return sorted(glob.glob("uploads/id_cards/*.jpg") + glob.glob("uploads/selfies/*.jpg"))
+
+def fixture_pairs(images):
+    """(id_card, selfie) pairs sharing a request id prefix."""
+    selfies = {os.path.basename(p).split("_")[0]: p for p in images if p.endswith("_selfie.jpg")}
+    pairs = []
+    for path in images:
+        name = os.path.basename(path)
+        if name.endswith(("_front.jpg", "_id.jpg")) and name.split("_")[0] in selfies:
+            pairs.append((path, selfies[name.split("_")[0]]))
+    return pairs
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+def embed_all(service, images):
+    # Straight through inference, bypassing the embedding cache
+    decoded = [load_image(p) for p in images]
+    return {path: (entry[0] if entry else None) for path, entry in zip(images, service._compute_embeddings(decoded))}
+
+def batch_latency_ms(service, faces, batch_size, repeats=10):
+    batch = [faces[i % len(faces)] for i in range(batch_size)]
+    service._embed_batch(batch)  # warm-up (tracing / compilation)
+    samples = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        service._embed_batch(batch)
+        samples.append(time.perf_counter() - t)
+    return round(float(np.median(samples)) * 1000, 2)
+
+def run(backends, fixture_dir, tolerance):
+    images = fixture_images(fixture_dir)
+    if not images:
+        raise SystemExit("❌ No fixture images found.")
+    pairs = fixture_pairs(images)
+
+    reference = FaceService("eager")
+    ref_vecs = embed_all(reference, images)
+    faces = [f[0] for f in reference._prepare_faces([load_image(p) for p in images[:8]])]
+
+    report = {
+        "fixtures": len(images), "pairs": len(pairs), "tolerance": tolerance,
+        "torch_threads": torch.get_num_threads(),
+        "eager": {"latency_ms_b1": batch_latency_ms(reference, faces, 1),
+                  "latency_ms_b8": batch_latency_ms(reference, faces, 8)},
+        "backends": [],
+    }
+    passed = True
+    for backend in backends:
+        candidate = FaceService(backend)
+        vecs = embed_all(candidate, images)
+
+        drifts = [1 - cosine(ref_vecs[p], vecs[p]) for p in images
+                  if ref_vecs[p] is not None and vecs[p] is not None]
+        flips = 0
+        for id_card, selfie in pairs:
+            if None in (ref_vecs[id_card], ref_vecs[selfie], vecs[id_card], vecs[selfie]):
+                continue
+            ref_match = cosine(ref_vecs[id_card], ref_vecs[selfie]) * 100 > MATCH_THRESHOLD
+            new_match = cosine(vecs[id_card], vecs[selfie]) * 100 > MATCH_THRESHOLD
+            flips += ref_match != new_match
+
+        max_drift = max(drifts) if drifts else 0.0
+        ok = max_drift <= tolerance and flips == 0
+        passed &= ok
+        report["backends"].append({
+            "backend": backend,
+            "max_cosine_drift": round(max_drift, 6),
+            "mean_cosine_drift": round(float(np.mean(drifts)), 6) if drifts else 0.0,
+            "decision_flips": flips,
+            "latency_ms_b1": batch_latency_ms(candidate, faces, 1),
+            "latency_ms_b8": batch_latency_ms(candidate, faces, 8),
+            "passed": ok,
+        })
+    return report, passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["quantized", "torchscript"])
+    parser.add_argument("--fixtures", help="Directory of fixture images (default: uploads/)")
+    parser.add_argument("--tolerance", type=float, default=settings.FACE_PARITY_TOLERANCE)
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    report, passed = run(args.backends, args.fixtures, args.tolerance)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,169 @@
+"""
+Synthetic Aadhaar-like fixtures, generated locally (no real identities).
+
+    python -m benchmarks.fixtures --out benchmarks/synthetic --count 20
+
+Writes <n>_front.jpg, <n>_back.jpg and <n>_selfie.jpg per identity plus
+labels.json ({"<file name>": {"name", "id_number", "dob", "pincode"}}),
+which benchmarks.ocr_resolution accepts as --labels. The "photo" and the
+selfie are drawn faces, so MTCNN may or may not find them; the benchmarks
+measure both paths either way.
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+CARD_SIZE = (1280, 807)   # ID-1 aspect at roughly phone-photo resolution
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Rahul", "Isha"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh", "Das", "Menon"]
+FALLBACK_PLACES = [("Pune", "Maharashtra", "411001"), ("Bengaluru", "Karnataka", "560001"),
+                   ("Jaipur", "Rajasthan", "302001"), ("Lucknow", "Uttar Pradesh", "226001")]
+
+def font(size):
+    for path in ("DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+def sample_places(limit=200):
+    """(district, state, pincode) triples from the UIDAI shards, so PIN lookups can hit."""
+    places = []
+    for path in sorted(glob.glob("data/api_data_*.csv"))[:1]:
+        df = pd.read_csv(path, usecols=[1, 2, 3], nrows=50_000, dtype=str).dropna().drop_duplicates()
+        df = df[df.iloc[:, 2].str.isdigit()]
+        for state, district, pincode in df.sample(min(limit, len(df)), random_state=0).itertuples(index=False):
+            places.append((district, state, pincode))
+    return places or FALLBACK_PLACES
+
+def draw_face(draw, box, rng):
+    """A plain cartoon face: skin ellipse, eyes, nose, mouth."""
+    x0, y0, x1, y1 = box
+    w, h = x1 - x0, y1 - y0
+    # Red > green > blue in realistic steps, so the quality gate's skin check sees a face
+    red = int(rng.integers(170, 236))
+    green = red - int(rng.integers(25, 61))
+    skin = (red, green, green - int(rng.integers(15, 46)))
+    draw.ellipse([x0 + w * 0.15, y0 + h * 0.1, x1 - w * 0.15, y1 - h * 0.05], fill=skin)
+    for ex in (0.36, 0.64):
+        cx, cy = x0 + w * ex, y0 + h * 0.42
+        draw.ellipse([cx - w * 0.06, cy - h * 0.03, cx + w * 0.06, cy + h * 0.03], fill=(245, 245, 245))
+        draw.ellipse([cx - w * 0.025, cy - h * 0.025, cx + w * 0.025, cy + h * 0.025], fill=(40, 30, 20))
+    draw.line([x0 + w * 0.5, y0 + h * 0.45, x0 + w * 0.47, y0 + h * 0.62], fill=(120, 80, 60), width=max(1, int(w * 0.02)))
+    draw.arc([x0 + w * 0.38, y0 + h * 0.62, x0 + w * 0.62, y0 + h * 0.78], 20, 160, fill=(150, 50, 50), width=max(1, int(w * 0.025)))
+
+def identity(index, places, rng):
+    digits = rng.integers(0, 10, size=12)
+    digits[0] = rng.integers(2, 10)  # Aadhaar numbers never start with 0 or 1
+    number = "".join(map(str, digits))
+    district, state, pincode = places[index % len(places)]
+    return {
+        "name": f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]}",
+        "id_number": f"{number[:4]} {number[4:8]} {number[8:]}",
+        "dob": f"DOB: {rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}/{rng.integers(1960, 2005)}",
+        "gender": ["MALE", "FEMALE"][index % 2],
+        "address": [f"S/O Ramesh, House No. {rng.integers(1, 999)}", f"Ward {rng.integers(1, 40)}, {district}",
+                    f"{state} - {pincode}"],
+        "district": district,
+        "pincode": pincode,
+    }
+
+def front_card(person, rng):
+    card = Image.new("RGB", CARD_SIZE, (250, 250, 245))
+    draw = ImageDraw.Draw(card)
+    w, h = CARD_SIZE
+    draw.rectangle([0, 0, w, 110], fill=(255, 153, 51))
+    draw.text((40, 30), "GOVERNMENT OF INDIA", font=font(48), fill=(20, 20, 20))
+    draw.rectangle([50, 160, 330, 520], fill=(210, 220, 230))
+    draw_face(draw, (50, 160, 330, 520), rng)
+    big, small = font(44), font(38)
+    draw.text((380, 190), person["name"], font=big, fill=(0, 0, 0))
+    draw.text((380, 270), person["dob"], font=small, fill=(0, 0, 0))
+    draw.text((380, 340), person["gender"], font=small, fill=(0, 0, 0))
+    draw.text((300, 620), person["id_number"], font=font(64), fill=(0, 0, 0))
+    draw.rectangle([0, h - 40, w, h], fill=(200, 30, 30))
+    return card
+
+def back_card(person):
+    card = Image.new("RGB", CARD_SIZE, (250, 250, 245))
+    draw = ImageDraw.Draw(card)
+    w, h = CARD_SIZE
+    draw.rectangle([0, 0, w, 110], fill=(255, 153, 51))
+    draw.text((40, 30), "UNIQUE IDENTIFICATION AUTHORITY OF INDIA", font=font(40), fill=(20, 20, 20))
+    draw.text((60, 180), "Address:", font=font(44), fill=(0, 0, 0))
+    for i, line in enumerate(person["address"]):
+        draw.text((60, 260 + i * 70), line, font=font(40), fill=(0, 0, 0))
+    draw.text((300, 620), person["id_number"], font=font(64), fill=(0, 0, 0))
+    draw.rectangle([0, h - 40, w, h], fill=(200, 30, 30))
+    return card
+
+def selfie(rng, size=(720, 960)):
+    img = Image.new("RGB", size, tuple(int(c) for c in rng.integers(60, 200, size=3)))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    draw_face(draw, (w * 0.15, h * 0.12, w * 0.85, h * 0.8), rng)
+    # Sensor noise so every selfie hashes differently (no embedding-cache hits)
+    pixels = np.asarray(img, dtype=np.int16) + rng.integers(-6, 7, size=(h, w, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def jpeg_bytes(img, quality=90):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+def generate(count, seed=0):
+    """Yields (person, front_bytes, back_bytes, selfie_bytes) in memory."""
+    rng = np.random.default_rng(seed)
+    places = sample_places()
+    for index in range(count):
+        person = identity(index, places, rng)
+        yield person, jpeg_bytes(front_card(person, rng)), jpeg_bytes(back_card(person)), jpeg_bytes(selfie(rng))
+
+def write_fixtures(out_dir, count, seed=0):
+    os.makedirs(out_dir, exist_ok=True)
+    labels = {}
+    for index, (person, front, back, face) in enumerate(generate(count, seed)):
+        for suffix, data in (("front", front), ("back", back), ("selfie", face)):
+            with open(os.path.join(out_dir, f"{index:04d}_{suffix}.jpg"), "wb") as f:
+                f.write(data)
+        labels[f"{index:04d}_front.jpg"] = {k: person[k] for k in ("name", "id_number", "dob")}
+        labels[f"{index:04d}_back.jpg"] = {"pincode": person["pincode"], "district": person["district"]}
+    with open(os.path.join(out_dir, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=2)
+    return labels
+
+def synthetic_shards(out_dir, rows, shards=4, seed=0):
+    """UIDAI-shaped CSVs (date,state,district,pincode,updates...) for ingest benchmarks."""
+    rng = np.random.default_rng(seed)
+    places = sample_places(limit=5000)
+    os.makedirs(out_dir, exist_ok=True)
+    per_shard = max(1, rows // shards)
+    for shard in range(shards):
+        picks = rng.integers(0, len(places), size=per_shard)
+        updates = rng.poisson(5, size=(per_shard, 2))
+        path = os.path.join(out_dir, f"api_data_synthetic_{shard:03d}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["date", "state", "district", "pincode", "demo_age_5_17", "demo_age_17_"])
+            for (district, state, pincode), (a, b) in zip((places[i] for i in picks), updates):
+                writer.writerow(["01-01-2025", state, district, pincode, a, b])
+    return os.path.join(out_dir, "api_data_*.csv")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="benchmarks/synthetic")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_fixtures(args.out, args.count, args.seed)
+    print(f"✅ Wrote {args.count} synthetic identities to {args.out}")
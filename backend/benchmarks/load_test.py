@@ -0,0 +1,109 @@
+"""
+In-process load test of POST /api/v1/kyc/verify at fixed concurrency levels.
+
+    python -m benchmarks.load_test --concurrency 1 4 8 16 --requests 32 --out load.json
+
+Requests go through httpx's ASGI transport straight into the FastAPI app
+(no sockets, no uvicorn), with the app's lifespan run as usual. By default
+the app runs in a scratch directory with a copy of kyc.db, so the
+benchmark's KYCRecords, gallery rows and uploads never touch the real ones
+(pass --in-place to skip that). Every request uses a fresh synthetic
+identity, so the embedding cache does not flatter the numbers.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from benchmarks.common import summarize, write_report
+from benchmarks.fixtures import generate
+
+def prepare_scratch():
+    """Runs the app from a throwaway copy of the working directory state."""
+    scratch = tempfile.mkdtemp(prefix="kyc-load-")
+    for name in ("kyc.db", "risk_policy.json"):
+        if os.path.exists(name):
+            shutil.copy(name, os.path.join(scratch, name))
+    # Paths that Settings derives from the cwd must keep pointing at the real files
+    os.environ.setdefault("ONNX_MODEL_DIR", os.path.abspath(os.path.join("models", "onnx")))
+    os.chdir(scratch)
+    return scratch
+
+async def run_level(client, payloads, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(files):
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/kyc/verify", files=files)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(files) for files in payloads))
+    wall = time.perf_counter() - started
+    stats = summarize(latencies)
+    stats.pop("items_per_second", None)
+    return {"concurrency": concurrency, "requests": len(payloads), "errors": errors,
+            "throughput_rps": round(len(payloads) / wall, 3), **stats}
+
+async def main(args, identities):
+    import httpx
+    from app.core.telemetry import STAGE_SECONDS
+    from app.main import app
+
+    payloads = [
+        {
+            "id_card_front": (f"{i}_front.jpg", front, "image/jpeg"),
+            "id_card_back": (f"{i}_back.jpg", back, "image/jpeg"),
+            "selfie": (f"{i}_selfie.jpg", face, "image/jpeg"),
+        }
+        for i, (_, front, back, face) in enumerate(identities)
+    ]
+
+    report = {"levels": []}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kyc.bench", timeout=None) as client:
+            # Warm-up request: first-call allocations, thread pools, batchers
+            await client.post("/api/v1/kyc/verify", files=payloads[0])
+            offset = 1
+            for concurrency in args.concurrency:
+                batch = payloads[offset:offset + args.requests]
+                offset += args.requests
+                level = await run_level(client, batch, concurrency)
+                print(f"   -> concurrency {concurrency}: {level['throughput_rps']} req/s, p95 {level['p95_ms']} ms")
+                report["levels"].append(level)
+    report["stages"] = STAGE_SECONDS.summary()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=16, help="Requests per concurrency level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-place", action="store_true", help="Use ./kyc.db instead of a scratch copy")
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    parser.add_argument("--baseline", help="Earlier --out file to compare against")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    # Settings are read at import time, so configure before importing the app
+    os.environ.setdefault("MODEL_LOADING", "eager")
+    os.environ.setdefault("PERSIST_UPLOADS", "false")
+    os.environ.setdefault("KYC_JOB_WORKERS", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Generated before leaving the repo dir: back cards use real PINs from data/
+    identities = list(generate(args.requests * len(args.concurrency) + 1, seed=args.seed))
+    scratch = None if args.in_place else prepare_scratch()
+    try:
+        report = asyncio.run(main(args, identities))
+        write_report(report, out, baseline)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
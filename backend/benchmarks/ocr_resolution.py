@@ -0,0 +1,89 @@
+"""
+OCR latency vs. field accuracy across input resolutions and crop modes.
+
+    python -m benchmarks.ocr_resolution --long-edges 0 1600 1280 960 720
+
+Every configuration runs extract_text over the ID-card fixtures in
+uploads/id_cards. Without --labels the parsed fields at full resolution
+(no crop, no ROIs) are the reference; with --labels (a JSON file of
+{"<file name>": {"name": ..., "id_number": ..., "dob": ...}}) they are
+scored against ground truth instead.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+from app.services.image_io import load_image
+from app.services.ocr_preprocess import OCRPreprocessor
+from app.services.ocr_service import OCRService
+
+FIELDS = ("name", "id_number", "dob", "address")
+
+def side_of(path):
+    return "back" if "back" in os.path.basename(path) else "front"
+
+def run_config(service, images, preprocessor):
+    service.preprocessor = preprocessor
+    parsed, samples = {}, []
+    for path, image in images:
+        t = time.perf_counter()
+        parsed[path] = service.extract_text(image, side_of(path))
+        samples.append(time.perf_counter() - t)
+    return parsed, np.array(samples)
+
+def agreement(parsed, reference):
+    """Fraction of reference fields (that were found at all) reproduced exactly."""
+    hits = total = 0
+    for path, expected in reference.items():
+        for field in FIELDS:
+            value = expected.get(field)
+            if not value or value == "Unknown":
+                continue
+            total += 1
+            hits += parsed.get(path, {}).get(field) == value
+    return round(hits / total, 4) if total else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--long-edges", type=int, nargs="+", default=[0, 1600, 1280, 960, 720])
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--labels", help="JSON ground truth keyed by file name")
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob("uploads/id_cards/*.jpg"))[:args.images]
+    images = [(p, load_image(p)) for p in paths]
+    for _, image in images:
+        image.pixels  # decode up front so it is not part of the timings
+
+    service = OCRService()
+    baseline, baseline_t = run_config(service, images, OCRPreprocessor(0, crop_card=False))
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+        reference = {p: labels[os.path.basename(p)] for p in paths if os.path.basename(p) in labels}
+    else:
+        reference = baseline
+
+    rows = []
+    for long_edge in args.long_edges:
+        for crop_card, field_rois in ((False, False), (True, False), (True, True)):
+            preprocessor = OCRPreprocessor(long_edge, crop_card=crop_card, field_rois=field_rois)
+            parsed, samples = run_config(service, images, preprocessor)
+            rows.append({
+                "long_edge": long_edge or "full",
+                "card_crop": crop_card,
+                "field_rois": field_rois,
+                "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 2),
+                "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 2),
+                "speedup": round(float(baseline_t.sum() / samples.sum()), 2),
+                "field_accuracy": agreement(parsed, reference),
+            })
+
+    report = {"images": len(images), "reference": "labels" if args.labels else "full resolution", "configs": rows}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
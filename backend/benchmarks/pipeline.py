@@ -0,0 +1,205 @@
+"""
+Microbenchmarks for each stage of the KYC pipeline on synthetic fixtures.
+
+    python -m benchmarks.pipeline --out baseline.json
+    python -m benchmarks.pipeline --sections pincode ingest --baseline baseline.json
+
+Sections:
+  face     FaceService.get_embedding (cold = unseen image, warm = cache hit)
+           and verify_faces on fresh card/selfie pairs
+  ocr      OCRService.extract_text on synthetic front/back cards, with field accuracy
+  gate     QualityGate.evaluate on clean and degraded (blurred, dark, swapped)
+           uploads: cost per image and what it rejects
+  risk     RiskEngine.calculate_risk per request vs. score_batch over 100k rows
+  pincode  RegionalRiskIndex.lookup_pincode vs. the equivalent SQLite query
+  ingest   ingest_data.py (full / stream / incremental) on synthetic UIDAI
+           shards of several sizes, each in a scratch database
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from sqlalchemy import create_engine, text
+from benchmarks.common import timed, summarize, write_report
+from benchmarks.fixtures import generate, synthetic_shards
+
+SECTIONS = ("face", "ocr", "gate", "risk", "pincode", "ingest")
+
+def bench_face(fixtures, repeats):
+    from app.services.face_service import FaceService
+    from app.services.image_io import DecodedImage
+    service = FaceService()
+    # Never read or write the real kyc.db: earlier runs would turn "cold" into disk hits
+    service.cache.persist = False
+    cards = [DecodedImage(front, f"{i}_front.jpg") for i, (_, front, _, _) in enumerate(fixtures)]
+    selfies = [DecodedImage(face, f"{i}_selfie.jpg") for i, (_, _, _, face) in enumerate(fixtures)]
+    n = min(repeats, len(selfies) - 1)
+
+    # Cold: every call sees new bytes, so the embedding cache cannot help
+    cold = timed(lambda i: service.get_embedding(selfies[1 + i]), n, warmup=0)
+    service.cache.clear()
+    warm = timed(lambda i: service.get_embedding(selfies[1]), n)
+    # A trailing byte changes the hash (not the pixels), so verify_faces runs cold too
+    verify = timed(lambda i: service.verify_faces(
+        DecodedImage(cards[i].data + b"\0", cards[i].name), DecodedImage(selfies[i].data + b"\0", selfies[i].name)), n)
+    return {
+        "backend": service.backend,
+        "get_embedding_cold": summarize(cold),
+        "get_embedding_warm": summarize(warm),
+        "verify_faces": summarize(verify),
+    }
+
+def bench_ocr(fixtures, repeats):
+    from app.services.image_io import DecodedImage
+    from app.services.ocr_service import OCRService
+    service = OCRService()
+    n = min(repeats, len(fixtures))
+    parsed = []
+
+    def read_front(i):
+        person, front, _, _ = fixtures[i]
+        parsed.append((person, service.extract_text(DecodedImage(front, f"{i}_front.jpg"), "front")))
+
+    front = timed(read_front, n, warmup=0)
+    back = timed(lambda i: service.extract_text(DecodedImage(fixtures[i][2], f"{i}_back.jpg"), "back"), n, warmup=0)
+    fields = ("name", "id_number", "dob")
+    hits = sum(result.get(f) == person[f] for person, result in parsed for f in fields)
+    return {
+        "extract_text_front": summarize(front),
+        "extract_text_back": summarize(back),
+        "field_accuracy": round(hits / (len(parsed) * len(fields)), 4) if parsed else None,
+    }
+
+def bench_gate(fixtures, repeats):
+    import io
+    from collections import Counter
+    from PIL import Image, ImageFilter
+    from app.services.quality_gate import quality_gate
+    decoded = [
+        {role: Image.open(io.BytesIO(data)).convert("RGB") for role, data in zip(("front", "back", "selfie"), images)}
+        for _, *images in fixtures
+    ]
+    variants = {
+        "clean": lambda img, role: (img, role),
+        "blurred": lambda img, role: (img.filter(ImageFilter.GaussianBlur(6)), role),
+        "dark": lambda img, role: (img.point(lambda v: v // 12), role),
+        # Back uploaded as the front (and vice versa)
+        "swapped": lambda img, role: (img, {"front": "back", "back": "front"}.get(role, role)),
+    }
+    report = {}
+    for name, degrade in variants.items():
+        cases = [(np.asarray(img), role) for images in decoded for img, role in (degrade(i, r) for r, i in images.items())]
+        codes = Counter()
+        for pixels, role in cases:
+            failure = quality_gate.evaluate(pixels, role)
+            codes[failure["code"] if failure else "pass"] += 1
+        samples = timed(lambda i: quality_gate.evaluate(*cases[i % len(cases)]), max(repeats, len(cases)))
+        report[name] = {"outcomes": dict(codes), "evaluate": summarize(samples)}
+    return report
+
+def bench_risk(fixtures, repeats):
+    from app.services.risk_engine import risk_engine
+    rng = np.random.default_rng(0)
+    cases = [
+        ({"id_number": person["id_number"] if i % 4 else "", "avg_confidence": float(rng.random())},
+         {"score": float(rng.uniform(0, 100)), "match": bool(i % 3)})
+        for i, (person, *_rest) in enumerate(fixtures)
+    ]
+    calls = 10_000
+    samples = timed(lambda _: [risk_engine.calculate_risk(*cases[i % len(cases)]) for i in range(calls)], max(3, repeats // 5))
+
+    # What a policy-change rescore of history does per chunk
+    rows = 100_000
+    signals = {
+        "face_score": rng.uniform(0, 100, rows),
+        "face_match": rng.random(rows) < 0.7,
+        "ocr_confidence": rng.uniform(0, 100, rows),
+        "id_detected": rng.random(rows) < 0.9,
+        "regional_risk": np.where(rng.random(rows) < 0.2, np.nan, rng.uniform(0, 100, rows)),
+        "duplicate_suspect": rng.random(rows) < 0.01,
+    }
+    batch = timed(lambda _: risk_engine.score_batch(signals), max(3, repeats // 5))
+    return {
+        "policy_version": risk_engine.policy().version,
+        "calculate_risk_x10000": summarize(samples, calls),
+        "score_batch_x100000": summarize(batch, rows),
+    }
+
+def bench_pincode(repeats):
+    from app.database import engine
+    from app.services.regional_risk import regional_risk_index
+    started = time.perf_counter()
+    regional_risk_index.load()
+    load_s = time.perf_counter() - started
+
+    rng = np.random.default_rng(0)
+    pins = [str(p) for p in rng.integers(100000, 999999, size=10_000)]
+    index = timed(lambda _: [regional_risk_index.lookup_pincode(p) for p in pins], max(3, repeats // 5))
+
+    # What the endpoint did per request before the in-memory index
+    sql = text("SELECT District, Risk_Score FROM uidai_regional_risk WHERE Pincode = :pin LIMIT 1")
+    with engine.connect() as conn:
+        query = timed(lambda i: conn.execute(sql, {"pin": pins[i]}).fetchone(), min(repeats * 10, len(pins)))
+    return {
+        "index_load_seconds": round(load_s, 3),
+        "lookup_pincode_x10000": summarize(index, len(pins)),
+        "sqlite_query": summarize(query),
+    }
+
+def bench_ingest(sizes, workers):
+    import ingest_data as ingest
+    saved = (ingest.engine, ingest.DATABASE_PATH, ingest.CSV_GLOB)
+    rows = []
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as scratch:
+                csv_glob = synthetic_shards(os.path.join(scratch, "data"), size)
+                for mode in ("full", "stream", "incremental", "incremental_noop"):
+                    db_path = os.path.join(scratch, f"{mode.split('_')[0]}.db")
+                    ingest.engine = create_engine(f"sqlite:///{db_path}")
+                    ingest.DATABASE_PATH = db_path
+                    ingest.CSV_GLOB = csv_glob
+                    run = {
+                        "full": ingest.ingest_data,
+                        "stream": lambda: ingest.ingest_data_streaming(workers),
+                        "incremental": lambda: ingest.ingest_data_incremental(workers),
+                        # Second incremental run over unchanged shards
+                        "incremental_noop": lambda: ingest.ingest_data_incremental(workers),
+                    }[mode]
+                    started = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - started
+                    ingest.engine.dispose()
+                    rows.append({"rows": size, "mode": mode, "elapsed_seconds": round(elapsed, 3),
+                                 "rows_per_second": round(size / elapsed, 1)})
+    finally:
+        ingest.engine, ingest.DATABASE_PATH, ingest.CSV_GLOB = saved
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--fixtures", type=int, default=12, help="Synthetic identities to generate")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--ingest-sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=None, help="Ingest worker processes")
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    parser.add_argument("--baseline", help="Earlier --out file to compare against")
+    args = parser.parse_args()
+
+    fixtures = list(generate(max(args.fixtures, args.repeats + 1)))
+    report = {"fixtures": len(fixtures)}
+    if "face" in args.sections:
+        report["face"] = bench_face(fixtures, args.repeats)
+    if "ocr" in args.sections:
+        report["ocr"] = bench_ocr(fixtures, args.repeats)
+    if "gate" in args.sections:
+        report["gate"] = bench_gate(fixtures, args.repeats)
+    if "risk" in args.sections:
+        report["risk"] = bench_risk(fixtures, args.repeats)
+    if "pincode" in args.sections:
+        report["pincode"] = bench_pincode(args.repeats)
+    if "ingest" in args.sections:
+        report["ingest"] = bench_ingest(args.ingest_sizes, args.workers)
+    write_report(report, args.out, args.baseline)
@@ -0,0 +1,139 @@
+"""
+Memory and throughput of N API workers: `uvicorn --workers N` (every worker
+loads its own models) versus `serve.py --workers N` (preload, then fork).
+
+    python -m benchmarks.worker_memory --workers 1 2 4 --requests 40
+
+Memory is the summed PSS (proportional set size, so shared pages are split
+between the processes that map them) of the server process tree, read from
+/proc, Linux only. Throughput replays /api/v1/kyc/verify with ID/selfie
+triples from uploads/. Verification writes records, so point it at a
+scratch copy of kyc.db.
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+def process_tree(root_pid):
+    pids, frontier = [root_pid], [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                kids = [int(p) for p in f.read().split()]
+        except OSError:
+            kids = []
+        pids.extend(kids)
+        frontier.extend(kids)
+    return pids
+
+def pss_mb(pids):
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return round(total_kb / 1024, 1)
+
+def wait_ready(base_url, workers, timeout=600):
+    """Polls /health/ready until enough consecutive 200s suggest every worker is warm."""
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            ok = requests.get(f"{base_url}/health/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= workers * 4:
+            return True
+        time.sleep(0.25)
+    return False
+
+def fixture_triples(limit=None):
+    triples = []
+    for front in sorted(glob.glob("uploads/id_cards/*_front.jpg")):
+        request_id = os.path.basename(front)[:-len("_front.jpg")]
+        back = f"uploads/id_cards/{request_id}_back.jpg"
+        selfie = f"uploads/selfies/{request_id}_selfie.jpg"
+        if os.path.exists(back) and os.path.exists(selfie):
+            triples.append((front, back, selfie))
+    return triples[:limit] if limit else triples
+
+def verify_once(base_url, triple):
+    front, back, selfie = triple
+    with open(front, "rb") as f1, open(back, "rb") as f2, open(selfie, "rb") as f3:
+        files = {"id_card_front": f1, "id_card_back": f2, "selfie": f3}
+        t = time.perf_counter()
+        ok = requests.post(f"{base_url}/api/v1/kyc/verify", files=files, timeout=300).ok
+    return ok, time.perf_counter() - t
+
+def measure(mode, workers, port, n_requests, concurrency):
+    env = dict(os.environ, MODEL_LOADING="eager")
+    if mode == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers)]
+    else:
+        cmd = [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers)]
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_ready(base_url, workers):
+            return {"mode": mode, "workers": workers, "error": "not ready"}
+        ready_s = time.perf_counter() - started
+        idle_mb = pss_mb(process_tree(proc.pid))
+
+        triples = fixture_triples()
+        work = [triples[i % len(triples)] for i in range(n_requests)] if triples else []
+        t = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda tr: verify_once(base_url, tr), work))
+        wall = time.perf_counter() - t
+        ok = sum(1 for r in results if r[0])
+        return {
+            "mode": mode,
+            "workers": workers,
+            "startup_seconds": round(ready_s, 1),
+            "pss_idle_mb": idle_mb,
+            "pss_after_load_mb": pss_mb(process_tree(proc.pid)),
+            "requests": len(work),
+            "ok": ok,
+            "throughput_rps": round(ok / wall, 3) if wall > 0 else 0,
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    report = []
+    for n in args.workers:
+        for mode in ("uvicorn", "preload-fork"):
+            row = measure(mode, n, args.port, args.requests, args.concurrency)
+            print(json.dumps(row))
+            report.append(row)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
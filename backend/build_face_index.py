@@ -0,0 +1,29 @@
+import argparse
+import time
+from app.core.config import settings
+from app.services.face_gallery import face_gallery
+
+def build_face_index(nlist=settings.FACE_ANN_NLIST, iterations=20, sample_size=100_000):
+    print("🚀 Building Face ANN Index (IVF)...")
+
+    rows = len(face_gallery)
+    if rows == 0:
+        print("❌ Error: Face gallery is empty. Approve some verifications first.")
+        return
+
+    print(f"📂 Gallery has {rows} embeddings. Training {nlist} cells...")
+    started = time.perf_counter()
+    index = face_gallery.build_index(nlist=nlist, iterations=iterations, sample_size=sample_size)
+    elapsed = time.perf_counter() - started
+
+    sizes = [l.shape[0] for l in index.lists]
+    print(f"✅ Index saved to {settings.FACE_INDEX_PATH} in {elapsed:.1f}s")
+    print(f"   -> cells: {index.nlist}, rows/cell min {min(sizes)} / max {max(sizes)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the IVF index over face_gallery.f32")
+    parser.add_argument("--nlist", type=int, default=settings.FACE_ANN_NLIST)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sample-size", type=int, default=100_000)
+    args = parser.parse_args()
+    build_face_index(args.nlist, args.iterations, args.sample_size)
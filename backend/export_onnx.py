@@ -0,0 +1,79 @@
+"""
+Exports the face and OCR networks to ONNX for FACE_BACKEND=onnx / OCR_BACKEND=onnx.
+
+    python export_onnx.py            # everything
+    python export_onnx.py --only facenet pnet
+
+Needs the optional packages in requirements-onnx.txt.
+Graphs land in settings.ONNX_MODEL_DIR with dynamic batch (and, where the
+network is fully convolutional, dynamic height/width) axes.
+"""
+import argparse
+import os
+import torch
+from app.core.config import settings
+from app.services.onnx_backend import ONNX_MODELS, model_path
+
+OPSET = 17
+
+class RecognizerGraph(torch.nn.Module):
+    """EasyOCR's recognizer takes (image, text); the text input is unused at inference."""
+
+    def __init__(self, recognizer):
+        super().__init__()
+        self.recognizer = recognizer
+
+    def forward(self, image):
+        return self.recognizer(image, None)
+
+def export(module, example, name, input_names, output_names, dynamic_axes):
+    path = model_path(name)
+    with torch.no_grad():
+        torch.onnx.export(
+            module.eval(), example, path,
+            input_names=input_names, output_names=output_names,
+            dynamic_axes=dynamic_axes, opset_version=OPSET, do_constant_folding=True,
+        )
+    print(f"   ✅ {name} -> {path}")
+
+def export_face(only):
+    from facenet_pytorch import MTCNN, InceptionResnetV1
+    if "facenet" in only:
+        resnet = InceptionResnetV1(pretrained='vggface2')
+        export(resnet, torch.randn(2, 3, 160, 160), "facenet",
+               ["faces"], ["embeddings"], {"faces": {0: "batch"}, "embeddings": {0: "batch"}})
+
+    mtcnn = MTCNN(device='cpu')
+    if "pnet" in only:
+        export(mtcnn.pnet, torch.randn(1, 3, 64, 64), "pnet", ["image"], ["boxes", "probs"],
+               {"image": {0: "batch", 2: "height", 3: "width"},
+                "boxes": {0: "batch", 2: "h_out", 3: "w_out"}, "probs": {0: "batch", 2: "h_out", 3: "w_out"}})
+    if "rnet" in only:
+        export(mtcnn.rnet, torch.randn(2, 3, 24, 24), "rnet", ["crops"], ["boxes", "probs"],
+               {"crops": {0: "batch"}, "boxes": {0: "batch"}, "probs": {0: "batch"}})
+    if "onet" in only:
+        export(mtcnn.onet, torch.randn(2, 3, 48, 48), "onet", ["crops"], ["boxes", "points", "probs"],
+               {"crops": {0: "batch"}, "boxes": {0: "batch"}, "points": {0: "batch"}, "probs": {0: "batch"}})
+
+def export_ocr(only):
+    import easyocr
+    reader = easyocr.Reader(['en'], gpu=False)
+    if "craft" in only:
+        export(reader.detector, torch.randn(1, 3, 640, 640), "craft", ["image"], ["score_maps", "features"],
+               {"image": {0: "batch", 2: "height", 3: "width"},
+                "score_maps": {0: "batch", 1: "h_out", 2: "w_out"}, "features": {0: "batch", 2: "h_out", 3: "w_out"}})
+    if "recognizer" in only:
+        export(RecognizerGraph(reader.recognizer), torch.randn(1, 1, 64, 256), "recognizer", ["crops"], ["logits"],
+               {"crops": {0: "batch", 3: "width"}, "logits": {0: "batch", 1: "steps"}})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(ONNX_MODELS), default=list(ONNX_MODELS))
+    args = parser.parse_args()
+
+    os.makedirs(settings.ONNX_MODEL_DIR, exist_ok=True)
+    print(f"🚀 Exporting {len(args.only)} graph(s) to ONNX (opset {OPSET})...")
+    export_face(set(args.only))
+    if {"craft", "recognizer"} & set(args.only):
+        export_ocr(set(args.only))
+    print("🎉 Done! Set FACE_BACKEND=onnx and/or OCR_BACKEND=onnx to use them.")
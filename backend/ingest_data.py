@@ -1,17 +1,48 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import hashlib
+import sqlite3
 import glob
 import os
 
 # 1. Setup Database Connection
 DATABASE_URL = "sqlite:///./kyc.db"
+DATABASE_PATH = DATABASE_URL.replace("sqlite:///", "")
 engine = create_engine(DATABASE_URL)
 
+CSV_GLOB = "data/api_data_*.csv"
+CHUNK_ROWS = 200_000
+INSERT_BATCH_ROWS = 50_000
+
+def finalize_statements():
+    """
+    Indexes for the columns the API still queries ad hoc, plus a version bump
+    so running servers reload their in-memory RegionalRiskIndex.
+    Returns (sql, params) pairs so both SQLAlchemy and raw sqlite3 can run them.
+    """
+    version = datetime.utcnow().isoformat()
+    return [
+        ("CREATE INDEX IF NOT EXISTS ix_uidai_regional_risk_pincode ON uidai_regional_risk (Pincode)", {}),
+        ("CREATE INDEX IF NOT EXISTS ix_uidai_regional_risk_district ON uidai_regional_risk (District)", {}),
+        ("CREATE INDEX IF NOT EXISTS ix_uidai_regional_risk_risk_score ON uidai_regional_risk (Risk_Score DESC)", {}),
+        ("CREATE TABLE IF NOT EXISTS uidai_ingest_meta (key TEXT PRIMARY KEY, value TEXT)", {}),
+        ("INSERT OR REPLACE INTO uidai_ingest_meta (key, value) VALUES ('risk_table_version', :v)", {"v": version}),
+    ]
+
+def finalize_risk_table():
+    with engine.begin() as conn:
+        for sql, params in finalize_statements():
+            conn.execute(text(sql), params)
+    print("🗂️  Indexes ready, risk table version bumped")
+
 def ingest_data():
     print("🚀 Starting Data Pipeline (Final v3 - State + Pincode)...")
     
     # 2. Find all CSV files
-    path = "data/api_data_*.csv" 
+    path = CSV_GLOB
     all_files = glob.glob(path)
     
     if not all_files:
@@ -61,12 +92,332 @@ def ingest_data():
     
     final_table['Risk_Score'] = final_table['Risk_Score'].fillna(0)
 
-    # 5. Save to Database
+    # 5. Save to Database (the incremental manifest no longer describes it)
     print("💾 Saving 2 Million+ Rows to SQLite...")
+    reset_manifest()
     final_table.to_sql('uidai_regional_risk', engine, if_exists='replace', index=False)
+    finalize_risk_table()
 
     print("✅ Success! Database now has State + District + Pincode.")
     print(final_table.head())
 
+# --- STREAMING MODE ---
+# Shards are read in chunks by worker processes; each returns only its partial
+# aggregates, so peak memory is one chunk per worker plus the unique
+# (State, District, Pincode) triples, never the whole dataset.
+
+def read_shard_chunks(filename, chunksize=CHUNK_ROWS):
+    """Yields cleaned (State, District, Pincode, Updates) chunks of one shard."""
+    # Read Columns: B=State, C=District, D=Pincode, E=Updates
+    for df in pd.read_csv(filename, header=None, usecols=[1, 2, 3, 4], dtype=str, chunksize=chunksize):
+        df.columns = ['State', 'District', 'Pincode', 'Updates']
+        df['Updates'] = pd.to_numeric(df['Updates'], errors='coerce').fillna(0)
+        df['Pincode'] = df['Pincode'].str.replace(r'\.0$', '', regex=True)
+        df['State'] = df['State'].str.strip()
+        df['District'] = df['District'].str.strip()
+        # Drops the CSV header row and rows we could never look up
+        df = df[df['Pincode'].str.isdigit().fillna(False) & (df['District'].fillna('') != '')]
+        yield df
+
+def process_shard(filename, chunksize=CHUNK_ROWS):
+    """Worker: returns (district -> update sum, {(State, District, Pincode)}) for one shard."""
+    sums, triples = {}, set()
+    for df in read_shard_chunks(filename, chunksize):
+        for district, total in df.groupby('District')['Updates'].sum().items():
+            sums[district] = sums.get(district, 0.0) + float(total)
+        # A missing State becomes None: NaN never equals itself, so it would break set and SQL matching
+        triples.update((state if isinstance(state, str) else None, district, pincode) for state, district, pincode
+                       in df[['State', 'District', 'Pincode']].drop_duplicates().itertuples(index=False, name=None))
+    return filename, sums, triples
+
+def merge_partials(partials):
+    sums, triples = {}, set()
+    for _, shard_sums, shard_triples in partials:
+        for district, total in shard_sums.items():
+            sums[district] = sums.get(district, 0.0) + total
+        triples |= shard_triples
+    return sums, triples
+
+def risk_scores(district_sums):
+    """Normalizes district update totals to a 0-100 Risk_Score."""
+    max_updates = max(district_sums.values(), default=0)
+    if max_updates <= 0:
+        return {district: 0.0 for district in district_sums}
+    return {district: float(round(total / max_updates * 100)) for district, total in district_sums.items()}
+
+def swap_in_risk_table(rows, reset_incremental=False):
+    """
+    Writes rows into a staging table with batched executemany and swaps it in
+    within the same transaction, so readers see either the old table or the
+    complete new one, never an empty or half-written table.
+    reset_incremental also clears the incremental manifest in that transaction.
+    """
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS uidai_regional_risk_staging")
+        conn.execute(
+            'CREATE TABLE uidai_regional_risk_staging ("State" TEXT, "District" TEXT, "Pincode" TEXT, "Risk_Score" FLOAT)'
+        )
+        insert = "INSERT INTO uidai_regional_risk_staging VALUES (?, ?, ?, ?)"
+        for start in range(0, len(rows), INSERT_BATCH_ROWS):
+            conn.executemany(insert, rows[start:start + INSERT_BATCH_ROWS])
+        conn.execute("DROP TABLE IF EXISTS uidai_regional_risk")
+        conn.execute("ALTER TABLE uidai_regional_risk_staging RENAME TO uidai_regional_risk")
+        for sql, params in finalize_statements():
+            conn.execute(sql, params)
+        if reset_incremental:
+            clear_incremental_state(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def ingest_data_streaming(workers=None, chunksize=CHUNK_ROWS):
+    print("🚀 Starting Data Pipeline (Streaming - chunked, parallel, atomic swap)...")
+
+    all_files = sorted(glob.glob(CSV_GLOB))
+    if not all_files:
+        print("❌ Error: No CSV files found.")
+        return
+
+    workers = workers or min(len(all_files), os.cpu_count() or 1)
+    print(f"📂 Found {len(all_files)} data shards. Processing with {workers} worker(s)...")
+
+    partials = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_shard, f, chunksize) for f in all_files]
+            for fut in futures:
+                try:
+                    partials.append(fut.result())
+                    print(f"   -> Processed {os.path.basename(partials[-1][0])}")
+                except Exception as e:
+                    print(f"   ⚠️ Skipping shard: {e}")
+    else:
+        for filename in all_files:
+            try:
+                partials.append(process_shard(filename, chunksize))
+                print(f"   -> Processed {os.path.basename(filename)}")
+            except Exception as e:
+                print(f"   ⚠️ Skipping {filename}: {e}")
+
+    if not partials: return
+
+    # 3. Calculate Risk Score per DISTRICT
+    print("🧠 Calculating Regional Risk Scores...")
+    district_sums, triples = merge_partials(partials)
+    scores = risk_scores(district_sums)
+
+    # 4. Map scores onto the unique (State, District, Pincode) rows
+    print("🔗 Mapping Data...")
+    rows = [(state, district, pincode, scores.get(district, 0.0))
+            for state, district, pincode in sorted(triples, key=lambda t: (t[0] or '', t[1], t[2]))]
+
+    # 5. Staging table + atomic swap
+    print(f"💾 Saving {len(rows)} Rows to SQLite (staging + swap)...")
+    swap_in_risk_table(rows, reset_incremental=True)
+    print("✅ Success! Database now has State + District + Pincode.")
+
+# --- INCREMENTAL MODE ---
+# A manifest remembers every shard's size, mtime and SHA-256 alongside its
+# partial aggregates. Reruns parse only new/changed shards, re-derive the
+# district totals from the stored partials, and touch only the risk rows
+# whose score or existence actually changed.
+
+INCREMENTAL_DDL = [
+    """CREATE TABLE IF NOT EXISTS uidai_ingest_manifest (
+        path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha256 TEXT, ingested_at TEXT)""",
+    """CREATE TABLE IF NOT EXISTS uidai_shard_district_sums (
+        shard TEXT, district TEXT, updates REAL, PRIMARY KEY (shard, district))""",
+    """CREATE TABLE IF NOT EXISTS uidai_shard_pincodes (
+        shard TEXT, state TEXT, district TEXT, pincode TEXT, PRIMARY KEY (shard, state, district, pincode))""",
+    "CREATE INDEX IF NOT EXISTS ix_uidai_shard_pincodes_triple ON uidai_shard_pincodes (state, district, pincode)",
+    """CREATE TABLE IF NOT EXISTS uidai_district_risk (
+        district TEXT PRIMARY KEY, updates REAL, risk_score REAL)""",
+]
+
+def clear_incremental_state(conn):
+    """
+    Forgets every shard's manifest entry and partials, so the next incremental
+    run bootstraps from scratch. Needed whenever the risk table was rebuilt by
+    another mode, or the stored partials of deleted shards would linger.
+    """
+    for ddl in INCREMENTAL_DDL:
+        conn.execute(ddl)
+    for table in ("uidai_ingest_manifest", "uidai_shard_district_sums", "uidai_shard_pincodes", "uidai_district_risk"):
+        conn.execute(f"DELETE FROM {table}")
+
+def reset_manifest():
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        clear_incremental_state(conn)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def plan_shards(conn, all_files):
+    """Splits shards into (changed, unchanged, removed) against the manifest."""
+    manifest = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime, sha256 FROM uidai_ingest_manifest")}
+    changed, unchanged = [], []
+    for path in all_files:
+        stat = os.stat(path)
+        known = manifest.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            unchanged.append(path)
+            continue
+        digest = file_sha256(path)
+        if known and known[2] == digest:
+            # Touched but identical: just refresh the stat fields
+            conn.execute("UPDATE uidai_ingest_manifest SET size = ?, mtime = ? WHERE path = ?",
+                         (stat.st_size, stat.st_mtime, path))
+            unchanged.append(path)
+        else:
+            changed.append((path, stat.st_size, stat.st_mtime, digest))
+    removed = sorted(set(manifest) - set(all_files))
+    return changed, unchanged, removed
+
+def store_partials(conn, partials, stats):
+    now = datetime.utcnow().isoformat()
+    for filename, sums, triples in partials:
+        conn.execute("DELETE FROM uidai_shard_district_sums WHERE shard = ?", (filename,))
+        conn.execute("DELETE FROM uidai_shard_pincodes WHERE shard = ?", (filename,))
+        conn.executemany("INSERT INTO uidai_shard_district_sums VALUES (?, ?, ?)",
+                         [(filename, d, u) for d, u in sums.items()])
+        conn.executemany("INSERT INTO uidai_shard_pincodes VALUES (?, ?, ?, ?)",
+                         [(filename, *t) for t in triples])
+        size, mtime, digest = stats[filename]
+        conn.execute("INSERT OR REPLACE INTO uidai_ingest_manifest VALUES (?, ?, ?, ?, ?)",
+                     (filename, size, mtime, digest, now))
+
+def ingest_data_incremental(workers=None, chunksize=CHUNK_ROWS):
+    print("🚀 Starting Data Pipeline (Incremental - changed shards only)...")
+
+    all_files = sorted(glob.glob(CSV_GLOB))
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    try:
+        for ddl in INCREMENTAL_DDL:
+            conn.execute(ddl)
+        has_table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'uidai_regional_risk'").fetchone()
+        has_manifest = conn.execute("SELECT 1 FROM uidai_ingest_manifest LIMIT 1").fetchone()
+        bootstrap = not (has_table and has_manifest)
+
+        if bootstrap:
+            conn.execute("BEGIN IMMEDIATE")
+            clear_incremental_state(conn)
+            conn.execute("COMMIT")
+        changed, unchanged, removed = plan_shards(conn, all_files)
+        print(f"📂 Shards: {len(changed)} new/changed, {len(unchanged)} unchanged, {len(removed)} removed.")
+        if not changed and not removed:
+            print("✅ Nothing to do, risk table is up to date.")
+            return
+
+        # 2. Parse only the new/changed shards (in parallel)
+        stats = {path: (size, mtime, digest) for path, size, mtime, digest in changed}
+        paths = list(stats)
+        partials = []
+        workers = workers or max(1, min(len(paths), os.cpu_count() or 1))
+        if len(paths) > 1 and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                partials = list(pool.map(process_shard, paths, [chunksize] * len(paths)))
+        else:
+            partials = [process_shard(path, chunksize) for path in paths]
+        for filename, _, _ in partials:
+            print(f"   -> Processed {os.path.basename(filename)}")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Triples the outgoing partials contributed (candidates for deletion)
+            outgoing = set()
+            for shard in removed + paths:
+                outgoing.update(conn.execute(
+                    "SELECT state, district, pincode FROM uidai_shard_pincodes WHERE shard = ?", (shard,)))
+                conn.execute("DELETE FROM uidai_shard_district_sums WHERE shard = ?", (shard,))
+                conn.execute("DELETE FROM uidai_shard_pincodes WHERE shard = ?", (shard,))
+                conn.execute("DELETE FROM uidai_ingest_manifest WHERE path = ?", (shard,))
+            store_partials(conn, partials, stats)
+
+            # 3. Re-derive district totals and normalize against the new max
+            print("🧠 Recalculating Regional Risk Scores...")
+            district_sums = dict(conn.execute(
+                "SELECT district, SUM(updates) FROM uidai_shard_district_sums GROUP BY district"))
+            scores = risk_scores(district_sums)
+            previous = dict(conn.execute("SELECT district, risk_score FROM uidai_district_risk"))
+            conn.execute("DELETE FROM uidai_district_risk")
+            conn.executemany("INSERT INTO uidai_district_risk VALUES (?, ?, ?)",
+                             [(d, district_sums[d], scores[d]) for d in scores])
+
+            if bootstrap:
+                conn.execute("COMMIT")
+                rows = [(st, d, p, scores.get(d, 0.0)) for st, d, p in
+                        conn.execute("SELECT DISTINCT state, district, pincode FROM uidai_shard_pincodes")]
+                print(f"💾 First incremental run: rebuilding {len(rows)} rows (staging + swap)...")
+                swap_in_risk_table(rows)
+                print("✅ Success! Manifest created, future runs are incremental.")
+                return
+
+            # 4. Upsert only the affected rows
+            incoming = set()
+            for _, _, triples in partials:
+                incoming |= triples
+            still_present = set()
+            for triple in outgoing - incoming:
+                if conn.execute("SELECT 1 FROM uidai_shard_pincodes WHERE state IS ? AND district = ? AND pincode = ? LIMIT 1",
+                                triple).fetchone():
+                    still_present.add(triple)
+            gone = outgoing - incoming - still_present
+            conn.executemany("DELETE FROM uidai_regional_risk WHERE State IS ? AND District = ? AND Pincode = ?", list(gone))
+
+            new_rows = []
+            for state, district, pincode in incoming - outgoing:
+                exists = conn.execute(
+                    "SELECT 1 FROM uidai_regional_risk WHERE Pincode = ? AND District = ? AND State IS ? LIMIT 1",
+                    (pincode, district, state)).fetchone()
+                if not exists:
+                    new_rows.append((state, district, pincode, scores.get(district, 0.0)))
+            conn.executemany("INSERT INTO uidai_regional_risk VALUES (?, ?, ?, ?)", new_rows)
+
+            rescored = [(score, d) for d, score in scores.items() if previous.get(d) != score]
+            conn.executemany("UPDATE uidai_regional_risk SET Risk_Score = ? WHERE District = ?", rescored)
+            dropped = [(d,) for d in previous if d not in scores]
+            conn.executemany("UPDATE uidai_regional_risk SET Risk_Score = 0 WHERE District = ?", dropped)
+
+            for sql, params in finalize_statements():
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        print(f"✅ Success! +{len(new_rows)} rows, -{len(gone)} rows, "
+              f"{len(rescored) + len(dropped)} district scores changed.")
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
-    ingest_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build uidai_regional_risk from data/api_data_*.csv")
+    parser.add_argument("--mode", choices=["incremental", "stream", "full"], default="incremental",
+                        help="incremental: only new/changed shards (default); "
+                             "stream: chunked + parallel + atomic swap; full: in-memory pandas")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.mode == "full":
+        ingest_data()
+    elif args.mode == "incremental":
+        ingest_data_incremental(args.workers, args.chunksize)
+    else:
+        ingest_data_streaming(args.workers, args.chunksize)
\ No newline at end of file
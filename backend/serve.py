@@ -0,0 +1,132 @@
+"""
+Preload-then-fork server.
+
+    python serve.py --workers 4 --port 8000
+
+The parent loads EasyOCR, FaceNet and MTCNN once, then forks the API
+workers. Model weights are plain tensor buffers that the workers only read,
+so they stay shared copy-on-write: resident memory grows by the per-worker
+Python heap, not by one full set of weights per worker as with
+`uvicorn --workers N`. Linux/macOS only (needs os.fork).
+
+Workers share kyc.db, the face gallery and the ANN index file. One-off
+startup writes (schema, counter seeding, gallery reconciliation) run here in
+the parent before forking; the per-request writers are multi-process safe
+(gallery appends hold an flock of face_gallery.f32, counters and job/batch
+claims are SQL upserts and compare-and-set updates, index saves are atomic
+renames).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import uvicorn
+from app.core.lifecycle import model_registry
+from app.core.telemetry import configure_logging
+from app.database import engine
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(sock, threads_per_worker):
+    # Connections and threads from the parent must not be reused after fork
+    engine.dispose(close=False)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    from app.main import app
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+def serve(workers, host, port):
+    print(f"🚀 Preloading models once for {workers} worker(s)...")
+    import app.main  # registers the models and builds the app
+    # Warm-up progress goes through the kyc logger; workers set up their own after the fork
+    configure_logging()
+    from app.services.regional_risk import regional_risk_index
+    from app.services.metrics_store import metrics_store
+    from app.services.face_gallery import face_gallery
+    model_registry.warm_up()
+    if not model_registry.ready:
+        print(f"❌ Some models failed to load: {model_registry.status()}")
+        sys.exit(1)
+    regional_risk_index.refresh_if_stale()
+    # Done once here rather than by every worker's lifespan at the same moment
+    metrics_store.ensure_seeded()
+    print(f"   -> Face gallery: {len(face_gallery)} rows")
+    engine.dispose()
+
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers do not write to (and un-share) the preloaded pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(host, port)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    children = {}
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            run_worker(sock, threads_per_worker)
+            os._exit(0)
+        children[pid] = slot
+        print(f"   -> Worker {slot} started (pid {pid})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"✅ Serving on http://{host}:{port} with {workers} forked worker(s)")
+
+    # Supervise: respawn workers that die unexpectedly
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"   ⚠️ Worker {slot} (pid {pid}) exited, restarting...")
+            time.sleep(1)
+            spawn(slot)
+    sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("⚠️ os.fork is unavailable on this platform, falling back to a single worker.")
+        uvicorn.run("app.main:app", host=args.host, port=args.port)
+    else:
+        serve(args.workers, args.host, args.port)
@@ -0,0 +1,43 @@
+"""
+Shared test setup.
+
+The session's kyc.db and uploads/ live in a scratch directory (set through
+DATABASE_URL / UPLOAD_FOLDER before anything imports the app), and every
+test runs with its own tmp_path as the working directory, so relative paths
+such as face_gallery.f32 or risk_policy.json never touch the real ones. The
+OCR and face services are replaced by empty stand-ins: these tests cover
+the NumPy and SQL components around the models, never the models themselves.
+"""
+import os
+import sys
+import tempfile
+import types
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pytest_configure(config):
+    # Runs before test modules are collected, i.e. before app.database is imported
+    scratch = tempfile.mkdtemp(prefix="kyc-tests-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'kyc.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(scratch, "uploads")
+    sys.path.insert(0, BACKEND_DIR)
+
+    for module_name, singleton in (("app.services.face_service", "face_engine"),
+                                   ("app.services.ocr_service", "ocr_engine")):
+        stand_in = types.ModuleType(module_name)
+        setattr(stand_in, singleton, None)
+        sys.modules[module_name] = stand_in
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    from app.database import Base, engine
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from app.services.ann_index import IVFIndex
+from app.services.face_gallery import FaceGallery
+
+def clustered(rows=2000, dim=64, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    matrix = centres[rng.integers(0, clusters, rows)] + 0.3 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+def exact(matrix, query, top_k):
+    return set(np.argsort(-(matrix @ query))[:top_k].tolist())
+
+@pytest.fixture(scope="module")
+def matrix():
+    return clustered()
+
+@pytest.fixture(scope="module")
+def index(matrix):
+    return IVFIndex(dim=matrix.shape[1], nlist=32).build(matrix, block_rows=300, iterations=10)
+
+def test_every_row_is_indexed_once(index, matrix):
+    ids = np.concatenate(index.lists)
+    assert index.indexed_rows == matrix.shape[0]
+    assert np.array_equal(np.sort(ids), np.arange(matrix.shape[0]))
+
+def test_recall_against_exact_search(index, matrix):
+    queries = matrix[::97]
+    found = [set(index.search(q, matrix, top_k=10, nprobe=8)[0].tolist()) for q in queries]
+    recall = np.mean([len(f & exact(matrix, q, 10)) / 10 for f, q in zip(found, queries)])
+    assert recall >= 0.9
+
+def test_results_are_exact_similarities_best_first(index, matrix):
+    query = matrix[5]
+    rows, sims = index.search(query, matrix, top_k=5, nprobe=4)
+    assert rows[0] == 5
+    assert np.allclose(sims, matrix[rows] @ query)
+    assert np.all(np.diff(sims) <= 0)
+
+def test_probing_every_cell_is_exact(index, matrix):
+    query = clustered(rows=1, dim=matrix.shape[1], seed=3)[0]
+    rows, _ = index.search(query, matrix, top_k=10, nprobe=index.nlist)
+    assert set(rows.tolist()) == exact(matrix, query, 10)
+
+def test_incremental_add_and_round_trip(matrix, tmp_path):
+    index = IVFIndex(dim=matrix.shape[1], nlist=16).build(matrix[:1500], iterations=5)
+    index.add(matrix[1500:], 1500)
+    assert index.indexed_rows == matrix.shape[0]
+    assert index.pending > 0
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    assert index.pending == 0
+    loaded = IVFIndex.load(path)
+    assert loaded.indexed_rows == index.indexed_rows
+    for a, b in zip(loaded.lists, index.lists):
+        assert np.array_equal(a, b)
+    query = matrix[1700]
+    assert loaded.search(query, matrix, 3, 4)[0].tolist() == index.search(query, matrix, 3, 4)[0].tolist()
+
+def test_training_on_an_empty_gallery_fails():
+    with pytest.raises(ValueError):
+        IVFIndex(dim=8, nlist=4).train(np.empty((0, 8), dtype=np.float32))
+
+def test_gallery_switches_to_the_index_when_large(tmp_path):
+    gallery = FaceGallery(str(tmp_path / "gallery.f32"), index_path=str(tmp_path / "gallery.ivf.npz"), ann_min_rows=100, nprobe=8)
+    faces = np.random.default_rng(0).standard_normal((300, 512)).astype(np.float32)
+    for i, face in enumerate(faces):
+        gallery.add(face, f"req-{i}")
+    gallery.build_index(nlist=8, iterations=5)
+    gallery.add(faces[5] * 2, "late")
+    rows, sims = gallery.top_k_rows(faces[5], top_k=2)
+    assert set(rows.tolist()) == {5, 300}
+    assert sims[0] > 0.999
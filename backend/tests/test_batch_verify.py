@@ -0,0 +1,37 @@
+import asyncio
+import numpy as np
+from app.services.batch_verify import BatchVerifier
+
+def outcome(request_id, id_number, embedding, decision="APPROVED"):
+    return {"request_id": request_id, "final_decision": decision, "ocr_data": {"id_number": id_number}}, embedding
+
+def test_same_face_twice_in_one_chunk_is_reassessed():
+    rng = np.random.default_rng(0)
+    face, other = rng.standard_normal((2, 512)).astype(np.float32)
+    assessed = [
+        outcome("a", "1111", face),
+        outcome("b", "2222", other),
+        outcome("c", "3333", face),
+        ValueError("could not decode"),
+    ]
+    calls = []
+
+    async def finish(n, pending=None):
+        calls.append((n, [request_id for _, request_id, _ in pending]))
+        return outcome("c", "3333", face, decision="REJECTED")
+
+    result = asyncio.run(BatchVerifier._check_within_chunk(assessed, finish))
+    # Only the late copy is reassessed, against the approvals before it
+    assert calls == [(2, ["a", "b"])]
+    assert [r[0]["final_decision"] for r in result[:3]] == ["APPROVED", "APPROVED", "REJECTED"]
+    assert isinstance(result[3], ValueError)
+
+def test_rejected_items_never_join_the_pending_set():
+    face = np.ones(512, dtype=np.float32)
+    assessed = [outcome("a", "1111", face, decision="REJECTED"), outcome("b", "2222", face)]
+
+    async def finish(n, pending=None):
+        raise AssertionError("nothing to reassess")
+
+    result = asyncio.run(BatchVerifier._check_within_chunk(assessed, finish))
+    assert [r[0]["final_decision"] for r in result] == ["REJECTED", "APPROVED"]
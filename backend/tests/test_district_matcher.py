@@ -0,0 +1,43 @@
+from app.services.district_matcher import AhoCorasick, DistrictMatcher, canonical
+
+STATES = {
+    "PUNE": {"MAHARASHTRA"},
+    "AURANGABAD": {"MAHARASHTRA", "BIHAR"},
+    "DURG": {"CHHATTISGARH"},
+    "RAIGARH": {"CHHATTISGARH"},
+    "RAIGAD": {"MAHARASHTRA"},
+    "NORTH GOA": {"GOA"},
+    "GOA": {"GOA"},
+}
+
+def matcher():
+    return DistrictMatcher(STATES, lambda name: STATES.get(name, set()))
+
+def test_canonical_folds_ocr_lookalikes():
+    assert canonical("P.O. Pune-411001") == "P O PUNE 4IIOOI"
+    assert canonical("  n0rth   g0a ") == "NORTH GOA"
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick(["HE", "SHE", "HERS"])
+    hits = {(start, end, automaton.patterns[p]) for start, end, p in automaton.find_all("USHERS")}
+    assert hits == {(1, 4, "SHE"), (2, 4, "HE"), (2, 6, "HERS")}
+
+def test_finds_district_in_address_text():
+    assert matcher().find("S/O Ramesh, Kothrud, Pune, Maharashtra - 411038") == "PUNE"
+
+def test_matches_despite_ocr_confusions():
+    assert matcher().find("Near bus stand, DUR6 ... Durg 49l001") == "DURG"
+    assert matcher().find("Panaji, N0RTH G0A") == "NORTH GOA"
+
+def test_requires_word_boundaries():
+    assert matcher().find("Durgapur, West Bengal") is None
+
+def test_prefers_the_district_whose_state_is_mentioned():
+    assert matcher().find("Raigarh Road, Alibag, Raigad, Maharashtra") == "RAIGAD"
+    assert matcher().find("Raigad Colony, Raigarh, Chhattisgarh") == "RAIGARH"
+
+def test_prefers_the_longest_name():
+    assert matcher().find("Mapusa, North Goa") == "NORTH GOA"
+
+def test_no_district():
+    assert matcher().find("Somewhere without a known place") is None
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from app.database import SessionLocal, FaceGalleryEntry, engine
+from app.services.face_gallery import FaceGallery, EMBEDDING_DIM
+
+ROW_BYTES = EMBEDDING_DIM * 4
+
+def vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+
+def metadata_rows():
+    db = SessionLocal()
+    try:
+        return sorted(row for (row,) in db.query(FaceGalleryEntry.row_index))
+    finally:
+        db.close()
+
+@pytest.fixture
+def gallery_path(tmp_path):
+    return str(tmp_path / "gallery.f32")
+
+def test_add_and_search(gallery_path):
+    gallery = FaceGallery(gallery_path, block_rows=7)
+    faces = vectors(50)
+    for i, face in enumerate(faces):
+        assert gallery.add(face, f"req-{i}", f"id-{i}") == i
+    assert len(gallery) == 50
+
+    noisy = faces[17] + 0.1 * vectors(1, seed=1)[0]
+    matches = gallery.search(noisy, top_k=3, id_number="id-17")
+    assert matches[0]["request_id"] == "req-17"
+    assert matches[0]["same_id_number"]
+    assert matches[0]["similarity"] > 90
+    assert [m["similarity"] for m in matches] == sorted((m["similarity"] for m in matches), reverse=True)
+
+def test_blocked_scan_matches_full_scan(gallery_path):
+    gallery = FaceGallery(gallery_path, block_rows=16)
+    for i, face in enumerate(vectors(100)):
+        gallery.add(face, f"req-{i}")
+    query = vectors(1, seed=2)[0]
+    rows, sims = gallery.exact_top_k_rows(query, top_k=10)
+    full = gallery.matrix() @ FaceGallery.normalize(query)
+    assert rows.tolist() == np.argsort(-full)[:10].tolist()
+    assert np.allclose(sims, np.sort(full)[::-1][:10])
+
+def test_duplicate_needs_a_different_id_number(gallery_path):
+    gallery = FaceGallery(gallery_path)
+    face = vectors(1)[0]
+    gallery.add(face, "first", "1111 2222 3333")
+    assert not gallery.check_duplicate(face, "1111 2222 3333")["duplicate_suspect"]
+    assert gallery.check_duplicate(face, "9999 8888 7777")["duplicate_suspect"]
+
+def test_pending_identities_count_as_duplicates(gallery_path):
+    gallery = FaceGallery(gallery_path)
+    face = vectors(1)[0]
+    pending = [(face, "earlier-in-chunk", "1111 2222 3333")]
+    check = gallery.check_duplicate(face, "9999 8888 7777", pending=pending)
+    assert check["duplicate_suspect"]
+    assert check["matches"][0]["request_id"] == "earlier-in-chunk"
+
+def test_uncommitted_rows_are_hidden_and_reused(gallery_path):
+    gallery = FaceGallery(gallery_path)
+    faces = vectors(4)
+    gallery.add(faces[0], "a")
+    # A crash between the vector write and the metadata commit
+    with open(gallery_path, "ab") as f:
+        f.write(faces[1].tobytes())
+    assert len(gallery) == 1
+    assert [m["request_id"] for m in gallery.search(faces[1], top_k=5)] == ["a"]
+
+    assert gallery.add(faces[2], "b") == 1
+    assert os.path.getsize(gallery_path) == 2 * ROW_BYTES
+    assert gallery.search(faces[2], top_k=1)[0]["request_id"] == "b"
+
+def test_repair_pads_rows_missing_from_the_file(gallery_path):
+    gallery = FaceGallery(gallery_path)
+    faces = vectors(3)
+    for i, face in enumerate(faces):
+        gallery.add(face, f"req-{i}")
+    # Metadata ahead of the file, e.g. after the old truncating rollback
+    with open(gallery_path, "r+b") as f:
+        f.truncate(ROW_BYTES)
+
+    reopened = FaceGallery(gallery_path)
+    assert len(reopened) == 3
+    assert not reopened.matrix()[1:].any()
+    assert reopened.add(faces[0], "after-repair") == 3
+    assert metadata_rows() == [0, 1, 2, 3]
+    assert reopened.search(faces[0], top_k=2)[0]["similarity"] > 99.9
+
+def _add_many(path, seed, count):
+    # Connections inherited from the parent must not be shared after fork
+    engine.dispose(close=False)
+    gallery = FaceGallery(path)
+    for i, face in enumerate(vectors(count, seed)):
+        gallery.add(face, f"proc{seed}-{i}", f"id-{seed}-{i}")
+
+def test_concurrent_processes_never_share_a_row(gallery_path):
+    FaceGallery(gallery_path).matrix()
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_many, args=(gallery_path, seed, 100)) for seed in (1, 2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0, 0]
+
+    assert metadata_rows() == list(range(200))
+    assert os.path.getsize(gallery_path) == 200 * ROW_BYTES
+    gallery = FaceGallery(gallery_path)
+    for seed in (1, 2):
+        for i, face in enumerate(vectors(100, seed)[::25]):
+            match = gallery.search(face, top_k=1)[0]
+            assert match["request_id"] == f"proc{seed}-{i * 25}"
+            assert match["similarity"] > 99.9
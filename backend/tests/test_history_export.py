@@ -0,0 +1,62 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from app.api import endpoints
+from app.api.endpoints import export_history
+from app.database import SessionLocal, KYCRecord
+
+def add_records(count, prefix="r"):
+    db = SessionLocal()
+    try:
+        db.execute(insert(KYCRecord), [
+            {"request_id": f"{prefix}{i}", "name": "A B", "match_score": float(i % 100),
+             "decision": "APPROVED" if i % 3 else "REJECTED", "timestamp": datetime.utcnow()}
+            for i in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def collect(response):
+    async def read():
+        return [chunk async for chunk in response.body_iterator]
+    return "".join(asyncio.run(read()))
+
+def test_ndjson_export_is_complete_and_ordered(monkeypatch):
+    monkeypatch.setattr(endpoints, "EXPORT_CHUNK_ROWS", 7)
+    add_records(30)
+    lines = collect(export_history(format="ndjson")).splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert len(ids) == 30
+    assert ids == sorted(ids)
+
+def test_csv_export_applies_filters(monkeypatch):
+    monkeypatch.setattr(endpoints, "EXPORT_CHUNK_ROWS", 4)
+    add_records(30)
+    rows = list(csv.DictReader(io.StringIO(collect(export_history(format="csv", decision="rejected")))))
+    assert len(rows) == 10
+    assert {row["decision"] for row in rows} == {"REJECTED"}
+
+def test_export_does_not_block_writers(monkeypatch):
+    monkeypatch.setattr(endpoints, "EXPORT_CHUNK_ROWS", 10)
+    add_records(35)
+    chunks = export_history(format="ndjson").body_iterator
+
+    async def export_with_a_write_in_between():
+        received = [await chunks.__anext__()]
+        # A verification committing while the download is paused mid-stream
+        db = SessionLocal()
+        try:
+            db.add(KYCRecord(request_id="during-export", decision="APPROVED"))
+            db.commit()
+        finally:
+            db.close()
+        received.extend([chunk async for chunk in chunks])
+        return "".join(received)
+
+    lines = asyncio.run(export_with_a_write_in_between()).splitlines()
+    assert len(lines) == 36
+    assert json.loads(lines[-1])["request_id"] == "during-export"
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import pytest
+import ingest_data
+
+HEADER = "date,state,district,pincode,demo_age_5_17,demo_age_17_\n"
+
+def write_shard(directory, name, rows):
+    path = os.path.join(directory, f"api_data_{name}.csv")
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for state, district, pincode, updates in rows:
+            f.write(f"01-01-2026,{state},{district},{pincode},{updates},0\n")
+    return path
+
+def risk_table(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('SELECT "State", "District", "Pincode", "Risk_Score" FROM uidai_regional_risk')
+        return sorted(rows, key=lambda row: (row[0] or "", *row[1:]))
+    finally:
+        conn.close()
+
+def run(monkeypatch, data_dir, db_path, mode):
+    monkeypatch.setattr(ingest_data, "CSV_GLOB", os.path.join(data_dir, "api_data_*.csv"))
+    monkeypatch.setattr(ingest_data, "DATABASE_PATH", db_path)
+    if mode == "incremental":
+        ingest_data.ingest_data_incremental(workers=1, chunksize=2)
+    else:
+        ingest_data.ingest_data_streaming(workers=1, chunksize=2)
+    return risk_table(db_path)
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    write_shard(directory, "a", [
+        ("Maharashtra", "Pune", "411001", 40), ("Maharashtra", "Pune", "411002", 10),
+        ("Goa", "North Goa", "403001", 5),
+    ])
+    write_shard(directory, "b", [
+        ("Maharashtra", "Pune", "411001", 50), ("Bihar", "Patna", "800001", 20),
+    ])
+    write_shard(directory, "c", [("Goa", "North Goa", "403002", 25)])
+    return str(directory)
+
+def test_first_run_matches_a_full_rebuild(monkeypatch, tmp_path, data_dir):
+    incremental = run(monkeypatch, data_dir, str(tmp_path / "incremental.db"), "incremental")
+    assert incremental == run(monkeypatch, data_dir, str(tmp_path / "full.db"), "stream")
+    # Pune has the most updates (100) and sets the scale
+    assert ("Maharashtra", "Pune", "411001", 100.0) in incremental
+    assert ("Bihar", "Patna", "800001", 20.0) in incremental
+
+def test_changed_added_and_removed_shards(monkeypatch, tmp_path, data_dir):
+    incremental_db = str(tmp_path / "incremental.db")
+    run(monkeypatch, data_dir, incremental_db, "incremental")
+
+    write_shard(data_dir, "b", [("Bihar", "Patna", "800001", 300), ("Bihar", "Patna", "800002", 1)])
+    os.remove(os.path.join(data_dir, "api_data_c.csv"))
+    write_shard(data_dir, "d", [("Goa", "South Goa", "403601", 60)])
+
+    incremental = run(monkeypatch, data_dir, incremental_db, "incremental")
+    assert incremental == run(monkeypatch, data_dir, str(tmp_path / "full.db"), "stream")
+    pincodes = {row[2] for row in incremental}
+    assert "403002" not in pincodes          # only in the removed shard
+    assert {"800002", "403601"} <= pincodes   # new in the changed / added shard
+    assert ("Bihar", "Patna", "800001", 100.0) in incremental
+
+def test_unchanged_shards_are_skipped(monkeypatch, tmp_path, data_dir):
+    db_path = str(tmp_path / "incremental.db")
+    first = run(monkeypatch, data_dir, db_path, "incremental")
+    monkeypatch.setattr(ingest_data, "process_shard", lambda *args: pytest.fail("re-parsed an unchanged shard"))
+    assert run(monkeypatch, data_dir, db_path, "incremental") == first
+
+def test_bootstrap_forgets_partials_of_deleted_shards(monkeypatch, tmp_path, data_dir):
+    db_path = str(tmp_path / "incremental.db")
+    run(monkeypatch, data_dir, db_path, "incremental")
+
+    # Losing the risk table forces a bootstrap, after shard c has gone too
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE uidai_regional_risk")
+    conn.commit()
+    conn.close()
+    os.remove(os.path.join(data_dir, "api_data_c.csv"))
+
+    incremental = run(monkeypatch, data_dir, db_path, "incremental")
+    assert incremental == run(monkeypatch, data_dir, str(tmp_path / "full.db"), "stream")
+    assert "403002" not in {row[2] for row in incremental}
+
+def test_rows_without_a_state_are_removed(monkeypatch, tmp_path, data_dir):
+    db_path = str(tmp_path / "incremental.db")
+    write_shard(data_dir, "e", [("", "Pune", "411009", 3), (" Goa ", " North Goa ", "403003", 1)])
+    first = run(monkeypatch, data_dir, db_path, "incremental")
+    assert (None, "Pune", "411009", 100.0) in first
+    assert ("Goa", "North Goa", "403003", 30.0) in first
+
+    write_shard(data_dir, "e", [("Goa", "North Goa", "403003", 1)])
+    incremental = run(monkeypatch, data_dir, db_path, "incremental")
+    assert incremental == run(monkeypatch, data_dir, str(tmp_path / "full.db"), "stream")
+    assert "411009" not in {row[2] for row in incremental}
+
+def test_stream_rebuild_resets_the_manifest(monkeypatch, tmp_path, data_dir):
+    db_path = str(tmp_path / "incremental.db")
+    run(monkeypatch, data_dir, db_path, "incremental")
+    run(monkeypatch, data_dir, db_path, "stream")
+    conn = sqlite3.connect(db_path)
+    try:
+        for table in ("uidai_ingest_manifest", "uidai_shard_district_sums", "uidai_shard_pincodes"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    os.remove(os.path.join(data_dir, "api_data_c.csv"))
+    incremental = run(monkeypatch, data_dir, db_path, "incremental")
+    assert incremental == run(monkeypatch, data_dir, str(tmp_path / "full.db"), "stream")
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.database import SessionLocal, KYCJob
+from app.services.job_queue import JobQueue, QueueFull
+
+PATHS = ("front.jpg", "back.jpg", "selfie.jpg")
+
+@pytest.fixture
+def queue():
+    return JobQueue()
+
+def expire_lease(request_id):
+    db = SessionLocal()
+    try:
+        db.query(KYCJob).filter(KYCJob.request_id == request_id).update(
+            {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+    finally:
+        db.close()
+
+def test_claims_highest_priority_then_oldest(queue):
+    queue.enqueue("low", PATHS, priority=0)
+    queue.enqueue("high", PATHS, priority=5)
+    queue.enqueue("low-later", PATHS, priority=0)
+    assert queue.get("low-later")["queue_position"] == 2
+
+    assert [queue.claim()["request_id"] for _ in range(3)] == ["high", "low", "low-later"]
+    assert queue.claim() is None
+
+def test_claim_takes_a_lease(queue):
+    queue.enqueue("job", PATHS)
+    job = queue.claim()
+    assert job == {"request_id": "job", "attempts": 1, "paths": PATHS}
+    assert queue.get("job")["status"] == "running"
+    # Leased: no other worker gets it
+    assert queue.claim() is None
+
+def test_expired_lease_is_reclaimed_and_fences_the_old_worker(queue):
+    queue.enqueue("job", PATHS)
+    first = queue.claim()
+    expire_lease("job")
+    second = queue.claim()
+    assert second["attempts"] == 2
+
+    # The worker that lost its lease can no longer finish the job
+    db = SessionLocal()
+    try:
+        assert not queue.complete(db, first, {"final_decision": "APPROVED"})
+        assert queue.complete(db, second, {"final_decision": "APPROVED"})
+        db.commit()
+    finally:
+        db.close()
+    job = queue.get("job")
+    assert job["status"] == "done"
+    assert job["result"] == {"final_decision": "APPROVED"}
+
+def test_gives_up_after_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(settings, "KYC_JOB_MAX_ATTEMPTS", 2)
+    queue.enqueue("job", PATHS)
+    for _ in range(2):
+        assert queue.claim() is not None
+        expire_lease("job")
+    assert queue.claim() is None
+    job = queue.get("job")
+    assert job["status"] == "failed"
+    assert "Gave up after 2 attempts" in job["error"]
+
+def test_fail_requeues_until_attempts_run_out(queue, monkeypatch):
+    monkeypatch.setattr(settings, "KYC_JOB_MAX_ATTEMPTS", 2)
+    queue.enqueue("job", PATHS)
+    assert not queue.fail(queue.claim(), "model timeout")
+    assert queue.get("job")["status"] == "queued"
+    assert queue.fail(queue.claim(), "model timeout")
+    assert queue.get("job")["status"] == "failed"
+
+def test_permanent_failure_is_not_retried(queue):
+    queue.enqueue("job", PATHS)
+    assert queue.fail(queue.claim(), "bad image", retry=False)
+    assert queue.get("job")["status"] == "failed"
+    assert queue.claim() is None
+
+def test_enqueue_refuses_when_full(queue, monkeypatch):
+    monkeypatch.setattr(settings, "KYC_JOB_QUEUE_MAX", 1)
+    queue.enqueue("first", PATHS)
+    assert not queue.has_capacity()
+    with pytest.raises(QueueFull):
+        queue.enqueue("second", PATHS)
+
+def test_discard_inputs_removes_saved_uploads(queue):
+    paths = queue.save_inputs("rejected", b"front", b"back", b"selfie")
+    queue.discard_inputs(paths)
+    queue.discard_inputs(paths)  # already gone: no error
+    assert not any(os.path.exists(path) for path in paths)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services.image_io import DecodedImage
+from app.services.quality_gate import QualityGate, QualityRejected
+
+SKIN = (205, 150, 125)
+
+def textured(height, width, level=128, spread=60, seed=0):
+    """Bluish colour noise: sharp, well exposed, no skin tones."""
+    rng = np.random.default_rng(seed)
+    grey = rng.normal(level, spread, (height, width, 1))
+    tint = np.array([-25, -5, 30]) + rng.normal(0, 8, (height, width, 3))
+    return np.clip(grey + tint, 0, 255).astype(np.uint8)
+
+def grayscale(pixels):
+    grey = pixels.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return np.repeat(grey[..., None], 3, axis=2).astype(np.uint8)
+
+def with_face(pixels, box):
+    top, left, bottom, right = box
+    face = pixels.copy()
+    rng = np.random.default_rng(1)
+    noise = rng.integers(-8, 9, (bottom - top, right - left, 1))
+    face[top:bottom, left:right] = np.clip(np.array(SKIN) + noise, 0, 255).astype(np.uint8)
+    return face
+
+def selfie():
+    return with_face(textured(480, 360), (120, 100, 360, 260))
+
+def card_front():
+    return with_face(textured(400, 640), (80, 40, 300, 200))
+
+def card_back():
+    return textured(400, 640, seed=2)
+
+@pytest.fixture
+def gate():
+    return QualityGate()
+
+def code(gate, pixels, role):
+    failure = gate.evaluate(pixels, role)
+    return failure and failure["code"]
+
+def test_good_uploads_pass(gate):
+    assert code(gate, selfie(), "selfie") is None
+    assert code(gate, card_front(), "front") is None
+    assert code(gate, card_back(), "back") is None
+
+def test_too_small(gate):
+    assert code(gate, card_back()[:200, :300], "back") == "IMAGE_TOO_SMALL"
+
+def test_too_dark(gate):
+    assert code(gate, (card_back() * 0.1).astype(np.uint8), "back") == "IMAGE_TOO_DARK"
+
+def test_overexposed(gate):
+    assert code(gate, np.full((400, 640, 3), 255, dtype=np.uint8), "back") == "IMAGE_OVEREXPOSED"
+
+def test_blank(gate):
+    assert code(gate, np.full((400, 640, 3), 128, dtype=np.uint8), "back") == "IMAGE_BLANK"
+
+def test_blurry(gate):
+    # Large smooth gradient: plenty of contrast, almost no edges
+    ramp = np.linspace(40, 220, 640)[None, :].repeat(400, axis=0)
+    assert code(gate, np.repeat(ramp[..., None], 3, axis=2).astype(np.uint8), "back") == "IMAGE_BLURRY"
+
+def test_selfie_without_face(gate):
+    assert code(gate, textured(480, 360), "selfie") == "NO_FACE_DETECTED"
+
+def test_card_front_without_portrait(gate):
+    # The back uploaded as the front
+    assert code(gate, card_back(), "front") == "CARD_FRONT_NO_PHOTO"
+
+def test_grayscale_uploads_skip_the_skin_checks(gate):
+    # Cr = Cb = 128 everywhere: no pixel can pass the skin box, portrait or not
+    assert code(gate, grayscale(card_front()), "front") is None
+    assert code(gate, grayscale(selfie()), "selfie") is None
+    assert gate.measure(grayscale(card_front()), "front")["chroma"] < settings.QUALITY_MIN_CHROMA_STD
+
+def test_grayscale_uploads_still_get_the_other_checks(gate):
+    assert code(gate, grayscale(card_front())[:200, :300], "front") == "IMAGE_TOO_SMALL"
+    assert code(gate, (grayscale(selfie()) * 0.1).astype(np.uint8), "selfie") == "IMAGE_TOO_DARK"
+
+def test_screen_reports_every_failing_image(gate):
+    images = {
+        "front": DecodedImage(b"", pixels=card_back()),
+        "back": DecodedImage(b"", pixels=card_back()),
+        "selfie": DecodedImage(b"", pixels=np.zeros((480, 360, 3), dtype=np.uint8)),
+    }
+    with pytest.raises(QualityRejected) as rejected:
+        gate.screen(images)
+    assert {(f["image"], f["code"]) for f in rejected.value.failures} == {
+        ("front", "CARD_FRONT_NO_PHOTO"), ("selfie", "IMAGE_TOO_DARK")}
+
+def test_warn_and_off_modes_never_raise(gate, monkeypatch):
+    images = {"selfie": DecodedImage(b"", pixels=np.zeros((480, 360, 3), dtype=np.uint8))}
+    monkeypatch.setattr(settings, "QUALITY_GATE", "warn")
+    assert [f["code"] for f in gate.screen(images)] == ["IMAGE_TOO_DARK"]
+    monkeypatch.setattr(settings, "QUALITY_GATE", "off")
+    assert gate.screen(images) == []
@@ -0,0 +1,171 @@
+import json
+import os
+import numpy as np
+import pytest
+from app.database import SessionLocal, KYCRecord
+from app.services.risk_engine import CompiledPolicy, RiskEngine
+
+NAN = np.nan
+
+POLICY = {
+    "version": "test-1",
+    "weights": {"face": 0.5, "ocr": 0.2, "id_detected": 0.1, "regional": 0.1, "duplicate": 0.1},
+    "levels": {"low": 80, "medium": 40},
+    "approve": {"min_score": 40, "require_face_match": True},
+    "rules": [
+        {"name": "borderline_face", "if": [["face_score", "<", 60]], "cap": 60},
+        {"name": "weak_document", "if": [["regional_risk", ">", 70], ["ocr_confidence", "<", 50]], "penalty": 15},
+        {"name": "duplicate", "if": [["duplicate_suspect", "==", 1]], "reject": True},
+    ],
+}
+
+def row(face_score=90, face_match=1, ocr_confidence=90, id_detected=1, regional_risk=20, duplicate_suspect=0):
+    return [face_score, face_match, ocr_confidence, id_detected, regional_risk, duplicate_suspect]
+
+def score(policy, *rows):
+    return policy.score(np.array(rows, dtype=np.float64))
+
+def write_policy(path, policy):
+    with open(path, "w") as f:
+        json.dump(policy, f)
+
+def test_weighted_total():
+    result = score(CompiledPolicy(POLICY), row())
+    # 0.5*90 + 0.2*90 + 0.1*100 + 0.1*(100-20) + 0.1*100
+    assert result["total_score"][0] == pytest.approx(91.0)
+    assert result["risk_level"][0] == "LOW"
+    assert result["approve"][0]
+
+def test_weights_are_normalized():
+    doubled = dict(POLICY, weights={k: v * 2 for k, v in POLICY["weights"].items()})
+    assert score(CompiledPolicy(doubled), row())["total_score"][0] == pytest.approx(91.0)
+
+def test_unknown_signals_drop_out():
+    result = score(CompiledPolicy(POLICY), row(regional_risk=NAN, duplicate_suspect=NAN))
+    # Remaining weights 0.5 / 0.2 / 0.1 rescaled to sum to 1
+    assert result["total_score"][0] == pytest.approx((0.5 * 90 + 0.2 * 90 + 0.1 * 100) / 0.8)
+
+def test_cap_rule():
+    result = score(CompiledPolicy(POLICY), row(face_score=55))
+    assert result["total_score"][0] == 60
+    assert result["rules_fired"][0].tolist() == [True, False, False]
+    assert result["risk_level"][0] == "MEDIUM"
+
+def test_penalty_needs_every_condition():
+    policy = CompiledPolicy(POLICY)
+    base = score(policy, row(regional_risk=80, ocr_confidence=60))["total_score"][0]
+    hit = score(policy, row(regional_risk=80, ocr_confidence=40))
+    assert hit["rules_fired"][0].tolist() == [False, True, False]
+    assert hit["total_score"][0] == pytest.approx(base - 0.2 * 20 - 15)
+
+def test_rules_never_fire_on_unknown_signals():
+    result = score(CompiledPolicy(POLICY), row(regional_risk=NAN, ocr_confidence=NAN, duplicate_suspect=NAN))
+    assert not result["rules_fired"].any()
+
+def test_reject_rule_and_face_match_gate_approval():
+    result = score(CompiledPolicy(POLICY), row(duplicate_suspect=1), row(face_match=0), row())
+    assert result["approve"].tolist() == [False, False, True]
+
+def test_min_score_gates_approval():
+    result = score(CompiledPolicy(POLICY), row(face_score=20, ocr_confidence=10, id_detected=0, regional_risk=90))
+    assert result["total_score"][0] < 40
+    assert result["risk_level"][0] == "HIGH"
+    assert not result["approve"][0]
+
+def test_batch_matches_single_rows():
+    policy = CompiledPolicy(POLICY)
+    rng = np.random.default_rng(0)
+    rows = np.column_stack([
+        rng.uniform(0, 100, 500), rng.integers(0, 2, 500), rng.uniform(0, 100, 500),
+        rng.integers(0, 2, 500), rng.uniform(0, 100, 500), rng.integers(0, 2, 500),
+    ]).astype(np.float64)
+    rows[::7, 4] = NAN
+    batch = policy.score(rows)
+    for i in range(0, 500, 37):
+        single = policy.score(rows[i:i + 1])
+        assert single["total_score"][0] == pytest.approx(batch["total_score"][i])
+        assert single["approve"][0] == batch["approve"][i]
+
+@pytest.mark.parametrize("broken", [
+    {"weights": {"face": 1, "vibes": 1}},
+    {"weights": {"face": 0}},
+    {"weights": {"face": 1}, "rules": [{"name": "x", "if": [["height", ">", 1]], "cap": 1}]},
+    {"weights": {"face": 1}, "rules": [{"name": "x", "if": [["face_score", "~", 1]], "cap": 1}]},
+    {"weights": {"face": 1}, "rules": [{"name": "x", "if": [["face_score", ">", 1]]}]},
+])
+def test_invalid_policies_are_rejected(broken):
+    with pytest.raises(ValueError):
+        CompiledPolicy(broken)
+
+def test_calculate_risk_for_a_request(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, POLICY)
+    engine = RiskEngine(str(path), check_seconds=0)
+    result = engine.calculate_risk(
+        {"id_number": "1234 5678 9012", "avg_confidence": 0.9},
+        {"score": 90, "match": True},
+        regional_risk=20,
+        duplicate_check={"duplicate_suspect": False},
+    )
+    assert result["total_score"] == 91.0
+    assert result["approve"]
+    assert result["policy_version"] == "test-1"
+    assert result["breakdown"]["id_detected"] is True
+
+def test_missing_file_falls_back_to_builtin_policy(tmp_path):
+    engine = RiskEngine(str(tmp_path / "missing.json"), check_seconds=0)
+    result = engine.calculate_risk({"id_number": "", "avg_confidence": None}, {"score": 80, "match": True})
+    assert result["policy_version"] == "builtin"
+    # Only face (0.5) and id_detected (0.2) are known: 0.5*80 / 0.7
+    assert result["total_score"] == pytest.approx(57.14, abs=0.01)
+
+def test_hot_reload_keeps_previous_policy_when_broken(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, POLICY)
+    engine = RiskEngine(str(path), check_seconds=0)
+    assert engine.policy().version == "test-1"
+
+    write_policy(path, dict(POLICY, version="test-2"))
+    os.utime(path, ns=(1, 1))
+    assert engine.policy().version == "test-2"
+
+    path.write_text("{not json")
+    os.utime(path, ns=(2, 2))
+    assert engine.policy().version == "test-2"
+
+def test_score_batch_takes_named_columns(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, POLICY)
+    engine = RiskEngine(str(path), check_seconds=0)
+    result = engine.score_batch({"face_score": [90, 55], "face_match": [1, 1]})
+    assert len(result["total_score"]) == 2
+    assert result["rule_names"] == ["borderline_face", "weak_document", "duplicate"]
+    assert result["rules_fired"][:, 0].tolist() == [False, True]
+
+def test_rescore_never_rewrites_decisions(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, POLICY)
+    engine = RiskEngine(str(path), check_seconds=0)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            KYCRecord(request_id=f"r{i}", id_number="1234 5678 9012", match_score=score,
+                      ocr_confidence=0.9, decision="APPROVED")
+            for i, score in enumerate([95, 55, 30])
+        ])
+        db.commit()
+
+        dry = engine.rescore_records(db, db.query(KYCRecord), chunk_rows=2)
+        assert dry["records"] == 3
+        assert dry["would_reject"] == 1
+        assert dry["decision_changes"] == {"APPROVED->REJECTED": 1}
+        assert db.query(KYCRecord).filter(KYCRecord.risk_score.isnot(None)).count() == 0
+
+        applied = engine.rescore_records(db, db.query(KYCRecord), apply=True, chunk_rows=2)
+        assert applied["applied"]
+        records = db.query(KYCRecord).order_by(KYCRecord.id).all()
+        assert [r.policy_version for r in records] == ["test-1"] * 3
+        assert records[1].risk_score == 60
+        assert {r.decision for r in records} == {"APPROVED"}
+    finally:
+        db.close()